@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import auth, portfolios, accounts, transactions, dividends, imports, analytics, broker_imports
+from app.api.endpoints import auth, portfolios, accounts, transactions, dividends, imports, analytics, broker_imports, exports
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -9,4 +9,5 @@ api_router.include_router(transactions.router, prefix="/accounts/{account_id}",
 api_router.include_router(dividends.router, prefix="/accounts/{account_id}", tags=["dividends"])
 api_router.include_router(imports.router, prefix="/import", tags=["import"])
 api_router.include_router(analytics.router, prefix="/portfolios/{portfolio_id}/analytics", tags=["analytics"])
-api_router.include_router(broker_imports.router, prefix="/brokers", tags=["brokers"])
\ No newline at end of file
+api_router.include_router(broker_imports.router, prefix="/brokers", tags=["brokers"])
+api_router.include_router(exports.router, prefix="/portfolios/{portfolio_id}/export", tags=["export"])
\ No newline at end of file
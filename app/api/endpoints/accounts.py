@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
 from app.core.auth import get_current_active_user, get_db
 from app.models.user import User
 from app.models.models import Account, Portfolio
 from app.schemas.user import AccountCreate, AccountUpdate, Account as AccountSchema
+from app.services.pagination import KeysetPagination
 
 router = APIRouter()
 
+accounts_page = KeysetPagination("accounts", [Account.created_at, Account.id])
+
 
 def verify_portfolio_access(
     db: Session,
@@ -27,18 +30,25 @@ def verify_portfolio_access(
 @router.get("/accounts/", response_model=List[AccountSchema])
 def read_accounts(
     portfolio_id: uuid.UUID,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     verify_portfolio_access(db, portfolio_id, current_user)
-    accounts = db.query(Account)\
-        .filter(Account.portfolio_id == portfolio_id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return accounts
+    query = db.query(Account).filter(Account.portfolio_id == portfolio_id)
+    return accounts_page.respond(
+        query,
+        response,
+        AccountSchema,
+        cursor=cursor,
+        limit=limit,
+        skip=skip,
+        stream=stream
+    )
 
 
 @router.post("/accounts/", response_model=AccountSchema)
@@ -1,23 +1,248 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List, Dict
 import uuid
 from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
 
 from app.core.auth import get_current_active_user, get_db
 from app.models.user import User
-from app.models.models import Portfolio, Account, Transaction, Price, Asset
+from app.models.models import Portfolio, Account, Transaction, Asset, Benchmark
+from app.services.benchmark import BenchmarkComparison
+from app.services.cache import analytics_cache
+from app.services.fx import FxRates
+from app.services.ledger import TRADE_SIGNS, PositionLedger
+from app.services.ledger_store import LedgerStore
 from app.services.portfolio_analytics import PortfolioAnalytics
+from app.services.portfolio_data import PortfolioData
+from app.services.price_repository import PriceRepository
+from app.services.report_cache import ReportCacheService
+from app.services.risk import RiskEngine, RollingRisk
+from app.services.valuation import ValuationEngine
+from app.services.valuation_store import ValuationStore
 
 router = APIRouter()
 
 
+def _compute_performance(
+    db: Session,
+    portfolio: Portfolio,
+    start_date: date,
+    end_date: date,
+    benchmark_ids: List[uuid.UUID]
+) -> Dict:
+    """Výpočet výkonnosti portfolia (bez cache)"""
+    # Získání cashflow z transakcí za období
+    transactions = db.query(
+        Transaction.account_id,
+        Transaction.trade_time,
+        Transaction.type,
+        Transaction.gross_amount,
+        Transaction.trade_currency
+    ).join(Account)\
+        .filter(
+            Account.portfolio_id == portfolio.id,
+            Transaction.trade_time.between(start_date, end_date)
+        ).all()
+    transactions, unconverted = _base_currency_cashflows(db, transactions, portfolio.base_currency, start_date, end_date)
+    
+    # Výpočet TTWRR z materializované řady denních hodnot
+    daily_values = ValuationStore.get_daily_values(db, portfolio.id, start_date, end_date)
+    ttwrr = PortfolioAnalytics.calculate_ttwrr_from_values(daily_values)
+    
+    # XIRR portfolia i jednotlivých účtů jedním dávkovým výpočtem
+    current_value = ttwrr['daily_values'][-1]['value'] if ttwrr['daily_values'] else 0
+    closing_values = ValuationStore.get_account_values(db, portfolio.id, end_date)
+    opening_values = ValuationStore.get_account_values(
+        db,
+        portfolio.id,
+        start_date - timedelta(days=1)
+    )
+    
+    account_cashflows = {account_id: [] for account_id in {*closing_values, *opening_values}}
+    for t in transactions:
+        account_cashflows.setdefault(t['account_id'], []).append(t)
+    
+    groups = {'portfolio': (transactions, current_value)}
+    for account_id, cashflows in account_cashflows.items():
+        groups[account_id] = (cashflows, closing_values.get(account_id, 0))
+    xirr = PortfolioAnalytics.calculate_xirr_batch(
+        groups,
+        end_date,
+        {**opening_values, 'portfolio': sum(opening_values.values())},
+        start_date
+    )
+    # Cashflow bez kurzu by XIRR zkreslilo
+    for key in unconverted:
+        xirr[key] = None
+    
+    # Výpočet rizikových metrik přímo nad polem denních hodnot
+    risk_metrics = RiskEngine.metrics(RiskEngine.returns(daily_values.to_numpy()))
+    
+    # Porovnání s benchmarky (zvolenými nebo benchmarkem portfolia)
+    benchmark_comparison = []
+    if benchmark_ids:
+        benchmarks, missing, closes = BenchmarkComparison.load(db, benchmark_ids, start_date, end_date)
+        if benchmarks:
+            values, prices = BenchmarkComparison.align(daily_values, *closes, len(benchmarks))
+            benchmark_comparison = [
+                {**benchmark, **metrics}
+                for benchmark, metrics in zip(benchmarks, BenchmarkComparison.compare(values, prices))
+            ]
+        # Benchmarky bez cen zůstanou ve výsledku s prázdnými metrikami
+        benchmark_comparison += [{**benchmark, **BenchmarkComparison.empty_metrics()} for benchmark in missing]
+        benchmark_comparison.sort(key=lambda b: b['symbol'])
+    
+    return {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'returns': {
+            'ttwrr': ttwrr['annualized_return'],
+            'xirr': xirr.pop('portfolio'),
+            'xirr_by_account': xirr
+        },
+        'risk': risk_metrics,
+        'benchmarks': benchmark_comparison,
+        'daily_values': ttwrr['daily_values'],
+        # Pozice v těchto měnách nejsou v hodnotách bez kurzu započtené
+        'missing_fx_rates': sorted({
+            *ValuationStore.missing_fx_rates(db, portfolio.id, start_date, end_date),
+            *unconverted.values()
+        })
+    }
+
+
+def _base_currency_cashflows(
+    db: Session,
+    transactions: List,
+    base: str,
+    start_date: date,
+    end_date: date
+):
+    """
+    Převod gross_amount z měny obchodu do základní měny kurzem dne
+    obchodu. Vrací převedené transakce a skupiny XIRR (účty a portfolio),
+    jejichž cashflow nešlo převést, s měnou bez kurzu.
+    """
+    if not transactions:
+        return [], {}
+    days = pd.to_datetime([t.trade_time for t in transactions], utc=True)\
+        .tz_localize(None)\
+        .normalize()
+    currencies = [t.trade_currency for t in transactions]
+    fx = FxRates.matrix(db, currencies, base, ValuationEngine.date_index(start_date, end_date))
+    rows = fx.index.get_indexer(days)
+    rates = np.where(rows >= 0, fx.to_numpy()[rows, fx.columns.get_indexer(currencies)], np.nan)
+
+    converted, unconverted = [], {}
+    for t, rate in zip(transactions, rates):
+        if np.isnan(rate):
+            if t.type in PortfolioAnalytics.CASHFLOW_SIGNS:
+                unconverted[t.account_id] = unconverted['portfolio'] = t.trade_currency
+            continue
+        converted.append({**t._asdict(), 'gross_amount': float(t.gross_amount) * rate})
+    return converted, unconverted
+
+
+def _rolling_risk(
+    db: Session,
+    portfolio_id: uuid.UUID,
+    start_date: date,
+    end_date: date,
+    window: int
+) -> List[Dict]:
+    """
+    Klouzavé rizikové metriky po dnech. Stav výpočtu se drží v cache,
+    další požadavek jen přidá dny od posledního výpočtu.
+    """
+    key = analytics_cache.portfolio_key(portfolio_id, f"rolling-risk:{window}:{start_date}")
+    cached = analytics_cache.get_many([key]).get(key)
+    if cached and date.fromisoformat(cached['through']) >= end_date:
+        return [p for p in cached['points'] if p['date'] <= end_date.isoformat()]
+
+    # Dnešní a budoucí hodnoty jsou předběžné - cache končí nejpozději včerejškem
+    through = min(end_date, date.today() - timedelta(days=1))
+
+    if cached:
+        rolling = RollingRisk.from_state(cached['state'])
+        first_day = date.fromisoformat(cached['through']) + timedelta(days=1)
+        values = ValuationStore.get_daily_values(db, portfolio_id, first_day, end_date)
+        series = np.concatenate(([cached['last_value']], values.to_numpy()))
+        days = values.index.date
+        points = list(cached['points'])
+        last_value = cached['last_value']
+    else:
+        rolling = RollingRisk(window)
+        values = ValuationStore.get_daily_values(db, portfolio_id, start_date, end_date)
+        series = values.to_numpy()
+        days = values.index.date[1:]
+        points = []
+        last_value = None
+
+    # Období bez obchodního dne nemá hodnotu ani výnos
+    if not len(series):
+        return []
+
+    returns = RiskEngine.returns(series, dropna=False)
+    known = ~np.isnan(returns)
+    final = known & (days <= through)
+    metrics = rolling.extend(returns[final])
+    points += [{'date': day.isoformat(), **m} for day, m in zip(days[final], metrics)]
+
+    settled = values[values.index.date <= through]
+    if len(settled):
+        last_value = float(settled.iloc[-1])
+    if last_value is not None:
+        analytics_cache.set(key, {
+            'through': through.isoformat(),
+            'last_value': last_value,
+            'state': rolling.state(),
+            'points': points
+        })
+
+    # Předběžné dny se počítají nad kopií stavu a neukládají se
+    provisional = known & ~final
+    metrics = RollingRisk.from_state(rolling.state()).extend(returns[provisional])
+    return points + [{'date': day.isoformat(), **m} for day, m in zip(days[provisional], metrics)]
+
+
+def _compute_allocation(db: Session, portfolio_id: uuid.UUID) -> Dict:
+    """Výpočet alokace portfolia (bez cache)"""
+    # Získání aktuálních držeb (jeden řádek na pozici)
+    holdings = PortfolioData.get_current_holdings(db, portfolio_id)
+    # Pozice bez kurzu do základní měny nelze zvážit - vrátí se zvlášť
+    valued = [h for h in holdings if h['market_value'] is not None]
+    unvalued = [h for h in holdings if h['market_value'] is None]
+    
+    # Výpočet vah
+    total_value = sum(h['market_value'] for h in valued)
+    holdings_with_weight = [
+        {**h, 'weight': h['market_value'] / total_value if total_value else 0.0}
+        for h in valued
+    ]
+    
+    # Výpočet alokace
+    allocation = PortfolioAnalytics.calculate_asset_allocation(holdings_with_weight)
+    allocation['unvalued_holdings'] = [
+        {'symbol': h['symbol'], 'name': h['name'], 'currency': h['currency'], 'quantity': h['quantity']}
+        for h in unvalued
+    ]
+    allocation['missing_fx_rates'] = sorted({h['currency'] for h in unvalued})
+    
+    return allocation
+
+
 @router.get("/performance/")
 def get_portfolio_performance(
     portfolio_id: uuid.UUID,
     start_date: date,
     end_date: date = None,
     period: str = None,
+    benchmark_ids: List[uuid.UUID] = Query(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -49,86 +274,128 @@ def get_portfolio_performance(
         elif period == "5Y":
             start_date = end_date - timedelta(days=5*365)
     
-    # Získání všech transakcí
-    transactions = db.query(Transaction)\
-        .join(Account)\
-        .filter(
-            Account.portfolio_id == portfolio_id,
-            Transaction.trade_time.between(start_date, end_date)
-        ).all()
+    if not benchmark_ids:
+        benchmark_ids = [portfolio.benchmark_id] if portfolio.benchmark_id else []
+    benchmark_ids = sorted(set(benchmark_ids), key=str)
     
-    # Získání cen aktiv
-    prices = db.query(Price)\
-        .join(Asset)\
-        .join(Transaction, Transaction.asset_id == Asset.id)\
+    # Nová cena nebo kurz v období (i dnešní close místo předběžné hodnoty)
+    # vede na nový klíč, opravy starších dní maže CacheInvalidation
+    held = select(Transaction.asset_id)\
         .join(Account)\
+        .where(Account.portfolio_id == portfolio_id)
+    compared = select(Asset.id)\
+        .join(Benchmark, Benchmark.symbol == Asset.symbol)\
+        .where(Benchmark.id.in_(benchmark_ids))
+    prices = PriceRepository.latest_date(db, held.union(compared))
+    rates = FxRates.latest_date(db, portfolio.base_currency)
+    key = ReportCacheService.make_key(
+        'performance',
+        start_date=start_date,
+        end_date=end_date,
+        base_currency=portfolio.base_currency,
+        benchmarks=",".join(str(b) for b in benchmark_ids) or None,
+        prices=min(prices, end_date) if prices else None,
+        fx_rates=min(rates, end_date) if rates else None
+    )
+    return analytics_cache.get_or_compute(
+        analytics_cache.portfolio_key(portfolio_id, key),
+        lambda: ReportCacheService.get_or_compute(
+            db,
+            portfolio_id,
+            key,
+            lambda: _compute_performance(db, portfolio, start_date, end_date, benchmark_ids)
+        )
+    )
+
+
+@router.get("/allocation/")
+def get_portfolio_allocation(
+    portfolio_id: uuid.UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Získání alokace portfolia
+    """
+    # Kontrola přístupu k portfoliu
+    portfolio = db.query(Portfolio)\
         .filter(
-            Account.portfolio_id == portfolio_id,
-            Price.date.between(start_date, end_date)
-        ).all()
+            Portfolio.id == portfolio_id,
+            Portfolio.user_id == current_user.id
+        ).first()
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    # Výpočet TTWRR
-    ttwrr = PortfolioAnalytics.calculate_ttwrr(
-        [t.__dict__ for t in transactions],
-        [p.__dict__ for p in prices],
-        start_date,
-        end_date
+    # Nová cena kteréhokoli drženého aktiva vede na nový klíč
+    held = select(Transaction.asset_id)\
+        .join(Account)\
+        .where(Account.portfolio_id == portfolio_id)\
+        .distinct()
+    key = ReportCacheService.make_key(
+        'allocation',
+        base_currency=portfolio.base_currency,
+        prices=PriceRepository.latest_date(db, held)
     )
-    
-    # Výpočet XIRR
-    current_value = ttwrr['daily_values'][-1]['value'] if ttwrr['daily_values'] else 0
-    xirr = PortfolioAnalytics.calculate_xirr(
-        [t.__dict__ for t in transactions],
-        current_value
+    return analytics_cache.get_or_compute(
+        analytics_cache.portfolio_key(portfolio_id, key),
+        lambda: ReportCacheService.get_or_compute(
+            db,
+            portfolio_id,
+            key,
+            lambda: _compute_allocation(db, portfolio_id)
+        )
     )
+
+
+@router.get("/risk/rolling/")
+def get_rolling_risk(
+    portfolio_id: uuid.UUID,
+    start_date: date,
+    end_date: date = None,
+    window: int = 30,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Klouzavá volatilita, Sharpe, Sortino a drawdown za okno 30/90/252 dní
+    """
+    portfolio = db.query(Portfolio)\
+        .filter(
+            Portfolio.id == portfolio_id,
+            Portfolio.user_id == current_user.id
+        ).first()
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    # Výpočet rizikových metrik
-    daily_returns = [
-        (v['value'] - prev['value']) / prev['value']
-        for v, prev in zip(ttwrr['daily_values'][1:], ttwrr['daily_values'][:-1])
-    ]
-    risk_metrics = PortfolioAnalytics.calculate_risk_metrics(daily_returns)
-    
-    # Benchmark comparison (pokud je nastaven)
-    benchmark_comparison = None
-    if portfolio.benchmark_id:
-        benchmark_prices = db.query(Price)\
-            .filter(
-                Price.asset_id == portfolio.benchmark_id,
-                Price.date.between(start_date, end_date)
-            ).all()
-        
-        if benchmark_prices:
-            benchmark_comparison = PortfolioAnalytics.calculate_benchmark_comparison(
-                ttwrr['daily_values'],
-                [{'date': p.date, 'value': p.close} for p in benchmark_prices]
-            )
+    if window not in RollingRisk.WINDOWS:
+        raise HTTPException(status_code=400, detail="Invalid window")
+    
+    if not end_date:
+        end_date = date.today()
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="Invalid period")
     
     return {
-        'period': {
-            'start_date': start_date,
-            'end_date': end_date
-        },
-        'returns': {
-            'ttwrr': ttwrr['annualized_return'],
-            'xirr': xirr
-        },
-        'risk': risk_metrics,
-        'benchmark': benchmark_comparison,
-        'daily_values': ttwrr['daily_values']
+        'window': window,
+        'series': _rolling_risk(db, portfolio_id, start_date, end_date, window),
+        'missing_fx_rates': ValuationStore.missing_fx_rates(db, portfolio_id, start_date, end_date)
     }
 
 
-@router.get("/allocation/")
-def get_portfolio_allocation(
+@router.get("/positions/")
+def get_portfolio_positions(
     portfolio_id: uuid.UUID,
+    method: str = PositionLedger.FIFO,
+    as_of: date = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
-    Získání alokace portfolia
+    Pozice po lotech - nákladová cena (FIFO nebo průměrná), realizovaný
+    a nerealizovaný zisk v měně obchodu (currency). Tržní cena se do měny
+    obchodu převede kurzem ke dni ocenění, bez kurzu zůstane pozice
+    neoceněná a měna se vrátí v missing_fx_rates.
     """
-    # Kontrola přístupu k portfoliu
     portfolio = db.query(Portfolio)\
         .filter(
             Portfolio.id == portfolio_id,
@@ -137,34 +404,150 @@ def get_portfolio_allocation(
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    # Získání aktuálních držeb
-    holdings = db.query(
-        Asset.id,
-        Asset.symbol,
-        Asset.name,
-        Asset.type,
-        Asset.sector,
-        Asset.region,
-        Asset.currency,
-        Transaction.quantity.label('quantity'),
-        Price.close.label('price'),
-        (Transaction.quantity * Price.close).label('market_value')
-    ).join(Transaction)\
+    if method not in PositionLedger.METHODS:
+        raise HTTPException(status_code=400, detail="Invalid method")
+    
+    ledger = LedgerStore.get(db, portfolio_id, method, as_of)
+    asset_ids = [uuid.UUID(asset_id) for asset_id in ledger.asset_ids]
+    
+    # Ocenění poslední cenou, k zadanému dni poslední cenou do tohoto dne
+    if as_of:
+        positions, _, closes = PriceRepository.get_closes(db, asset_ids, as_of, as_of)
+        prices = {str(asset_ids[i]): float(close) for i, close in zip(positions, closes)}
+    else:
+        prices = {
+            str(asset_id): float(price['close'])
+            for asset_id, price in PriceRepository.get_latest(db, asset_ids).items()
+        }
+    assets = {
+        str(row.id): row
+        for row in db.query(Asset.id, Asset.symbol, Asset.currency).filter(Asset.id.in_(asset_ids))
+    }
+    currencies, missing = _trade_currency_prices(db, portfolio_id, assets, prices, as_of or date.today())
+    
+    return {
+        'method': method,
+        'as_of': as_of.isoformat() if as_of else None,
+        'positions': [
+            {
+                **position,
+                'symbol': assets[position['asset_id']].symbol if position['asset_id'] in assets else None,
+                'currency': currencies.get(position['asset_id'])
+            }
+            for position in ledger.positions(prices)
+        ],
+        'missing_fx_rates': missing
+    }
+
+
+def _trade_currency_prices(
+    db: Session,
+    portfolio_id: uuid.UUID,
+    assets: Dict,
+    prices: Dict[str, float],
+    day: date
+):
+    """
+    Převede ceny (v měně aktiva) do měny obchodu, ve které kniha vede
+    náklady - vrací měnu obchodu aktiv a měny bez kurzu. Ceny bez kurzu
+    a ceny aktiv obchodovaných ve více měnách se z prices odeberou.
+    """
+    rows = db.query(Transaction.asset_id, Transaction.trade_currency)\
         .join(Account)\
-        .join(Price)\
         .filter(
             Account.portfolio_id == portfolio_id,
-            Transaction.quantity > 0
-        ).all()
+            Transaction.type.in_(TRADE_SIGNS),
+            Transaction.asset_id.in_([uuid.UUID(asset_id) for asset_id in assets])
+        ).distinct()\
+        .all()
+    traded: Dict[str, set] = {}
+    for row in rows:
+        traded.setdefault(str(row.asset_id), set()).add(row.trade_currency)
+    # Náklady ve více měnách nemají společnou měnu
+    currencies = {asset_id: next(iter(c)) for asset_id, c in traded.items() if len(c) == 1}
+
+    dates = ValuationEngine.date_index(day, day)
+    missing = set()
+    for target in set(currencies.values()):
+        priced = [a for a in prices if currencies.get(a) == target and a in assets]
+        fx = FxRates.matrix(db, {assets[a].currency for a in priced}, target, dates).iloc[0]
+        for asset_id in priced:
+            rate = fx[assets[asset_id].currency]
+            if np.isnan(rate):
+                missing.add(assets[asset_id].currency)
+                del prices[asset_id]
+            else:
+                prices[asset_id] *= float(rate)
+    for asset_id in [a for a in prices if a not in currencies]:
+        del prices[asset_id]
+    return currencies, sorted(missing)
+
+
+@router.get("/prices/")
+def get_portfolio_price_history(
+    portfolio_id: uuid.UUID,
+    start_date: date,
+    end_date: date = None,
+    resolution: str = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Cenové řady aktiv portfolia pro grafy (rozlišení podle délky období)
+    """
+    portfolio = db.query(Portfolio)\
+        .filter(
+            Portfolio.id == portfolio_id,
+            Portfolio.user_id == current_user.id
+        ).first()
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    # Výpočet vah
-    total_value = sum(h.market_value for h in holdings)
-    holdings_with_weight = [
-        {**h.__dict__, 'weight': float(h.market_value / total_value)}
-        for h in holdings
+    if resolution not in (None, PriceRepository.DAILY, PriceRepository.WEEKLY, PriceRepository.MONTHLY):
+        raise HTTPException(status_code=400, detail="Invalid resolution")
+    
+    if not end_date:
+        end_date = date.today()
+    resolution = resolution or PriceRepository.resolution_for(start_date, end_date)
+    
+    asset_ids = [
+        row.asset_id for row in db.query(Transaction.asset_id)
+        .join(Account)
+        .filter(Account.portfolio_id == portfolio_id)
+        .distinct()
     ]
+    history = PriceRepository.get_history(db, asset_ids, start_date, end_date, resolution)
     
-    # Výpočet alokace
-    allocation = PortfolioAnalytics.calculate_asset_allocation(holdings_with_weight)
+    return {
+        'resolution': resolution,
+        'series': {
+            str(asset_id): [
+                {'date': d.date().isoformat(), 'close': close}
+                for d, close in zip(group['date'], group['close'])
+            ]
+            for asset_id, group in history.groupby('asset_id', sort=False)
+        }
+    }
+
+
+@router.get("/cache/")
+def get_cache_stats(
+    portfolio_id: uuid.UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Statistiky cache analytických reportů
+    """
+    portfolio = db.query(Portfolio)\
+        .filter(
+            Portfolio.id == portfolio_id,
+            Portfolio.user_id == current_user.id
+        ).first()
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    return allocation
\ No newline at end of file
+    return {
+        'memory': analytics_cache.stats(),
+        'database': ReportCacheService.stats(db, portfolio_id)
+    }
@@ -1,97 +1,131 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from typing import Optional
+import uuid
 
 from app.core.auth import get_current_active_user, get_db
 from app.models.user import User
-from app.services.brokers.fio import FIOBrokerParser
+from app.models.models import Portfolio, Account
+from app.services.brokers.base import BrokerParser
+from app.services.brokers.pipeline import ImportPipeline
+from app.services.brokers.registry import BrokerRegistry
+from app.services.uploads import UploadIngest
+from app.services.import_jobs import ImportJob, import_jobs
 
 router = APIRouter()
 
 
-@router.post("/fio/preview")
-async def preview_fio_import(
-    file: UploadFile,
-    current_user: User = Depends(get_current_active_user)
-):
-    """
-    Náhled importu z FIO brokera
-    """
+def _get_parser(broker: str) -> BrokerParser:
+    parser = BrokerRegistry.get(broker)
+    if parser is None:
+        raise HTTPException(status_code=404, detail="Broker not supported")
+    return parser
+
+
+def _check_csv(file: UploadFile) -> None:
     if not file.filename.endswith('.csv'):
         raise HTTPException(
             status_code=400,
             detail="Invalid file type. Only CSV files are supported."
         )
 
+
+@router.get("/")
+def list_brokers(
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Seznam podporovaných brokerů
+    """
+    return [parser.describe() for parser in BrokerRegistry.all()]
+
+
+@router.post("/detect")
+async def detect_broker(
+    file: UploadFile,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Rozpoznání brokera podle hlavičky souboru
+    """
+    _check_csv(file)
+
     try:
-        # Uložení souboru do dočasného umístění
-        content = await file.read()
-        with open("temp.csv", "wb") as f:
-            f.write(content)
+        async with UploadIngest.stored(file) as upload:
+            parser = await run_in_threadpool(BrokerRegistry.detect, upload.path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Parsování CSV
-        transactions = FIOBrokerParser.parse_csv("temp.csv")
+    if parser is None:
+        raise HTTPException(status_code=400, detail="Unknown file format")
+    return parser.describe()
 
-        # Vrácení prvních 100 transakcí pro náhled
-        return {
-            "total_transactions": len(transactions),
-            "preview": transactions[:100]
-        }
 
+@router.post("/{broker}/preview")
+async def preview_broker_import(
+    broker: str,
+    file: UploadFile,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Náhled importu z exportu brokera
+    """
+    parser = _get_parser(broker)
+    _check_csv(file)
+
+    try:
+        async with UploadIngest.stored(file) as upload:
+            return await run_in_threadpool(
+                ImportPipeline.preview,
+                parser,
+                upload.path,
+                preview_rows=100,
+                stash_user=current_user.id
+            )
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Error parsing file: {str(e)}"
         )
-    finally:
-        import os
-        if os.path.exists("temp.csv"):
-            os.remove("temp.csv")
 
 
-@router.post("/fio/import")
-async def import_fio_data(
-    file: UploadFile,
-    account_id: str,
+@router.post("/{broker}/import", response_model=ImportJob, status_code=202)
+async def import_broker_data(
+    broker: str,
+    account_id: uuid.UUID,
+    checksum: str,
+    file: Optional[UploadFile] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
-    Import dat z FIO brokera
+    Zařazení importu z exportu brokera do fronty, stav na /import/jobs/{job_id}.
+    Soubor je potřeba jen pokud uložený náhled vypršel.
     """
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid file type. Only CSV files are supported."
-        )
+    parser = _get_parser(broker)
+
+    # Ověření přístupu k účtu
+    account = db.query(Account)\
+        .join(Portfolio)\
+        .filter(
+            Account.id == account_id,
+            Portfolio.user_id == current_user.id
+        ).first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    job = import_jobs.submit_stashed(checksum, account.id, current_user.id)
+    if job is not None:
+        return job
+
+    if file is None:
+        raise HTTPException(status_code=404, detail="Import preview not found, upload the file again")
+    _check_csv(file)
 
     try:
-        # Uložení souboru do dočasného umístění
-        content = await file.read()
-        with open("temp.csv", "wb") as f:
-            f.write(content)
-
-        # Parsování CSV
-        transactions = FIOBrokerParser.parse_csv("temp.csv")
-
-        # TODO: Import transakcí do DB
-        # Pro každou transakci:
-        # 1. Zkontrolovat existenci symbolu/aktiva
-        # 2. Vytvořit nebo aktualizovat aktivum
-        # 3. Vytvořit transakci
-        # 4. Pro dividendy vytvořit dividend záznam
-        # 5. Pro FX transakce zaznamenat převod měny
-
-        return {
-            "status": "success",
-            "imported_transactions": len(transactions)
-        }
+        upload = await UploadIngest.save(file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Error importing file: {str(e)}"
-        )
-    finally:
-        import os
-        if os.path.exists("temp.csv"):
-            os.remove("temp.csv")
\ No newline at end of file
+    return import_jobs.submit_file(parser, upload.path, checksum, account.id, current_user.id)
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 from datetime import datetime, date
 
@@ -8,15 +8,27 @@ from app.core.auth import get_current_active_user, get_db
 from app.models.user import User
 from app.models.models import Dividend, Account, Portfolio, Asset
 from app.schemas.models import DividendCreate, DividendUpdate, Dividend as DividendSchema
+from app.services.invalidation import CacheInvalidation
+from app.services.pagination import KeysetPagination
 
 router = APIRouter()
 
+# Nejnovější výplaty první
+dividends_page = KeysetPagination(
+    "dividends",
+    [Dividend.pay_date, Dividend.id],
+    descending=True
+)
+
 
 @router.get("/dividends/", response_model=List[DividendSchema])
 def read_dividends(
     account_id: uuid.UUID,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: bool = False,
     start_date: date = None,
     end_date: date = None,
     current_user: User = Depends(get_current_active_user),
@@ -39,12 +51,15 @@ def read_dividends(
     if end_date:
         query = query.filter(Dividend.pay_date <= end_date)
     
-    dividends = query.order_by(Dividend.pay_date.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
-    return dividends
+    return dividends_page.respond(
+        query,
+        response,
+        DividendSchema,
+        cursor=cursor,
+        limit=limit,
+        skip=skip,
+        stream=stream
+    )
 
 
 @router.post("/dividends/", response_model=DividendSchema)
@@ -78,6 +93,7 @@ def create_dividend(
     
     db_dividend = Dividend(**dividend.model_dump())
     db.add(db_dividend)
+    CacheInvalidation.portfolios_changed(db, [account.portfolio_id])
     db.commit()
     db.refresh(db_dividend)
     return db_dividend
@@ -126,9 +142,16 @@ def update_dividend(
             detail="Net amount does not match gross amount minus withholding tax"
         )
     
+    affected_portfolios = [db_dividend.account.portfolio_id]
+    if dividend.account_id != db_dividend.account_id:
+        affected_portfolios.append(
+            db.query(Account.portfolio_id).filter(Account.id == dividend.account_id).scalar()
+        )
+    
     for key, value in dividend.model_dump(exclude_unset=True).items():
         setattr(db_dividend, key, value)
     
+    CacheInvalidation.portfolios_changed(db, [p for p in affected_portfolios if p])
     db.commit()
     db.refresh(db_dividend)
     return db_dividend
@@ -150,6 +173,7 @@ def delete_dividend(
     if dividend is None:
         raise HTTPException(status_code=404, detail="Dividend not found")
     
+    CacheInvalidation.portfolios_changed(db, [dividend.account.portfolio_id])
     db.delete(dividend)
     db.commit()
     return {"ok": True}
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+import uuid
+from datetime import date
+
+from app.core.auth import get_current_active_user, get_db
+from app.models.user import User
+from app.models.models import Portfolio
+from app.services.export import ColumnarExport
+
+router = APIRouter()
+
+
+def _verify_portfolio_access(
+    db: Session,
+    portfolio_id: uuid.UUID,
+    current_user: User
+) -> Portfolio:
+    portfolio = db.query(Portfolio)\
+        .filter(
+            Portfolio.id == portfolio_id,
+            Portfolio.user_id == current_user.id
+        ).first()
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    return portfolio
+
+
+def _response(query, schema, fmt: str, name: str) -> StreamingResponse:
+    if fmt not in ColumnarExport.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    extension = "arrows" if fmt == ColumnarExport.ARROW else "parquet"
+    return StreamingResponse(
+        ColumnarExport.stream(query, schema, fmt),
+        media_type=ColumnarExport.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+    )
+
+
+@router.get("/transactions")
+def export_transactions(
+    portfolio_id: uuid.UUID,
+    format: str = ColumnarExport.ARROW,
+    start_date: date = None,
+    end_date: date = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Export transakcí portfolia (Arrow IPC stream nebo Parquet)
+    """
+    _verify_portfolio_access(db, portfolio_id, current_user)
+    return _response(
+        ColumnarExport.transactions_query(portfolio_id, start_date, end_date),
+        ColumnarExport.TRANSACTION_SCHEMA,
+        format,
+        "transactions"
+    )
+
+
+@router.get("/prices")
+def export_prices(
+    portfolio_id: uuid.UUID,
+    format: str = ColumnarExport.ARROW,
+    start_date: date = None,
+    end_date: date = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Export denních cen aktiv portfolia (Arrow IPC stream nebo Parquet)
+    """
+    _verify_portfolio_access(db, portfolio_id, current_user)
+    return _response(
+        ColumnarExport.prices_query(portfolio_id, start_date, end_date),
+        ColumnarExport.PRICE_SCHEMA,
+        format,
+        "prices"
+    )
@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import json
-from typing import List
+from typing import List, Optional
 import uuid
-import tempfile
-import os
 
 from app.core.auth import get_current_active_user, get_db
 from app.models.user import User
 from app.services.csv_import import CSVImportService, CSVMapping, CSVImportPreview
-from app.models.models import Portfolio, Account, Transaction
+from app.models.models import Portfolio, Account
+from app.services.brokers.pipeline import ImportPipeline
+from app.services.brokers.presets import MappedCSVParser
+from app.services.uploads import UploadIngest
+from app.services.import_jobs import ImportJob, import_jobs
 
 router = APIRouter()
 
@@ -24,45 +27,60 @@ def get_import_presets():
 async def preview_import(
     file: UploadFile = File(...),
     mapping_json: str = Form(...),
-    current_user: User = Depends(get_current_active_user)
+    account_id: Optional[uuid.UUID] = Form(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
-    Náhled importu CSV souboru
+    Náhled importu CSV souboru (se zadaným účtem včetně duplicit
+    proti již uloženým transakcím). Zpracovaná data se uloží pod
+    kontrolním součtem pro následný import.
     """
+    if account_id is not None:
+        account = db.query(Account)\
+            .join(Portfolio)\
+            .filter(
+                Account.id == account_id,
+                Portfolio.user_id == current_user.id
+            ).first()
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
+
     try:
         mapping = CSVMapping.model_validate_json(mapping_json)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid mapping: {str(e)}")
 
-    # Uložení souboru do dočasného adresáře
-    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        temp_file.flush()
-
-        try:
-            preview = CSVImportService.preview_import(
-                temp_file.name,
-                mapping,
-                preview_rows=100
+    try:
+        async with UploadIngest.stored(file) as upload:
+            preview = await run_in_threadpool(
+                ImportPipeline.preview,
+                MappedCSVParser(mapping),
+                upload.path,
+                preview_rows=100,
+                db=db,
+                account_id=account_id,
+                stash_user=current_user.id
             )
-        finally:
-            os.unlink(temp_file.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return preview
 
 
-@router.post("/import/execute")
+@router.post("/import/execute", response_model=ImportJob, status_code=202)
 async def execute_import(
-    file: UploadFile = File(...),
-    mapping_json: str = Form(...),
     checksum: str = Form(...),
     account_id: uuid.UUID = Form(...),
+    file: Optional[UploadFile] = File(None),
+    mapping_json: Optional[str] = Form(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
-    Provedení importu CSV souboru
+    Zařazení importu do fronty, stav na /import/jobs/{job_id}.
+    Stačí kontrolní součet z náhledu; soubor s mapováním je potřeba
+    jen pokud uložený náhled vypršel.
     """
     # Ověření přístupu k účtu
     account = db.query(Account)\
@@ -74,51 +92,43 @@ async def execute_import(
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
+    job = import_jobs.submit_stashed(checksum, account.id, current_user.id)
+    if job is not None:
+        return job
+
+    if file is None or mapping_json is None:
+        raise HTTPException(status_code=404, detail="Import preview not found, upload the file again")
+
     try:
         mapping = CSVMapping.model_validate_json(mapping_json)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid mapping: {str(e)}")
 
-    # Uložení souboru do dočasného adresáře
-    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        temp_file.flush()
-
-        try:
-            # Import dat
-            imported_data = CSVImportService.import_csv(
-                temp_file.name,
-                mapping,
-                checksum
-            )
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        finally:
-            os.unlink(temp_file.name)
-
-    # Vytvoření transakcí v DB
-    transactions = []
-    for row in imported_data:
-        transaction = Transaction(
-            account_id=account_id,
-            trade_time=row['date'],
-            type=row['type'],
-            symbol=row['symbol'],
-            quantity=row['quantity'],
-            price=row['price'],
-            fee=row.get('fee', 0),
-            tax=row.get('tax', 0),
-            gross_amount=row['gross_amount'],
-            currency=row['currency'],
-            notes=row.get('notes')
-        )
-        transactions.append(transaction)
-
-    db.add_all(transactions)
-    db.commit()
-
-    return {
-        "status": "success",
-        "imported_rows": len(transactions)
-    }
\ No newline at end of file
+    try:
+        upload = await UploadIngest.save(file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Import dat po dávkách na pozadí - zápis se potvrdí až po ověření
+    # kontrolního součtu na konci souboru
+    return import_jobs.submit_file(
+        MappedCSVParser(mapping),
+        upload.path,
+        checksum,
+        account.id,
+        current_user.id
+    )
+
+
+@router.get("/import/jobs/{job_id}", response_model=ImportJob)
+def get_import_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Stav importu na pozadí (zpracované a zapsané řádky, rychlost, chyba)
+    """
+    job = import_jobs.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
@@ -1,29 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
 from app.core.auth import get_current_active_user, get_db
 from app.models.models import Portfolio
 from app.models.user import User
 from app.schemas.user import PortfolioCreate, PortfolioUpdate, Portfolio as PortfolioSchema
+from app.services.pagination import KeysetPagination
 
 router = APIRouter()
 
+portfolios_page = KeysetPagination("portfolios", [Portfolio.created_at, Portfolio.id])
+
 
 @router.get("/portfolios/", response_model=List[PortfolioSchema])
 def read_portfolios(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    portfolios = db.query(Portfolio)\
-        .filter(Portfolio.user_id == current_user.id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return portfolios
+    query = db.query(Portfolio).filter(Portfolio.user_id == current_user.id)
+    return portfolios_page.respond(
+        query,
+        response,
+        PortfolioSchema,
+        cursor=cursor,
+        limit=limit,
+        skip=skip,
+        stream=stream
+    )
 
 
 @router.post("/portfolios/", response_model=PortfolioSchema)
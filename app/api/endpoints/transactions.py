@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 from datetime import datetime
 
@@ -8,9 +8,19 @@ from app.core.auth import get_current_active_user, get_db
 from app.models.user import User
 from app.models.models import Transaction, Account, Portfolio, Asset
 from app.schemas.models import TransactionCreate, TransactionUpdate, Transaction as TransactionSchema
+from app.services.fingerprint import TransactionFingerprint
+from app.services.invalidation import CacheInvalidation
+from app.services.pagination import KeysetPagination
 
 router = APIRouter()
 
+# Nejnovější transakce první
+transactions_page = KeysetPagination(
+    "transactions",
+    [Transaction.trade_time, Transaction.id],
+    descending=True
+)
+
 
 def verify_account_access(
     db: Session,
@@ -31,13 +41,20 @@ def verify_account_access(
 @router.get("/transactions/", response_model=List[TransactionSchema])
 def read_transactions(
     account_id: uuid.UUID,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: bool = False,
     start_date: datetime = None,
     end_date: datetime = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Transakce účtu po stránkách (další stránka přes kurzor z hlavičky
+    X-Next-Cursor), se stream=true všechny jako NDJSON
+    """
     verify_account_access(db, account_id, current_user)
     
     query = db.query(Transaction).filter(Transaction.account_id == account_id)
@@ -47,12 +64,15 @@ def read_transactions(
     if end_date:
         query = query.filter(Transaction.trade_time <= end_date)
     
-    transactions = query.order_by(Transaction.trade_time.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
-    return transactions
+    return transactions_page.respond(
+        query,
+        response,
+        TransactionSchema,
+        cursor=cursor,
+        limit=limit,
+        skip=skip,
+        stream=stream
+    )
 
 
 @router.post("/transactions/", response_model=TransactionSchema)
@@ -89,7 +109,9 @@ def create_transaction(
         )
     
     db_transaction = Transaction(**transaction.model_dump())
+    db_transaction.fingerprint = int(TransactionFingerprint.for_transactions([db_transaction])[0])
     db.add(db_transaction)
+    CacheInvalidation.portfolios_changed(db, [account.portfolio_id], transaction.trade_time.date())
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
@@ -130,9 +152,14 @@ def update_transaction(
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    # Původní stav pro zneplatnění materializovaných hodnot
+    affected_portfolios = [db_transaction.account.portfolio_id]
+    affected_from = db_transaction.trade_time.date()
+    
     # Ověření přístupu k novému účtu, pokud se mění
     if transaction.account_id != db_transaction.account_id:
-        verify_account_access(db, transaction.account_id, current_user)
+        new_account = verify_account_access(db, transaction.account_id, current_user)
+        affected_portfolios.append(new_account.portfolio_id)
     
     # Ověření existence aktiva
     if transaction.asset_id != db_transaction.asset_id:
@@ -154,7 +181,13 @@ def update_transaction(
     
     for key, value in transaction.model_dump(exclude_unset=True).items():
         setattr(db_transaction, key, value)
+    db_transaction.fingerprint = int(TransactionFingerprint.for_transactions([db_transaction])[0])
     
+    CacheInvalidation.portfolios_changed(
+        db,
+        affected_portfolios,
+        min(affected_from, transaction.trade_time.date())
+    )
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
@@ -176,6 +209,11 @@ def delete_transaction(
     if transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    CacheInvalidation.portfolios_changed(
+        db,
+        [transaction.account.portfolio_id],
+        transaction.trade_time.date()
+    )
     db.delete(transaction)
     db.commit()
     return {"ok": True}
\ No newline at end of file
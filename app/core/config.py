@@ -19,6 +19,25 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Analytics cache
+    ANALYTICS_CACHE_TTL: int = 3600  # sekundy
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 1024  # lokální LRU v každém procesu
+    ANALYTICS_CACHE_LOCK_TIMEOUT: int = 30  # sekundy, single-flight výpočtu
+    TRADING_CALENDAR: str = "XNYS"  # burza pro obchodní dny analytiky (XNYS, XPRA, XETR)
+    
+    # Import
+    IMPORT_CHUNK_SIZE: int = 50000  # řádků CSV na jednu dávku
+    IMPORT_BATCH_SIZE: int = 10000  # řádků na jeden COPY / executemany
+    IMPORT_WORKERS: int = 2  # vlákna pro importy na pozadí
+    IMPORT_JOB_TTL: int = 24 * 3600  # sekundy, jak dlouho se drží stav dokončené úlohy
+    IMPORT_STASH_DIR: Optional[str] = None  # uložené náhledy importu (výchozí v temp adresáři)
+    IMPORT_STASH_TTL: int = 3600  # sekundy platnosti uloženého náhledu
+    STREAM_BATCH_SIZE: int = 1000  # řádků na jednu dávku NDJSON streamu
+    EXPORT_BATCH_SIZE: int = 50000  # řádků na jeden record batch exportu
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bajtů čtených z uploadu najednou
+    UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    UPLOAD_DIR: Optional[str] = None  # výchozí adresář pro dočasné soubory
+    
     # Security
     CORS_ORIGINS: list[str] = ["*"]
     ENCRYPTION_KEY: str  # Pro šifrování citlivých dat v DB
@@ -0,0 +1,54 @@
+"""portfolio values
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-10-20 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Materializované denní hodnoty portfolia (partitionované podle času)
+    op.create_table(
+        'portfolio_values',
+        sa.Column('portfolio_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('value', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('portfolio_id', 'date')
+    )
+
+    # Konverze na hypertabulku
+    op.execute(
+        """
+        SELECT create_hypertable('portfolio_values', 'date',
+            chunk_time_interval => INTERVAL '1 year',
+            if_not_exists => TRUE);
+        """
+    )
+
+    # Watermark - do kterého dne jsou materializované hodnoty platné
+    op.create_table(
+        'portfolio_valuation_state',
+        sa.Column('portfolio_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('valid_through', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('portfolio_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('portfolio_valuation_state')
+    op.drop_table('portfolio_values')
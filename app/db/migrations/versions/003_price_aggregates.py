@@ -0,0 +1,118 @@
+"""price aggregates
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-10-24 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Poslední cena každého aktiva - udržovaná triggerem nad prices
+    op.create_table(
+        'latest_prices',
+        sa.Column('asset_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('close', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.ForeignKeyConstraint(['asset_id'], ['assets.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('asset_id')
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION refresh_latest_price() RETURNS trigger AS $$
+        DECLARE
+            target uuid;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                target := OLD.asset_id;
+            ELSE
+                target := NEW.asset_id;
+            END IF;
+
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO latest_prices (asset_id, date, close, currency)
+                VALUES (NEW.asset_id, NEW.date, NEW.close, NEW.currency)
+                ON CONFLICT (asset_id) DO UPDATE
+                    SET date = EXCLUDED.date,
+                        close = EXCLUDED.close,
+                        currency = EXCLUDED.currency
+                    WHERE latest_prices.date <= EXCLUDED.date;
+                RETURN NULL;
+            END IF;
+
+            -- Úprava nebo smazání - přepočet z indexu (asset_id, date)
+            DELETE FROM latest_prices WHERE asset_id = target;
+            INSERT INTO latest_prices (asset_id, date, close, currency)
+            SELECT asset_id, date, close, currency
+            FROM prices
+            WHERE asset_id = target
+            ORDER BY date DESC
+            LIMIT 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER prices_latest_price
+        AFTER INSERT OR UPDATE OR DELETE ON prices
+        FOR EACH ROW EXECUTE FUNCTION refresh_latest_price();
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO latest_prices (asset_id, date, close, currency)
+        SELECT DISTINCT ON (asset_id) asset_id, date, close, currency
+        FROM prices
+        ORDER BY asset_id, date DESC;
+        """
+    )
+
+    # Týdenní a měsíční agregace (poslední close v intervalu). Nematerializované
+    # intervaly se dopočítávají při čtení, historii naplní první běh politiky.
+    for name, bucket in (('prices_weekly', '1 week'), ('prices_monthly', '1 month')):
+        op.execute(
+            f"""
+            CREATE MATERIALIZED VIEW {name}
+            WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+            SELECT asset_id,
+                time_bucket(INTERVAL '{bucket}', date) AS bucket,
+                max(date) AS date,
+                last(close, date) AS close,
+                last(currency, date) AS currency
+            FROM prices
+            GROUP BY asset_id, bucket
+            WITH NO DATA;
+            """
+        )
+        op.execute(f"CREATE INDEX ix_{name}_asset_bucket ON {name} (asset_id, bucket)")
+        op.execute(
+            f"""
+            SELECT add_continuous_aggregate_policy('{name}',
+                start_offset => NULL,
+                end_offset => INTERVAL '1 day',
+                schedule_interval => INTERVAL '1 day');
+            """
+        )
+
+
+def downgrade() -> None:
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS prices_monthly')
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS prices_weekly')
+    op.execute('DROP TRIGGER IF EXISTS prices_latest_price ON prices')
+    op.execute('DROP FUNCTION IF EXISTS refresh_latest_price()')
+    op.drop_table('latest_prices')
@@ -0,0 +1,88 @@
+"""transaction fingerprint
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-10-28 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+import io
+
+from alembic import op
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 50000
+
+
+def _fingerprints(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Otisky transakcí ve tvaru ze dne migrace (kopie
+    TransactionFingerprint.compute) - pozdější změna aplikace
+    nesmí změnit, co migrace zapíše
+    """
+    times = pd.to_datetime(frame['trade_time'], utc=True).dt.tz_localize(None)
+
+    def number(values):
+        return pd.to_numeric(values).astype("float64").round(8).astype(str)
+
+    key = times.dt.floor("s").dt.strftime("%Y-%m-%d %H:%M:%S") \
+        + "|" + frame['type'].astype(str).str.upper() \
+        + "|" + frame['asset_id'].astype(str) \
+        + "|" + number(frame['quantity']) \
+        + "|" + number(frame['price'])
+    return pd.util.hash_pandas_object(key, index=False).to_numpy().view("int64")
+
+
+def upgrade() -> None:
+    # Otisk transakce pro detekci duplicit při importu
+    op.add_column('transactions', sa.Column('fingerprint', sa.BigInteger(), nullable=True))
+
+    # Doplnění otisků existujících transakcí - dávky se čtou kurzorem,
+    # otisky se zapíší přes COPY do dočasné tabulky a do transactions
+    # jedním UPDATE
+    bind = op.get_bind()
+    op.execute("CREATE TEMPORARY TABLE transaction_fingerprints (id uuid NOT NULL, fingerprint bigint NOT NULL)")
+    result = bind.execute(
+        sa.text("SELECT id, trade_time, type, asset_id, quantity, price FROM transactions")
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    cursor = bind.connection.dbapi_connection.cursor()
+    try:
+        for rows in result.mappings().partitions():
+            frame = pd.DataFrame(rows)
+            buffer = io.StringIO()
+            pd.DataFrame({'id': frame['id'], 'fingerprint': _fingerprints(frame)})\
+                .to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cursor.copy_expert("COPY transaction_fingerprints (id, fingerprint) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+    op.execute(
+        """
+        UPDATE transactions AS t
+        SET fingerprint = f.fingerprint
+        FROM transaction_fingerprints AS f
+        WHERE t.id = f.id
+        """
+    )
+    op.execute("DROP TABLE transaction_fingerprints")
+
+    # Index až po doplnění - UPDATE ho nemusí průběžně udržovat
+    op.create_index(
+        'ix_transactions_account_fingerprint',
+        'transactions',
+        ['account_id', 'fingerprint']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_account_fingerprint', table_name='transactions')
+    op.drop_column('transactions', 'fingerprint')
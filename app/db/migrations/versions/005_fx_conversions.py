@@ -0,0 +1,45 @@
+"""fx conversions
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-11-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Převody mezi měnami z importů brokerů
+    op.create_table(
+        'fx_conversions',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v4()'), nullable=False),
+        sa.Column('account_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('trade_time', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('source_currency', sa.String(length=3), nullable=False),
+        sa.Column('target_currency', sa.String(length=3), nullable=False),
+        sa.Column('source_amount', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.Column('target_amount', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.Column('fx_rate', sa.Numeric(precision=20, scale=10), nullable=True),
+        sa.Column('fee', sa.Numeric(precision=20, scale=8), server_default='0', nullable=False),
+        sa.Column('notes', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_fx_conversions_account_time', 'fx_conversions', ['account_id', 'trade_time'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fx_conversions_account_time', table_name='fx_conversions')
+    op.drop_table('fx_conversions')
@@ -0,0 +1,36 @@
+"""query indexes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-11-10 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexy pro filtry a řazení seznamových endpointů a analytiky
+# (assets.symbol pokrývá unikátní omezení z migrace 001)
+INDEXES = [
+    ('ix_transactions_account_time', 'transactions', ['account_id', 'trade_time', 'id']),
+    ('ix_transactions_asset_time', 'transactions', ['asset_id', 'trade_time']),
+    ('ix_dividends_account_pay_date', 'dividends', ['account_id', 'pay_date', 'id']),
+    ('ix_accounts_portfolio_id', 'accounts', ['portfolio_id']),
+    ('ix_portfolios_user_id', 'portfolios', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
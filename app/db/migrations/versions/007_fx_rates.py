@@ -0,0 +1,47 @@
+"""fx rates
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-11-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Časová řada měnových kurzů (1 base = rate quote)
+    op.create_table(
+        'fx_rates',
+        sa.Column('base_currency', sa.String(length=3), nullable=False),
+        sa.Column('quote_currency', sa.String(length=3), nullable=False),
+        sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('rate', sa.Numeric(precision=20, scale=10), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('base_currency', 'quote_currency', 'date')
+    )
+
+    # Konverze na hypertabulku
+    op.execute(
+        """
+        SELECT create_hypertable('fx_rates', 'date',
+            chunk_time_interval => INTERVAL '1 year',
+            if_not_exists => TRUE);
+        """
+    )
+
+    # Materializované hodnoty byly v měnách aktiv - přepočítají se v základní měně
+    op.execute("DELETE FROM portfolio_valuation_state")
+    op.execute("DELETE FROM portfolio_values")
+
+
+def downgrade() -> None:
+    op.drop_table('fx_rates')
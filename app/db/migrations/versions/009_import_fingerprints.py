@@ -0,0 +1,131 @@
+"""dividend and fx conversion fingerprints
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-12-01 00:00:00.000000
+
+"""
+from typing import Callable, Sequence, Union
+import io
+
+from alembic import op
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 50000
+
+
+def _number(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values).astype("float64").round(8).astype(str)
+
+
+def _hash(key: pd.Series) -> np.ndarray:
+    return pd.util.hash_pandas_object(key, index=False).to_numpy().view("int64")
+
+
+def _dividend_fingerprints(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Otisky dividend ve tvaru ze dne migrace (kopie
+    TransactionFingerprint.compute_dividends)
+    """
+    days = pd.to_datetime(frame['pay_date'])
+    if days.dt.tz is not None:
+        days = days.dt.tz_localize(None)
+    return _hash(
+        frame['asset_id'].astype(str)
+        + "|" + days.dt.strftime("%Y-%m-%d")
+        + "|" + frame['currency'].astype(str).str.upper()
+        + "|" + _number(frame['gross_amount'])
+        + "|" + _number(frame['withholding_tax'])
+    )
+
+
+def _conversion_fingerprints(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Otisky převodů měn ve tvaru ze dne migrace (kopie
+    TransactionFingerprint.compute_conversions)
+    """
+    times = pd.to_datetime(frame['trade_time'], utc=True).dt.tz_localize(None)
+    return _hash(
+        times.dt.floor("s").dt.strftime("%Y-%m-%d %H:%M:%S")
+        + "|" + frame['source_currency'].astype(str).str.upper()
+        + "|" + frame['target_currency'].astype(str).str.upper()
+        + "|" + _number(frame['source_amount'])
+        + "|" + _number(frame['target_amount'])
+    )
+
+
+def _backfill(table: str, columns: str, fingerprints: Callable[[pd.DataFrame], np.ndarray]) -> None:
+    """
+    Doplní otisky existujících řádků - dávky se čtou kurzorem, otisky se
+    zapíší přes COPY do dočasné tabulky a do tabulky jedním UPDATE
+    """
+    bind = op.get_bind()
+    op.execute(f"CREATE TEMPORARY TABLE {table}_fingerprints (id uuid NOT NULL, fingerprint bigint NOT NULL)")
+    result = bind.execute(
+        sa.text(f"SELECT id, {columns} FROM {table}")
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    cursor = bind.connection.dbapi_connection.cursor()
+    try:
+        for rows in result.mappings().partitions():
+            frame = pd.DataFrame(rows)
+            buffer = io.StringIO()
+            pd.DataFrame({'id': frame['id'], 'fingerprint': fingerprints(frame)})\
+                .to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table}_fingerprints (id, fingerprint) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+    op.execute(
+        f"""
+        UPDATE {table} AS t
+        SET fingerprint = f.fingerprint
+        FROM {table}_fingerprints AS f
+        WHERE t.id = f.id
+        """
+    )
+    op.execute(f"DROP TABLE {table}_fingerprints")
+
+
+def upgrade() -> None:
+    # Otisky dividend a převodů měn pro detekci duplicit při importu
+    op.add_column('dividends', sa.Column('fingerprint', sa.BigInteger(), nullable=True))
+    op.add_column('fx_conversions', sa.Column('fingerprint', sa.BigInteger(), nullable=True))
+
+    _backfill(
+        'dividends',
+        'asset_id, pay_date, currency, gross_amount, withholding_tax',
+        _dividend_fingerprints
+    )
+    _backfill(
+        'fx_conversions',
+        'trade_time, source_currency, target_currency, source_amount, target_amount',
+        _conversion_fingerprints
+    )
+
+    # Indexy až po doplnění - UPDATE je nemusí průběžně udržovat
+    op.create_index(
+        'ix_dividends_account_fingerprint',
+        'dividends',
+        ['account_id', 'fingerprint']
+    )
+    op.create_index(
+        'ix_fx_conversions_account_fingerprint',
+        'fx_conversions',
+        ['account_id', 'fingerprint']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fx_conversions_account_fingerprint', table_name='fx_conversions')
+    op.drop_index('ix_dividends_account_fingerprint', table_name='dividends')
+    op.drop_column('fx_conversions', 'fingerprint')
+    op.drop_column('dividends', 'fingerprint')
@@ -0,0 +1,27 @@
+"""nullable dividend ex_date
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-12-08 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Exporty brokerů ex-date neobsahují, import ho nechá prázdný
+    op.alter_column('dividends', 'ex_date', existing_type=sa.Date(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("UPDATE dividends SET ex_date = pay_date WHERE ex_date IS NULL")
+    op.alter_column('dividends', 'ex_date', existing_type=sa.Date(), nullable=False)
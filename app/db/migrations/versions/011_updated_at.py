@@ -0,0 +1,34 @@
+"""updated_at on remaining tables
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-12-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tabulky modelů s BaseModel, kterým 001 nevytvořila updated_at
+TABLES = ['transactions', 'dividends', 'benchmarks', 'audit_log']
+
+
+def upgrade() -> None:
+    # ORM zapisuje a načítá updated_at u všech modelů s BaseModel
+    for table in TABLES:
+        op.add_column(
+            table,
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False)
+        )
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
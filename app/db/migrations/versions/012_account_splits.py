@@ -0,0 +1,30 @@
+"""Splits and lot books per account
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-12-22 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Snapshoty měly knihy po aktivech a hodnoty násobily split každého
+    # účtu celou pozicí portfolia - vše se přepočítá po účtech
+    op.execute("DELETE FROM position_snapshots")
+    op.execute("DELETE FROM portfolio_valuation_state")
+    op.execute("DELETE FROM portfolio_values")
+    op.execute("DELETE FROM report_cache")
+
+
+def downgrade() -> None:
+    # Snapshoty po účtech stará kniha nenačte
+    op.execute("DELETE FROM position_snapshots")
@@ -0,0 +1,50 @@
+"""Nullable transactions.fx_rate_to_portfolio
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-12-29 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Import bez načteného kurzu nechá kurz prázdný místo 1
+    op.alter_column(
+        'transactions',
+        'fx_rate_to_portfolio',
+        existing_type=sa.Numeric(precision=20, scale=8),
+        nullable=True
+    )
+    # Importy dosud ukládaly 1 i pro obchody v jiné měně než základní
+    op.execute(
+        """
+        UPDATE transactions t
+        SET fx_rate_to_portfolio = NULL
+        FROM accounts a
+        JOIN portfolios p ON p.id = a.portfolio_id
+        WHERE t.account_id = a.id
+            AND t.fingerprint IS NOT NULL
+            AND t.fx_rate_to_portfolio = 1
+            AND t.trade_currency <> p.base_currency
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("UPDATE transactions SET fx_rate_to_portfolio = 1 WHERE fx_rate_to_portfolio IS NULL")
+    op.alter_column(
+        'transactions',
+        'fx_rate_to_portfolio',
+        existing_type=sa.Numeric(precision=20, scale=8),
+        nullable=False
+    )
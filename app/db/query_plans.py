@@ -0,0 +1,204 @@
+"""
+Kontrola plánů hlavních dotazů endpointů.
+
+Pro každý dotaz spustí EXPLAIN s vypnutým sekvenčním čtením a řazením
+(enable_seqscan, enable_sort = off). PostgreSQL pak zvolí Seq Scan
+nebo Sort jen tehdy, když pro filtr (u stránkovaných dotazů i pro
+řazení) neexistuje použitelný index - výsledek tak nezávisí na množství
+dat v databázi.
+
+Spuštění proti databázi z DATABASE_URL (po migracích):
+
+    python -m app.db.query_plans
+
+Při nalezení sekvenčního čtení nebo řazení stránky končí nenulovým
+návratovým kódem. Dotazy skutečně posílané endpointy a službami
+kontroluje test tests/test_query_plans.py.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple
+import json
+import sys
+import uuid
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.db.base import SessionLocal
+from app.models.models import Account, Asset, Dividend, Portfolio, Transaction
+import app.models.user  # noqa: F401 - vztah Portfolio.user
+
+
+def _sample(db: Session) -> Dict:
+    """Hodnoty parametrů z existujících dat (v prázdné databázi náhodné)"""
+    def first(column):
+        value = db.execute(select(column).limit(1)).scalar()
+        return value if value is not None else uuid.uuid4()
+
+    return {
+        "user_id": first(Portfolio.user_id),
+        "portfolio_id": first(Account.portfolio_id),
+        "account_id": first(Transaction.account_id),
+        "asset_id": first(Transaction.asset_id),
+        "symbol": db.execute(select(Asset.symbol).limit(1)).scalar() or "AAPL",
+        "end": datetime.now(),
+        "start": datetime.now() - timedelta(days=365)
+    }
+
+
+# Dotazy ve tvaru, v jakém je posílají endpointy a služby
+# (název, sestavení dotazu, zda má pořadí zajistit index)
+HOT_QUERIES: List[Tuple[str, Callable[[Dict], object], bool]] = [
+    (
+        "transactions by account (page)",
+        lambda p: select(Transaction)
+        .where(Transaction.account_id == p["account_id"])
+        .order_by(Transaction.trade_time.desc(), Transaction.id.desc())
+        .limit(101),
+        True
+    ),
+    (
+        "transactions by account and period",
+        lambda p: select(Transaction)
+        .where(
+            Transaction.account_id == p["account_id"],
+            Transaction.trade_time.between(p["start"], p["end"])
+        ),
+        False
+    ),
+    (
+        "transactions by asset",
+        lambda p: select(Transaction).where(Transaction.asset_id == p["asset_id"]),
+        False
+    ),
+    (
+        "transaction fingerprints of account",
+        lambda p: select(Transaction.fingerprint)
+        .where(
+            Transaction.account_id == p["account_id"],
+            Transaction.fingerprint.in_([1, 2, 3])
+        ).distinct(),
+        False
+    ),
+    (
+        "dividends by account (page)",
+        lambda p: select(Dividend)
+        .where(Dividend.account_id == p["account_id"])
+        .order_by(Dividend.pay_date.desc(), Dividend.id.desc())
+        .limit(101),
+        True
+    ),
+    (
+        "accounts by portfolio",
+        lambda p: select(Account).where(Account.portfolio_id == p["portfolio_id"]),
+        False
+    ),
+    (
+        "portfolios by user",
+        lambda p: select(Portfolio).where(Portfolio.user_id == p["user_id"]),
+        False
+    ),
+    (
+        "asset by symbol",
+        lambda p: select(Asset).where(Asset.symbol == p["symbol"]),
+        False
+    ),
+]
+
+
+def _nodes(plan: Dict) -> Iterator[Dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def explain_sql(db: Session, statement: str, parameters=None) -> Dict:
+    """Plán SQL příkazu ve tvaru pro DBAPI kurzor (EXPLAIN FORMAT JSON)"""
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        raw = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    result = raw if isinstance(raw, list) else json.loads(raw)
+    return result[0]["Plan"]
+
+
+def explain(db: Session, statement) -> Dict:
+    """Plán dotazu (EXPLAIN FORMAT JSON)"""
+    compiled = statement.compile(
+        dialect=db.get_bind().dialect,
+        compile_kwargs={"render_postcompile": True}
+    )
+    params = {
+        name: str(value) if isinstance(value, uuid.UUID) else value
+        for name, value in compiled.params.items()
+    }
+    return explain_sql(db, str(compiled), params)
+
+
+def hypertable_chunks(db: Session) -> Dict[str, str]:
+    """Chunk -> hypertabulka, plán čte u hypertabulek přímo chunky (bez TimescaleDB prázdné)"""
+    installed = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).scalar()
+    if not installed:
+        return {}
+    return dict(db.execute(text(
+        "SELECT chunk_name, hypertable_name FROM timescaledb_information.chunks"
+    )).all())
+
+
+def seq_scans(plan: Dict, chunks: Dict[str, str] = None) -> List[str]:
+    """Tabulky čtené v plánu sekvenčně (chunky pod názvem hypertabulky)"""
+    chunks = chunks or {}
+    return sorted({
+        chunks.get(n["Relation Name"], n["Relation Name"])
+        for n in _nodes(plan) if n["Node Type"] == "Seq Scan"
+    })
+
+
+def check(db: Session) -> List[Dict]:
+    """
+    Plány všech sledovaných dotazů - pro každý název, použité indexy,
+    tabulky čtené sekvenčně a zda se stránka řadí mimo index
+    """
+    connection = db.connection()
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    connection.exec_driver_sql("SET LOCAL enable_sort = off")
+    params = _sample(db)
+    chunks = hypertable_chunks(db)
+
+    report = []
+    for name, build, ordered in HOT_QUERIES:
+        plan = explain(db, build(params))
+        nodes = list(_nodes(plan))
+        report.append({
+            "query": name,
+            "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+            "seq_scans": seq_scans(plan, chunks),
+            "sorted": ordered and any(n["Node Type"] in ("Sort", "Incremental Sort") for n in nodes)
+        })
+    db.rollback()
+    return report
+
+
+def main() -> int:
+    db = SessionLocal()
+    try:
+        report = check(db)
+    finally:
+        db.close()
+
+    failed = False
+    for item in report:
+        if item["seq_scans"]:
+            failed = True
+            print(f"FAIL  {item['query']}: sequential scan on {', '.join(item['seq_scans'])}")
+        elif item["sorted"]:
+            failed = True
+            print(f"FAIL  {item['query']}: page is sorted outside of an index")
+        else:
+            print(f"ok    {item['query']}: {', '.join(item['indexes'])}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime
+import uuid
+from sqlalchemy import Column, String, ForeignKey, Numeric, DateTime, Date, BigInteger, Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
@@ -14,6 +15,10 @@ class Portfolio(Base, BaseModel):
     base_currency = Column(String(3), nullable=False)
     benchmark_id = Column(UUID(as_uuid=True), ForeignKey("benchmarks.id"), nullable=True)
     
+    __table_args__ = (
+        Index("ix_portfolios_user_id", "user_id"),
+    )
+    
     # Relationships
     user = relationship("User", backref="portfolios")
     benchmark = relationship("Benchmark")
@@ -28,6 +33,10 @@ class Account(Base, BaseModel):
     type = Column(String(50), nullable=False)  # broker nebo cash
     currency = Column(String(3), nullable=False)
     
+    __table_args__ = (
+        Index("ix_accounts_portfolio_id", "portfolio_id"),
+    )
+    
     # Relationships
     portfolio = relationship("Portfolio", backref="accounts")
 
@@ -56,9 +65,16 @@ class Transaction(Base, BaseModel):
     tax = Column(Numeric(20, 8), nullable=False, default=0)
     gross_amount = Column(Numeric(20, 8), nullable=False)
     trade_currency = Column(String(3), nullable=False)
-    fx_rate_to_portfolio = Column(Numeric(20, 8), nullable=False)
+    fx_rate_to_portfolio = Column(Numeric(20, 8), nullable=True)  # NULL - import bez kurzu
     trade_time = Column(DateTime(timezone=True), nullable=False)
     notes = Column(String, nullable=True)
+    fingerprint = Column(BigInteger, nullable=True)  # otisk pro detekci duplicit importu
+    
+    __table_args__ = (
+        Index("ix_transactions_account_fingerprint", "account_id", "fingerprint"),
+        Index("ix_transactions_account_time", "account_id", "trade_time", "id"),
+        Index("ix_transactions_asset_time", "asset_id", "trade_time"),
+    )
     
     # Relationships
     account = relationship("Account", backref="transactions")
@@ -70,18 +86,47 @@ class Dividend(Base, BaseModel):
 
     account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
     asset_id = Column(UUID(as_uuid=True), ForeignKey("assets.id", ondelete="CASCADE"), nullable=False)
-    ex_date = Column(DateTime(timezone=True), nullable=False)
+    ex_date = Column(DateTime(timezone=True), nullable=True)  # importy ex-date neobsahují
     pay_date = Column(DateTime(timezone=True), nullable=False)
     gross_amount = Column(Numeric(20, 8), nullable=False)
     withholding_tax = Column(Numeric(20, 8), nullable=False)
     net_amount = Column(Numeric(20, 8), nullable=False)
     currency = Column(String(3), nullable=False)
+    fingerprint = Column(BigInteger, nullable=True)  # otisk pro detekci duplicit importu
+    
+    __table_args__ = (
+        Index("ix_dividends_account_fingerprint", "account_id", "fingerprint"),
+        Index("ix_dividends_account_pay_date", "account_id", "pay_date", "id"),
+    )
     
     # Relationships
     account = relationship("Account", backref="dividends")
     asset = relationship("Asset")
 
 
+class FxConversion(Base, BaseModel):
+    __tablename__ = "fx_conversions"
+
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    trade_time = Column(DateTime(timezone=True), nullable=False)
+    source_currency = Column(String(3), nullable=False)  # prodávaná měna
+    target_currency = Column(String(3), nullable=False)  # nakupovaná měna
+    source_amount = Column(Numeric(20, 8), nullable=False)
+    target_amount = Column(Numeric(20, 8), nullable=False)
+    fx_rate = Column(Numeric(20, 10), nullable=True)
+    fee = Column(Numeric(20, 8), nullable=False, default=0)
+    notes = Column(String, nullable=True)
+    fingerprint = Column(BigInteger, nullable=True)  # otisk pro detekci duplicit importu
+    
+    __table_args__ = (
+        Index("ix_fx_conversions_account_fingerprint", "account_id", "fingerprint"),
+        Index("ix_fx_conversions_account_time", "account_id", "trade_time"),
+    )
+    
+    # Relationships
+    account = relationship("Account", backref="fx_conversions")
+
+
 class Price(Base):
     __tablename__ = "prices"
 
@@ -95,6 +140,49 @@ class Price(Base):
     asset = relationship("Asset", backref="prices")
 
 
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+
+    # 1 jednotka base_currency = rate jednotek quote_currency
+    base_currency = Column(String(3), nullable=False, primary_key=True)
+    quote_currency = Column(String(3), nullable=False, primary_key=True)
+    date = Column(DateTime(timezone=True), nullable=False, primary_key=True)
+    rate = Column(Numeric(20, 10), nullable=False)
+    source = Column(String(50), nullable=False)
+
+
+class LatestPrice(Base):
+    __tablename__ = "latest_prices"
+
+    # Udržováno triggerem nad tabulkou prices (migrace 003)
+    asset_id = Column(UUID(as_uuid=True), ForeignKey("assets.id", ondelete="CASCADE"), nullable=False, primary_key=True)
+    date = Column(Date, nullable=False)
+    close = Column(Numeric(20, 8), nullable=False)
+    currency = Column(String(3), nullable=False)
+
+
+class PortfolioValue(Base):
+    __tablename__ = "portfolio_values"
+
+    portfolio_id = Column(UUID(as_uuid=True), ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False, primary_key=True)
+    date = Column(Date, nullable=False, primary_key=True)
+    value = Column(Numeric(20, 8), nullable=False)
+
+    # Relationships
+    portfolio = relationship("Portfolio")
+
+
+class PortfolioValuationState(Base):
+    __tablename__ = "portfolio_valuation_state"
+
+    portfolio_id = Column(UUID(as_uuid=True), ForeignKey("portfolios.id", ondelete="CASCADE"), primary_key=True)
+    valid_through = Column(Date, nullable=True)  # poslední den s platnou hodnotou v portfolio_values
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Relationships
+    portfolio = relationship("Portfolio")
+
+
 class Benchmark(Base, BaseModel):
     __tablename__ = "benchmarks"
 
@@ -103,13 +191,31 @@ class Benchmark(Base, BaseModel):
     currency = Column(String(3), nullable=False)
 
 
-class ReportCache(Base, BaseModel):
+class PositionSnapshot(Base):
+    __tablename__ = "position_snapshots"
+
+    # Stav lotové knihy po transakci (as_of, last_transaction_id)
+    portfolio_id = Column(UUID(as_uuid=True), ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False, primary_key=True)
+    method = Column(String(10), nullable=False, primary_key=True)  # fifo, average
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    last_transaction_id = Column(UUID(as_uuid=True), nullable=False)
+    state = Column(JSONB, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Relationships
+    portfolio = relationship("Portfolio")
+
+
+class ReportCache(Base):
     __tablename__ = "report_cache"
+    __table_args__ = (UniqueConstraint("portfolio_id", "key"),)
 
+    # Tabulka nemá created_at/updated_at - stáří payloadu drží computed_at
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("uuid_generate_v4()"))
     portfolio_id = Column(UUID(as_uuid=True), ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False)
     key = Column(String(255), nullable=False)
     payload = Column(JSONB, nullable=False)
-    computed_at = Column(DateTime(timezone=True), nullable=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False, server_default=text("now()"))
     
     # Relationships
     portfolio = relationship("Portfolio", backref="report_cache")
@@ -57,6 +57,7 @@ class TransactionUpdate(TransactionBase):
 
 class Transaction(TransactionBase):
     id: uuid.UUID
+    fx_rate_to_portfolio: Optional[Decimal] = None
     created_at: datetime
 
     class Config:
@@ -66,7 +67,7 @@ class Transaction(TransactionBase):
 class DividendBase(BaseModel):
     account_id: uuid.UUID
     asset_id: uuid.UUID
-    ex_date: datetime
+    ex_date: Optional[datetime] = None
     pay_date: datetime
     gross_amount: Decimal
     withholding_tax: Decimal
@@ -0,0 +1,146 @@
+from typing import Dict, List, Tuple
+from datetime import date
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.models import Asset, Benchmark
+from app.services.price_repository import PriceRepository
+from app.services.risk import finite_or_none
+from app.services.trading_calendar import TRADING_DAYS_PER_YEAR
+from app.services.valuation import ValuationEngine
+
+
+class BenchmarkComparison:
+    """
+    Porovnání portfolia s K benchmarky najednou.
+
+    Portfolio i benchmarky se nejdřív zarovnají na společné dny (dny,
+    kdy mají všechny benchmarky cenu a portfolio nenulovou hodnotu),
+    metriky se pak počítají maticově nad výnosy n × K. Benchmarky bez
+    cen v období se do zarovnání nezapočítají a mají prázdné metriky.
+    """
+
+    METRICS = ['beta', 'alpha', 'tracking_error', 'information_ratio', 'up_capture', 'down_capture']
+
+    @staticmethod
+    def load(
+        db: Session,
+        benchmark_ids: List[uuid.UUID],
+        start_date: date,
+        end_date: date
+    ) -> Tuple[List[Dict], List[Dict], Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Benchmarky s cenami (ceny se berou z aktiva se stejným symbolem)
+        a jejich close za období - pozice v seznamu benchmarků, den a close.
+        Zvlášť vrací benchmarky bez aktiva nebo bez close v období.
+        """
+        rows = db.query(Benchmark.id, Benchmark.symbol, Benchmark.name, Asset.id.label('asset_id'))\
+            .outerjoin(Asset, Asset.symbol == Benchmark.symbol)\
+            .filter(Benchmark.id.in_(benchmark_ids))\
+            .order_by(Benchmark.symbol)\
+            .all()
+        listed = [r for r in rows if r.asset_id is not None]
+        positions, days, closes = PriceRepository.get_closes(
+            db, [r.asset_id for r in listed], start_date, end_date
+        )
+
+        # Jen close před obdobím nestačí - benchmark by neměl žádný společný den
+        priced = np.unique(positions[days >= np.datetime64(start_date)])
+        keep = np.isin(positions, priced)
+        positions = np.searchsorted(priced, positions[keep])
+
+        def describe(r):
+            return {'benchmark_id': r.id, 'symbol': r.symbol, 'name': r.name}
+
+        benchmarks = [describe(listed[k]) for k in priced]
+        missing = [describe(r) for r in rows if r.asset_id is None] \
+            + [describe(r) for k, r in enumerate(listed) if k not in priced]
+        return benchmarks, missing, (positions, days[keep], closes[keep])
+
+    @classmethod
+    def empty_metrics(cls) -> Dict:
+        """Metriky benchmarku, který nelze porovnat"""
+        return dict.fromkeys(cls.METRICS)
+
+    @staticmethod
+    def align(
+        values: pd.Series,
+        positions: np.ndarray,
+        days: np.ndarray,
+        closes: np.ndarray,
+        count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hodnoty portfolia (n) a ceny benchmarků (n × K) na společných dnech
+        """
+        dates = values.index.to_numpy()
+        prices = ValuationEngine.price_matrix_from_arrays(
+            positions, days, closes, values.index, pd.RangeIndex(count)
+        ).to_numpy()
+
+        # Dny se skutečnou cenou (ne jen doplněnou dopředu)
+        observed = np.zeros((len(dates), count), dtype=bool)
+        rows = np.searchsorted(dates, days)
+        inside = rows < len(dates)
+        inside[inside] = dates[rows[inside]] == days[inside]
+        observed[rows[inside], positions[inside]] = True
+
+        portfolio = values.to_numpy(dtype="float64")
+        shared = observed.all(axis=1) & (portfolio > 0)
+        return portfolio[shared], prices[shared]
+
+    @classmethod
+    def compare(
+        cls,
+        portfolio: np.ndarray,
+        benchmarks: np.ndarray,
+        risk_free_rate: float = 0.02
+    ) -> List[Dict]:
+        """
+        Beta, alfa (annualizovaná), tracking error, information ratio
+        a up/down capture vůči každému sloupci matice benchmarků
+        """
+        count = benchmarks.shape[1]
+        if len(portfolio) < 3:
+            return [cls.empty_metrics() for _ in range(count)]
+
+        p = portfolio[1:] / portfolio[:-1] - 1.0
+        b = benchmarks[1:] / benchmarks[:-1] - 1.0
+        n = len(p)
+        daily_rf = risk_free_rate / TRADING_DAYS_PER_YEAR
+
+        p_mean = p.mean()
+        b_mean = b.mean(axis=0)
+        b_centered = b - b_mean
+        covariance = (p - p_mean) @ b_centered / (n - 1)
+        variance = (b_centered ** 2).sum(axis=0) / (n - 1)
+
+        active = p[:, None] - b
+        active_mean = active.mean(axis=0)
+        active_std = active.std(axis=0, ddof=1)
+
+        up = b > 0
+        down = b < 0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta = covariance / variance
+            alpha = ((p_mean - daily_rf) - beta * (b_mean - daily_rf)) * TRADING_DAYS_PER_YEAR
+            tracking_error = active_std * np.sqrt(TRADING_DAYS_PER_YEAR)
+            information_ratio = active_mean * TRADING_DAYS_PER_YEAR / tracking_error
+            # Průměrný výnos portfolia v rostoucích (klesajících) dnech benchmarku vůči benchmarku
+            up_capture = (p[:, None] * up).sum(axis=0) / (b * up).sum(axis=0)
+            down_capture = (p[:, None] * down).sum(axis=0) / (b * down).sum(axis=0)
+
+        return [
+            {
+                'beta': finite_or_none(beta[k]),
+                'alpha': finite_or_none(alpha[k]),
+                'tracking_error': finite_or_none(tracking_error[k]),
+                'information_ratio': finite_or_none(information_ratio[k]),
+                'up_capture': finite_or_none(up_capture[k]),
+                'down_capture': finite_or_none(down_capture[k])
+            }
+            for k in range(count)
+        ]
@@ -0,0 +1,79 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List
+import pandas as pd
+
+
+class BrokerParser(ABC):
+    """
+    Společné rozhraní parserů exportů od brokerů.
+
+    Parser čte soubor po částech a vrací normalizované dávky transakcí
+    se sloupci COLUMNS (sloupce, které broker neposkytuje, mohou chybět).
+    Kontrolní součet počítá z nezpracovaných dat, aby odhalil změnu
+    souboru mezi náhledem a importem.
+    """
+
+    # Normalizované sloupce transakce
+    COLUMNS = [
+        "account",
+        "date",
+        "type",
+        "symbol",
+        "name",
+        "quantity",
+        "price",
+        "fee",
+        "tax",
+        "gross_amount",
+        "currency",
+        "notes"
+    ]
+
+    # Doplňující sloupce převodů mezi měnami (typ FX)
+    FX_COLUMNS = [
+        "source_currency",
+        "target_currency",
+        "source_amount",
+        "target_amount",
+        "fx_rate"
+    ]
+
+    name: str
+    label: str
+
+    @abstractmethod
+    def sniff(self, file_path: str) -> bool:
+        """Rozpozná podle hlavičky, zda soubor odpovídá formátu brokera"""
+
+    @abstractmethod
+    def iter_frames(
+        self,
+        file_path: str,
+        hasher=None,
+        chunksize: int = None
+    ) -> Iterator[pd.DataFrame]:
+        """Normalizované dávky transakcí, průběžně aktualizuje hasher"""
+
+    def iter_records(self, file_path: str, chunksize: int = None) -> Iterator[Dict]:
+        """Normalizované transakce po jedné (prázdné hodnoty vynechány)"""
+        for frame in self.iter_frames(file_path, chunksize=chunksize):
+            frame = frame.astype(object)
+            frame = frame.where(frame.notna(), None)
+            for record in frame.to_dict("records"):
+                yield {key: value for key, value in record.items() if value is not None}
+
+    @staticmethod
+    def read_header(file_path: str, encoding: str = "utf-8", skip_rows: int = 0) -> List[str]:
+        """Názvy sloupců souboru (bez načtení dat)"""
+        try:
+            return list(pd.read_csv(
+                file_path,
+                encoding=encoding,
+                skiprows=skip_rows,
+                nrows=0
+            ).columns)
+        except (UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError):
+            return []
+
+    def describe(self) -> Dict:
+        return {"name": self.name, "label": self.label}
@@ -1,187 +1,247 @@
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List
+import re
+import numpy as np
 import pandas as pd
-from decimal import Decimal
 
+from app.core.config import settings
+from app.services.brokers.base import BrokerParser
 
-class FIOBrokerParser:
+
+class FIOBrokerParser(BrokerParser):
     """Parser pro import dat z FIO brokera"""
 
+    name = "fio"
+    label = "FIO broker"
+    ENCODING = "windows-1250"  # FIO používá windows-1250 kódování
+    DATE_FORMAT = "%d.%m.%Y %H:%M"
+
+    COLUMNS = [
+        "Datum obchodu",
+        "Směr",
+        "Symbol",
+        "Cena",
+        "Počet",
+        "Měna",
+        "Objem v CZK",
+        "Poplatky v CZK",
+        "Objem v USD",
+        "Poplatky v USD",
+        "Objem v EUR",
+        "Poplatky v EUR",
+        "Text FIO"
+    ]
+
+    # Klíče, které má každá transakce
+    BASE_FIELDS = ["date", "type", "symbol", "currency"]
+
+    # Další pole záznamu podle typu transakce
+    TYPE_FIELDS = {
+        "BUY": ["quantity", "price", "amount", "fee"],
+        "SELL": ["quantity", "price", "amount", "fee"],
+        "DIVIDEND": ["amount", "quantity", "price", "fee"],
+        "TAX": ["amount", "quantity", "price", "fee"],
+        "FEE": ["amount", "quantity", "price", "fee"],
+        "DEPOSIT": ["amount", "quantity", "price", "fee"],
+        "FX": ["source_currency", "target_currency", "source_amount", "target_amount", "fx_rate", "fee"],
+    }
+
+    # Pořadí určuje prioritu při výběru měny transakce
+    CURRENCIES = ["USD", "EUR", "CZK"]
+
+    # Export FIO občas nahrazuje znaky s diakritikou otazníkem, vzory
+    # proto na jejich místě připouštějí libovolný znak.
+    # Pořadí odpovídá prioritě: text FIO, směr obchodu, zbylé texty
+    TYPE_RULES = [
+        ("DIVIDEND", "Text FIO", r"Dividenda"),
+        ("TAX", "Text FIO", r"Da. z divid"),
+        ("FEE", "Text FIO", r"ADR Fee"),
+        ("BUY", "Směr", r"^N.kup$"),
+        ("SELL", "Směr", r"^Prodej$"),
+        ("FX", "Směr", r"^P.evod mezi m.nami$"),
+        ("FEE", "Text FIO", r"Poplatek"),
+        ("DEPOSIT", "Text FIO", r"Vlo.eno na"),
+    ]
+
     @staticmethod
     def parse_date(date_str: str) -> datetime:
         """Převede string na datum"""
         if not date_str:
             return None
-        return datetime.strptime(date_str, "%d.%m.%Y %H:%M")
+        return datetime.strptime(date_str, FIOBrokerParser.DATE_FORMAT)
 
     @staticmethod
-    def parse_number(number_str: str) -> Decimal:
-        """Převede string na číslo"""
-        if not number_str or number_str == "0,00":
-            return Decimal("0")
-        return Decimal(number_str.replace(",", ".").replace(" ", ""))
+    def parse_numbers(values: pd.Series) -> pd.Series:
+        """Převede sloupec čísel v českém formátu (1 453,80) na float"""
+        cleaned = values.str.replace(r"\s", "", regex=True)\
+            .str.replace(",", ".", regex=False)
+        return pd.to_numeric(cleaned, errors="coerce")
 
-    @staticmethod
-    def parse_direction(direction: str) -> str:
-        """Převede směr obchodu na standardní typ"""
-        if not direction:
-            return None
-        direction_map = {
-            "Nákup": "BUY",
-            "Prodej": "SELL",
-            "Převod mezi měnami": "FX"
-        }
-        return direction_map.get(direction)
+    @classmethod
+    def normalize_headers(cls, columns: List[str]) -> Dict[str, str]:
+        """Mapování hlaviček souboru (i s otazníky místo diakritiky) na COLUMNS"""
+        mapping = {}
+        for column in columns:
+            pattern = re.escape(column.strip()).replace(r"\?", ".")
+            for canonical in cls.COLUMNS:
+                if re.fullmatch(pattern, canonical):
+                    mapping[column] = canonical
+                    break
+        return mapping
 
-    @staticmethod
-    def get_transaction_type(row: Dict) -> str:
-        """Určí typ transakce z dat"""
-        if "Dividenda" in str(row["Text FIO"]):
-            return "DIVIDEND"
-        elif "Daň z divid." in str(row["Text FIO"]):
-            return "TAX"
-        elif "ADR Fee" in str(row["Text FIO"]):
-            return "FEE"
-        elif row["Směr"] == "Nákup":
-            return "BUY"
-        elif row["Směr"] == "Prodej":
-            return "SELL"
-        elif row["Směr"] == "Převod mezi měnami":
-            return "FX"
-        elif "Poplatek" in str(row["Text FIO"]):
-            return "FEE"
-        elif "Vloženo na účet" in str(row["Text FIO"]):
-            return "DEPOSIT"
-        return None
+    @classmethod
+    def _read_chunks(cls, file_path: str, chunksize: int = None) -> Iterator[pd.DataFrame]:
+        """Čte export po částech jako textové sloupce"""
+        return pd.read_csv(
+            file_path,
+            encoding=cls.ENCODING,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunksize or settings.IMPORT_CHUNK_SIZE
+        )
 
-    @staticmethod
-    def get_transaction_currency(row: Dict) -> str:
-        """Určí měnu transakce"""
-        if row["Objem v USD"] and row["Objem v USD"] != "0,00":
-            return "USD"
-        elif row["Objem v EUR"] and row["Objem v EUR"] != "0,00":
-            return "EUR"
-        elif row["Objem v CZK"] and row["Objem v CZK"] != "0,00":
-            return "CZK"
-        return row["Měna"]
+    @classmethod
+    def _clean_chunk(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Normalizuje hlavičky a odstraní prázdné řádky"""
+        df = df.rename(columns=cls.normalize_headers(list(df.columns)))
+        for column in cls.COLUMNS:
+            if column not in df.columns:
+                df[column] = ""
 
-    @staticmethod
-    def get_transaction_amount(row: Dict, currency: str) -> Decimal:
-        """Získá objem transakce v dané měně"""
-        amount_map = {
-            "USD": "Objem v USD",
-            "EUR": "Objem v EUR",
-            "CZK": "Objem v CZK"
-        }
-        amount = row[amount_map.get(currency, "")]
-        return FIOBrokerParser.parse_number(amount) if amount else Decimal("0")
+        # Vyčištění prázdných řádků
+        df = df[cls.COLUMNS]
+        return df[(df != "").any(axis=1)]
+
+    def sniff(self, file_path: str) -> bool:
+        header = self.read_header(file_path, encoding=self.ENCODING)
+        columns = set(self.normalize_headers(header).values())
+        return {"Datum obchodu", "Text FIO", "Směr"} <= columns
+
+    @classmethod
+    def classify(cls, df: pd.DataFrame) -> np.ndarray:
+        """Typ transakce pro všechny řádky (None pro neznámé)"""
+        conditions = [
+            df[column].str.contains(pattern, regex=True)
+            for _, column, pattern in cls.TYPE_RULES
+        ]
+        return np.select(
+            conditions,
+            [trans_type for trans_type, _, _ in cls.TYPE_RULES],
+            default=None
+        )
 
     @staticmethod
-    def get_transaction_fee(row: Dict, currency: str) -> Decimal:
-        """Získá poplatek v dané měně"""
-        fee_map = {
-            "USD": "Poplatky v USD",
-            "EUR": "Poplatky v EUR",
-            "CZK": "Poplatky v CZK"
-        }
-        fee = row[fee_map.get(currency, "")]
-        return FIOBrokerParser.parse_number(fee) if fee else Decimal("0")
+    def _pick(values: pd.DataFrame, currency: pd.Series) -> pd.Series:
+        """Hodnota ze sloupce odpovídajícího měně řádku (jinak 0)"""
+        picked = np.select(
+            [currency == c for c in values.columns],
+            [values[c].to_numpy() for c in values.columns],
+            default=0.0
+        )
+        return pd.Series(picked, index=currency.index).fillna(0.0)
 
     @classmethod
-    def parse_csv(cls, file_path: str) -> List[Dict]:
+    def _parse_chunk(cls, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Zpracuje CSV soubor z FIO a vrátí seznam transakcí
+        Zpracuje část exportu po sloupcích a vrátí tabulku transakcí.
+        Sloupce, které se daného typu transakce netýkají, obsahují NaN.
         """
-        # Načtení CSV
-        df = pd.read_csv(
-            file_path,
-            encoding="windows-1250",  # FIO používá windows-1250 kódování
-            decimal=",",
-            thousands=" "
+        amounts = pd.DataFrame({c: cls.parse_numbers(df[f"Objem v {c}"]) for c in cls.CURRENCIES})
+        fees = pd.DataFrame({c: cls.parse_numbers(df[f"Poplatky v {c}"]) for c in cls.CURRENCIES})
+
+        # Měna transakce - první měna s nenulovým objemem, jinak sloupec Měna
+        currency = pd.Series(
+            np.select(
+                [(amounts[c].notna() & (amounts[c] != 0)).to_numpy() for c in cls.CURRENCIES],
+                cls.CURRENCIES,
+                default=df["Měna"].to_numpy()
+            ),
+            index=df.index
         )
+        trans_type = pd.Series(cls.classify(df), index=df.index)
+        date = pd.to_datetime(df["Datum obchodu"], format=cls.DATE_FORMAT, errors="coerce")
+
+        valid = trans_type.notna() & (currency != "") & date.notna()
+        df, amounts, fees = df[valid], amounts[valid], fees[valid]
+        currency, trans_type = currency[valid], trans_type[valid]
+
+        amount = cls._pick(amounts, currency)
+        fee = cls._pick(fees, currency)
+        quantity = cls.parse_numbers(df["Počet"])
+        price = cls.parse_numbers(df["Cena"])
+
+        trade = trans_type.isin(["BUY", "SELL"])
+        signed = trans_type.isin(["DIVIDEND", "DEPOSIT"])
+        single = trans_type.isin(["DIVIDEND", "TAX", "FEE", "DEPOSIT"])
+        fx = trans_type == "FX"
+
+        result = pd.DataFrame({
+            "date": date[valid],
+            "type": trans_type,
+            "symbol": df["Symbol"].where(df["Symbol"] != ""),
+            "currency": currency,
+            "quantity": np.where(trade, quantity, np.where(single, 1.0, np.nan)),
+            "price": np.where(trade, price, np.where(single, np.where(signed, amount, amount.abs()), np.nan)),
+            "amount": np.where(signed, amount, np.where(fx, np.nan, amount.abs())),
+            "fee": np.where(trade | (trans_type == "FEE"), fee, np.where(single, 0.0, np.nan)),
+        }, index=df.index)
+
+        # Převod mezi měnami: Symbol je prodávaná měna s částkou v Počet,
+        # Měna je nakupovaná měna s částkou ve sloupci objemu
+        target_currency = df["Měna"]
+        source_amount = quantity.abs()
+        target_amount = cls._pick(amounts, target_currency).abs()
+        result["source_currency"] = df["Symbol"].where(fx)
+        result["target_currency"] = target_currency.where(fx)
+        result["source_amount"] = source_amount.where(fx)
+        result["target_amount"] = target_amount.where(fx)
+        result["fx_rate"] = (target_amount / source_amount.replace(0, np.nan)).where(fx)
+        result.loc[fx, "fee"] = cls._pick(fees, target_currency)[fx]
+
+        # Přidání poznámky
+        result["notes"] = df["Text FIO"].where(df["Text FIO"] != "")
+        return result
 
-        # Vyčištění prázdných řádků
-        df = df.dropna(how="all")
-
-        transactions = []
-        
-        for _, row in df.iterrows():
-            # Základní informace o transakci
-            trans_type = cls.get_transaction_type(row)
-            if not trans_type:
-                continue
-
-            currency = cls.get_transaction_currency(row)
-            if not currency:
-                continue
-
-            date = cls.parse_date(row["Datum obchodu"])
-            if not date:
-                continue
-
-            # Vytvoření transakce
-            transaction = {
-                "date": date,
-                "type": trans_type,
-                "symbol": row["Symbol"] if pd.notna(row["Symbol"]) else None,
-                "currency": currency
-            }
-
-            # Zpracování podle typu transakce
-            if trans_type in ["BUY", "SELL"]:
-                transaction.update({
-                    "quantity": cls.parse_number(row["Počet"]),
-                    "price": cls.parse_number(row["Cena"]),
-                    "amount": abs(cls.get_transaction_amount(row, currency)),
-                    "fee": cls.get_transaction_fee(row, currency)
-                })
-            elif trans_type == "DIVIDEND":
-                transaction.update({
-                    "amount": cls.get_transaction_amount(row, currency),
-                    "quantity": 1,  # Dividend je vždy jedna
-                    "price": cls.get_transaction_amount(row, currency),
-                    "fee": Decimal("0")
-                })
-            elif trans_type == "TAX":
-                transaction.update({
-                    "amount": abs(cls.get_transaction_amount(row, currency)),
-                    "quantity": 1,
-                    "price": abs(cls.get_transaction_amount(row, currency)),
-                    "fee": Decimal("0")
-                })
-            elif trans_type == "FEE":
-                transaction.update({
-                    "amount": abs(cls.get_transaction_amount(row, currency)),
-                    "quantity": 1,
-                    "price": abs(cls.get_transaction_amount(row, currency)),
-                    "fee": cls.get_transaction_fee(row, currency)
-                })
-            elif trans_type == "FX":
-                # Pro FX transakce potřebujeme obě měny a kurz
-                source_amount = cls.get_transaction_amount(row, row["Měna"])
-                target_currency = "USD" if row["Objem v USD"] else ("EUR" if row["Objem v EUR"] else "CZK")
-                target_amount = cls.get_transaction_amount(row, target_currency)
-                
-                transaction.update({
-                    "source_currency": row["Měna"],
-                    "target_currency": target_currency,
-                    "source_amount": abs(source_amount),
-                    "target_amount": abs(target_amount),
-                    "fx_rate": abs(target_amount / source_amount) if source_amount else None,
-                    "fee": cls.get_transaction_fee(row, target_currency)
-                })
-            elif trans_type == "DEPOSIT":
-                transaction.update({
-                    "amount": cls.get_transaction_amount(row, currency),
-                    "quantity": 1,
-                    "price": cls.get_transaction_amount(row, currency),
-                    "fee": Decimal("0")
-                })
-
-            # Přidání poznámky
-            if pd.notna(row["Text FIO"]):
-                transaction["notes"] = row["Text FIO"]
-
-            transactions.append(transaction)
-
-        return transactions
\ No newline at end of file
+    @classmethod
+    def parse_frame(cls, file_path: str, chunksize: int = None) -> pd.DataFrame:
+        """Zpracuje celý CSV soubor z FIO a vrátí tabulku transakcí"""
+        frames = [
+            cls._parse_chunk(cls._clean_chunk(chunk))
+            for chunk in cls._read_chunks(file_path, chunksize)
+        ] or [cls._parse_chunk(cls._clean_chunk(pd.DataFrame(columns=cls.COLUMNS)))]
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_frames(
+        self,
+        file_path: str,
+        hasher=None,
+        chunksize: int = None
+    ) -> Iterator[pd.DataFrame]:
+        for chunk in self._read_chunks(file_path, chunksize):
+            if hasher is not None:
+                hasher.update(pd.util.hash_pandas_object(chunk).values.tobytes())
+            yield self._parse_chunk(self._clean_chunk(chunk))\
+                .rename(columns={"amount": "gross_amount"})
+
+    @classmethod
+    def parse_csv(cls, file_path: str) -> List[Dict]:
+        """
+        Zpracuje CSV soubor z FIO a vrátí seznam transakcí
+        """
+        frame = cls.parse_frame(file_path)
+        notes = frame["notes"].tolist()
+        transactions = [None] * len(frame)
+
+        # Záznamy se skládají po typech jen z polí, která se typu týkají
+        for trans_type, group in frame.groupby("type", sort=False):
+            fields = cls.BASE_FIELDS + cls.TYPE_FIELDS[trans_type]
+            values = group[fields].astype(object)
+            values = values.where(values.notna(), None)
+            columns = [values[field].tolist() for field in fields]
+            for position, row in zip(group.index, zip(*columns)):
+                transaction = dict(zip(fields, row))
+                if isinstance(notes[position], str):
+                    transaction["notes"] = notes[position]
+                transactions[position] = transaction
+
+        return transactions
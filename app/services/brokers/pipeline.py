@@ -0,0 +1,346 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import hashlib
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.models import Account, Asset, Transaction
+from app.services.brokers.base import BrokerParser
+from app.services.bulk_writer import TransactionBulkWriter
+from app.services.csv_import import CSVImportPreview
+from app.services.fingerprint import TransactionFingerprint
+from app.services.fx_loader import FxRateLoader
+from app.services.import_stash import ImportStash, StashWriter
+from app.services.invalidation import CacheInvalidation
+from app.services.ledger import SPLIT_TYPE
+
+
+class ImportPipeline:
+    """
+    Společné zpracování normalizovaných dávek libovolného parseru:
+    náhled s detekcí duplicit a hromadný zápis transakcí
+    """
+
+    # Klíčové sloupce pro detekci duplicit v souboru
+    ROW_KEY_COLUMNS = ["account", "date", "type", "symbol", "quantity", "price"]
+
+    # Obchody mění držené množství (prodej se ukládá se záporným množstvím)
+    TRADE_SIGNS = {"BUY": 1.0, "SELL": -1.0}
+
+    # Typy zapisované do tabulky dividends a fx_conversions
+    DIVIDEND_TYPES = {"DIVIDEND", "TAX"}
+    FX_TYPE = "FX"
+
+    # Typy, které se nezapisují (pohyby hotovosti bez aktiva)
+    SKIPPED_TYPES = {"DEPOSIT"}
+
+    @classmethod
+    def _row_hashes(cls, frame: pd.DataFrame) -> np.ndarray:
+        """64bitové hashe klíčových hodnot řádků pro detekci duplicit"""
+        key = pd.Series("", index=frame.index)
+        for i, column in enumerate(cls.ROW_KEY_COLUMNS):
+            values = frame[column].astype(str) if column in frame.columns else ""
+            key = key + ("|" if i else "") + values
+        return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+    @staticmethod
+    def _records(frame: pd.DataFrame) -> List[Dict]:
+        """Řádky jako slovníky, chybějící hodnoty jako None"""
+        frame = frame.astype(object)
+        return frame.where(frame.notna(), None).to_dict('records')
+
+    @classmethod
+    def _existing_duplicates(
+        cls,
+        db: Session,
+        account_id: uuid.UUID,
+        frame: pd.DataFrame
+    ) -> pd.Series:
+        """Maska řádků, jejichž otisk už má cílový účet uložený"""
+        mask = pd.Series(False, index=frame.index)
+        if "symbol" not in frame.columns:
+            return mask
+
+        symbols = frame["symbol"].dropna().unique().tolist()
+        asset_ids = dict(
+            db.query(Asset.symbol, Asset.id)
+                .filter(Asset.symbol.in_(symbols))
+                .all()
+        )
+        rows = cls.prepare_transactions(frame[frame["symbol"].isin(asset_ids)])
+        if rows.empty:
+            return mask
+
+        fingerprints = TransactionFingerprint.compute(pd.DataFrame({
+            'trade_time': rows['date'],
+            'type': rows['type'],
+            'asset_id': rows['symbol'].map(asset_ids),
+            'quantity': rows['quantity'],
+            'price': rows['price']
+        }))
+        existing = TransactionFingerprint.existing(db, account_id, fingerprints)
+        mask[rows.index] = np.isin(fingerprints, existing)
+        return mask
+
+    @staticmethod
+    def normalize_types(frame: pd.DataFrame) -> pd.DataFrame:
+        """Sjednotí typy transakcí (velká písmena, "BUY - MARKET" -> BUY)"""
+        if frame.empty:
+            return frame
+        types = frame["type"].astype(str).str.strip().str.upper()
+        trade = types.str.extract(r"^(BUY|SELL)\b", expand=False)
+        return frame.assign(type=trade.fillna(types))
+
+    @classmethod
+    def _with_symbol(cls, frame: pd.DataFrame) -> pd.Series:
+        if "symbol" not in frame.columns:
+            return pd.Series(False, index=frame.index)
+        return frame["symbol"].notna() & (frame["symbol"] != "")
+
+    @classmethod
+    def prepare_transactions(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Vybere řádky zapisované jako transakce a sjednotí typ a znaménko
+        množství (BUY kladné, SELL záporné, SPLIT poměr, ostatní typy
+        s nulovým množstvím)
+        """
+        frame = cls.normalize_types(frame)
+        if frame.empty:
+            return frame
+
+        excluded = cls.SKIPPED_TYPES | cls.DIVIDEND_TYPES | {cls.FX_TYPE}
+        frame = frame[cls._with_symbol(frame) & ~frame["type"].isin(excluded)].copy()
+
+        quantity = pd.to_numeric(frame["quantity"], errors="coerce").abs()
+        # SPLIT si ponechá poměr v quantity
+        sign = frame["type"].map({**cls.TRADE_SIGNS, SPLIT_TYPE: 1.0})
+        frame["quantity"] = (quantity * sign).fillna(0.0)
+        return frame
+
+    @classmethod
+    def prepare_dividends(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """Řádky dividend a srážkové daně (s aktivem)"""
+        frame = cls.normalize_types(frame)
+        if frame.empty:
+            return frame
+        return frame[cls._with_symbol(frame) & frame["type"].isin(cls.DIVIDEND_TYPES)]
+
+    @classmethod
+    def prepare_conversions(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """Řádky převodů mezi měnami"""
+        frame = cls.normalize_types(frame)
+        if frame.empty:
+            return frame
+        return frame[frame["type"] == cls.FX_TYPE]
+
+    @classmethod
+    def preview(
+        cls,
+        parser: BrokerParser,
+        file_path: str,
+        preview_rows: int = 100,
+        db: Session = None,
+        account_id: uuid.UUID = None,
+        chunksize: int = None,
+        stash_user: uuid.UUID = None
+    ) -> CSVImportPreview:
+        """
+        Projde soubor po částech a vrátí náhled dat včetně kontrolního součtu.
+        Se zadaným účtem hledá i řádky, které už účet obsahuje. Se zadaným
+        uživatelem uloží normalizované dávky pro import bez nového nahrání.
+        """
+        stash = ImportStash.writer() if stash_user is not None else None
+        try:
+            preview = cls._preview(parser, file_path, preview_rows, db, account_id, chunksize, stash)
+        except BaseException:
+            if stash is not None:
+                stash.discard()
+            raise
+
+        if stash is not None:
+            ImportStash.commit(stash, preview.checksum, stash_user, parser.name)
+        return preview
+
+    @classmethod
+    def _preview(
+        cls,
+        parser: BrokerParser,
+        file_path: str,
+        preview_rows: int,
+        db: Optional[Session],
+        account_id: Optional[uuid.UUID],
+        chunksize: Optional[int],
+        stash: Optional[StashWriter]
+    ) -> CSVImportPreview:
+        hasher = hashlib.sha256()
+        total_rows = 0
+        preview = []
+        hashes = []
+        existing_duplicates = []
+        existing_duplicate_count = 0
+
+        check_existing = db is not None and account_id is not None
+
+        for frame in parser.iter_frames(file_path, hasher, chunksize):
+            if stash is not None:
+                stash.append(frame)
+            frame_hashes = cls._row_hashes(frame)
+            hashes.append(frame_hashes)
+            frame['row_hash'] = [format(h, "016x") for h in frame_hashes]
+            total_rows += len(frame)
+            if len(preview) < preview_rows:
+                preview.extend(cls._records(frame.head(preview_rows - len(preview))))
+
+            if check_existing:
+                mask = cls._existing_duplicates(db, account_id, frame)
+                existing_duplicate_count += int(mask.sum())
+                if len(existing_duplicates) < preview_rows:
+                    existing_duplicates.extend(
+                        cls._records(frame[mask].head(preview_rows - len(existing_duplicates)))
+                    )
+
+        # Detekce duplicit v souboru - druhý průchod jen pro opakované hashe
+        values, counts = np.unique(
+            np.concatenate(hashes) if hashes else np.empty(0, dtype="uint64"),
+            return_counts=True
+        )
+        duplicate_hashes = values[counts > 1][:preview_rows]
+        duplicates = []
+        if len(duplicate_hashes):
+            for frame in parser.iter_frames(file_path, chunksize=chunksize):
+                frame_hashes = cls._row_hashes(frame)
+                mask = np.isin(frame_hashes, duplicate_hashes)
+                duplicates.append(frame[mask].assign(_hash=frame_hashes[mask]))
+            duplicates = pd.concat(duplicates)\
+                .sort_values('_hash', kind='stable')\
+                .head(preview_rows)
+            duplicates['row_hash'] = [format(h, "016x") for h in duplicates.pop('_hash')]
+            duplicates = cls._records(duplicates)
+
+        return CSVImportPreview(
+            total_rows=total_rows,
+            preview_rows=preview,
+            checksum=hasher.hexdigest(),
+            duplicates=duplicates,
+            existing_duplicates=existing_duplicates,
+            existing_duplicate_count=existing_duplicate_count
+        )
+
+    @staticmethod
+    def iter_verified(
+        parser: BrokerParser,
+        file_path: str,
+        checksum: str,
+        chunksize: int = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Normalizované dávky souboru. Kontrolní součet se ověří po poslední
+        dávce, volající proto potvrzuje zápis až po úplném projití generátoru.
+        """
+        hasher = hashlib.sha256()
+        yield from parser.iter_frames(file_path, hasher, chunksize)
+
+        if hasher.hexdigest() != checksum:
+            raise ValueError("Checksum mismatch - file has changed since preview")
+
+    @classmethod
+    def execute(
+        cls,
+        parser: BrokerParser,
+        file_path: str,
+        checksum: str,
+        db: Session,
+        account: Account,
+        chunksize: int = None,
+        skip_duplicates: bool = False,
+        progress: Callable[[int, int], None] = None
+    ) -> Dict:
+        """
+        Zpracuje a zapíše soubor na účet (viz execute_frames), kontrolní
+        součet se ověří před potvrzením zápisu
+        """
+        return cls.execute_frames(
+            cls.iter_verified(parser, file_path, checksum, chunksize),
+            db,
+            account,
+            skip_duplicates=skip_duplicates,
+            progress=progress
+        )
+
+    @classmethod
+    def execute_frames(
+        cls,
+        frames: Iterable[pd.DataFrame],
+        db: Session,
+        account: Account,
+        skip_duplicates: bool = False,
+        progress: Callable[[int, int], None] = None
+    ) -> Dict:
+        """
+        Zapíše normalizované dávky na účet - obchody do transactions,
+        dividendy a daně do dividends, převody měn do fx_conversions.
+        Commit proběhne až po poslední dávce, při chybě se zápis vrátí.
+
+        skip_duplicates vynechá transakce, dividendy a převody, jejichž otisk
+        účet už obsahuje, progress se volá po každé dávce s počtem
+        zpracovaných a zapsaných řádků.
+        """
+        writer = TransactionBulkWriter(
+            db,
+            account.id,
+            account.currency,
+            skip_duplicates=skip_duplicates
+        )
+        portfolio_id = account.portfolio_id
+        total_rows = 0
+        first_day: Optional = None
+        # Dividendy a daně se zapíší až po poslední dávce, aby se daň
+        # spárovala s dividendou i přes hranici dávek
+        dividend_frames = []
+        # Převody měn doplní chybějící kurzy do fx_rates
+        conversion_frames = []
+
+        def written_from(frame: pd.DataFrame) -> None:
+            nonlocal first_day
+            batch_first = pd.to_datetime(frame['date']).min().date()
+            first_day = batch_first if first_day is None else min(first_day, batch_first)
+
+        try:
+            for frame in frames:
+                total_rows += len(frame)
+                frame = cls.normalize_types(frame)
+                dividend_frames.append(cls.prepare_dividends(frame))
+                conversions = cls.prepare_conversions(frame)
+                conversion_frames.append(conversions)
+                written = writer.write(cls.prepare_transactions(frame))\
+                    + writer.write_conversions(conversions)
+                if written:
+                    written_from(frame)
+                if progress is not None:
+                    progress(total_rows, writer.rows + writer.dividends + writer.conversions)
+
+            dividends = pd.concat(dividend_frames) if dividend_frames else pd.DataFrame()
+            if writer.write_dividends(dividends):
+                written_from(dividends)
+                if progress is not None:
+                    progress(total_rows, writer.rows + writer.dividends + writer.conversions)
+
+            if writer.conversions:
+                FxRateLoader.from_conversions(db, pd.concat(conversion_frames))
+            if first_day is not None:
+                CacheInvalidation.portfolios_changed(db, [portfolio_id], first_day)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return {
+            "status": "success",
+            "total_rows": total_rows,
+            "imported_rows": writer.rows,
+            "skipped_duplicates": writer.skipped,
+            "dividends": writer.dividends,
+            "fx_conversions": writer.conversions,
+            "write_stats": writer.stats()
+        }
@@ -0,0 +1,32 @@
+from typing import Iterator
+import pandas as pd
+
+from app.services.brokers.base import BrokerParser
+from app.services.csv_import import CSVImportService, CSVMapping
+
+
+class MappedCSVParser(BrokerParser):
+    """
+    Parser obecného CSV podle mapování sloupců (přednastavená mapování
+    brokerů i vlastní mapování uživatele)
+    """
+
+    def __init__(self, mapping: CSVMapping, name: str = "custom"):
+        self.mapping = mapping
+        self.name = name
+        self.label = mapping.name
+
+    def sniff(self, file_path: str) -> bool:
+        header = self.read_header(file_path, skip_rows=self.mapping.skip_rows)
+        return bool(header) and set(self.mapping.column_mapping.values()) <= set(header)
+
+    def iter_frames(
+        self,
+        file_path: str,
+        hasher=None,
+        chunksize: int = None
+    ) -> Iterator[pd.DataFrame]:
+        for chunk in CSVImportService.read_chunks(file_path, self.mapping, chunksize):
+            if hasher is not None:
+                hasher.update(pd.util.hash_pandas_object(chunk).values.tobytes())
+            yield CSVImportService.normalize_chunk(chunk, self.mapping)
@@ -0,0 +1,43 @@
+from typing import Dict, List, Optional
+
+from app.services.brokers.base import BrokerParser
+from app.services.brokers.fio import FIOBrokerParser
+from app.services.brokers.presets import MappedCSVParser
+from app.services.csv_import import CSVImportService
+
+
+class BrokerRegistry:
+    """
+    Registr parserů brokerů. Nový broker = jeden modul s parserem
+    a jeho registrace zde.
+    """
+
+    _parsers: Dict[str, BrokerParser] = {}
+
+    @classmethod
+    def register(cls, parser: BrokerParser) -> BrokerParser:
+        cls._parsers[parser.name] = parser
+        return parser
+
+    @classmethod
+    def get(cls, name: str) -> Optional[BrokerParser]:
+        return cls._parsers.get(name)
+
+    @classmethod
+    def all(cls) -> List[BrokerParser]:
+        return list(cls._parsers.values())
+
+    @classmethod
+    def detect(cls, file_path: str) -> Optional[BrokerParser]:
+        """Rozpozná formát souboru podle hlavičky (první shodný parser)"""
+        for parser in cls._parsers.values():
+            if parser.sniff(file_path):
+                return parser
+        return None
+
+
+# Specializované parsery mají přednost před obecnými mapováními
+BrokerRegistry.register(FIOBrokerParser())
+for key, mapping in CSVImportService.PRESET_MAPPINGS.items():
+    if BrokerRegistry.get(key) is None:
+        BrokerRegistry.register(MappedCSVParser(mapping, name=key))
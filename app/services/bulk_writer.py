@@ -0,0 +1,386 @@
+from typing import Dict, List, Tuple
+import io
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert as sa_insert
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import Account, Asset, Dividend, FxConversion, Portfolio, Transaction
+from app.services.fingerprint import TransactionFingerprint
+from app.services.fx import FxRates
+from app.services.valuation import ValuationEngine
+
+
+class TransactionBulkWriter:
+    """
+    Hromadný zápis transakcí importu (včetně dividend a převodů mezi měnami).
+
+    Na PostgreSQL se dávky zapisují přes COPY FROM STDIN ve formátu CSV,
+    jinde (SQLite) přes executemany. Zápis probíhá v transakci session,
+    commit provádí volající.
+    """
+
+    # Zapisované sloupce (id a created_at doplní výchozí hodnoty)
+    COLUMNS = [
+        'account_id',
+        'asset_id',
+        'type',
+        'quantity',
+        'price',
+        'fee',
+        'tax',
+        'gross_amount',
+        'trade_currency',
+        'fx_rate_to_portfolio',
+        'trade_time',
+        'notes',
+        'fingerprint'
+    ]
+
+    DIVIDEND_COLUMNS = [
+        'account_id',
+        'asset_id',
+        'ex_date',
+        'pay_date',
+        'gross_amount',
+        'withholding_tax',
+        'net_amount',
+        'currency',
+        'fingerprint'
+    ]
+
+    CONVERSION_COLUMNS = [
+        'account_id',
+        'trade_time',
+        'source_currency',
+        'target_currency',
+        'source_amount',
+        'target_amount',
+        'fx_rate',
+        'fee',
+        'notes',
+        'fingerprint'
+    ]
+
+    # Okno pro přiřazení srážkové daně k dividendě
+    TAX_MATCH_WINDOW = pd.Timedelta(days=14)
+
+    def __init__(
+        self,
+        db: Session,
+        account_id: uuid.UUID,
+        default_currency: str,
+        batch_size: int = None,
+        skip_duplicates: bool = False
+    ):
+        self.db = db
+        self.account_id = account_id
+        self.default_currency = default_currency
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.use_copy = db.get_bind().dialect.name == "postgresql"
+        # Záznamy, jejichž otisk účet už obsahoval, se nezapisují znovu
+        self.skip_duplicates = skip_duplicates
+        # Otisky zapsané tímto importem podle tabulky
+        # (opakované řádky souboru nejsou duplicity)
+        self.written_fingerprints: Dict[str, np.ndarray] = {}
+        self.rows = 0
+        self.skipped = 0
+        self.dividends = 0
+        self.conversions = 0
+        self.seconds = 0.0
+        # Cache symbol -> id aktiva po dobu importu
+        self.asset_ids: Dict[str, uuid.UUID] = {}
+        # Základní měna portfolia účtu (kurz fx_rate_to_portfolio)
+        self.base_currency = db.query(Portfolio.base_currency)\
+            .join(Account, Account.portfolio_id == Portfolio.id)\
+            .filter(Account.id == account_id)\
+            .scalar()
+
+    @staticmethod
+    def resolve_assets(db: Session, assets: pd.DataFrame) -> Dict[str, uuid.UUID]:
+        """
+        Vrátí id aktiv podle symbolu, chybějící aktiva založí
+        (sloupce symbol, name, currency)
+        """
+        assets = assets.dropna(subset=['symbol']).drop_duplicates('symbol')
+        symbols = assets['symbol'].tolist()
+        if not symbols:
+            return {}
+
+        existing = dict(
+            db.query(Asset.symbol, Asset.id)
+                .filter(Asset.symbol.in_(symbols))
+                .all()
+        )
+        missing = assets[~assets['symbol'].isin(existing)]
+        if len(missing):
+            rows = [
+                {
+                    'id': uuid.uuid4(),
+                    'symbol': row.symbol,
+                    'name': row.name if isinstance(row.name, str) and row.name else row.symbol,
+                    'type': 'stock',
+                    'currency': row.currency
+                }
+                for row in missing.itertuples(index=False)
+            ]
+            if db.get_bind().dialect.name == "postgresql":
+                # Souběžný import mohl aktivum mezitím založit
+                db.execute(insert(Asset).on_conflict_do_nothing(index_elements=['symbol']), rows)
+            else:
+                db.execute(sa_insert(Asset), rows)
+            existing.update(
+                db.query(Asset.symbol, Asset.id)
+                    .filter(Asset.symbol.in_(missing['symbol'].tolist()))
+                    .all()
+            )
+        return existing
+
+    @staticmethod
+    def _column(batch: pd.DataFrame, name: str, default=None) -> pd.Series:
+        if name in batch.columns:
+            return batch[name]
+        return pd.Series(default, index=batch.index)
+
+    def _currency(self, batch: pd.DataFrame) -> pd.Series:
+        return self._column(batch, 'currency', self.default_currency).fillna(self.default_currency)
+
+    def _asset_ids(self, batch: pd.DataFrame) -> pd.Series:
+        """
+        Id aktiv řádků dávky. Symboly, které ještě nejsou v cache,
+        se dohledají a chybějící založí najednou.
+        """
+        assets = pd.DataFrame({
+            'symbol': self._column(batch, 'symbol'),
+            'name': self._column(batch, 'name'),
+            'currency': self._currency(batch)
+        })
+        missing = assets[assets['symbol'].notna() & ~assets['symbol'].isin(self.asset_ids)]
+        if len(missing):
+            self.asset_ids.update(self.resolve_assets(self.db, missing))
+        return assets['symbol'].map(self.asset_ids)
+
+    def _fx_rates(self, currencies: pd.Series, times: pd.Series) -> np.ndarray:
+        """
+        Kurz měny obchodu do základní měny portfolia ke dni obchodu.
+        Bez načteného kurzu NaN (v tabulce NULL), ne 1.
+        """
+        if self.base_currency is None or currencies.empty:
+            return np.full(len(currencies), np.nan)
+        days = times.dt.tz_localize(None) if times.dt.tz is not None else times
+        days = days.dt.normalize()
+        if days.isna().all():
+            return np.full(len(currencies), np.nan)
+        fx = FxRates.matrix(
+            self.db,
+            set(currencies),
+            self.base_currency,
+            ValuationEngine.date_index(days.min().date(), days.max().date())
+        )
+        rows = fx.index.get_indexer(days)
+        rates = fx.to_numpy()[rows, fx.columns.get_indexer(currencies)]
+        return np.where(rows >= 0, rates, np.nan)
+
+    def _prepare(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """Převede normalizované řádky importu na sloupce tabulky transactions"""
+        def column(name, default=None):
+            return self._column(batch, name, default)
+
+        frame = pd.DataFrame({
+            'account_id': self.account_id,
+            'asset_id': self._asset_ids(batch),
+            'type': column('type').astype(str).str.upper(),
+            'quantity': pd.to_numeric(column('quantity')),
+            'price': pd.to_numeric(column('price')),
+            'fee': pd.to_numeric(column('fee', 0)).fillna(0),
+            'tax': pd.to_numeric(column('tax', 0)).fillna(0),
+            'gross_amount': pd.to_numeric(column('gross_amount')),
+            'trade_currency': self._currency(batch),
+            'fx_rate_to_portfolio': np.nan,
+            'trade_time': pd.to_datetime(column('date')),
+            'notes': column('notes')
+        }, index=batch.index)
+        frame['fx_rate_to_portfolio'] = self._fx_rates(frame['trade_currency'], frame['trade_time'])
+
+        if frame['asset_id'].isna().any():
+            raise ValueError("Missing symbol in imported rows")
+        frame['fingerprint'] = TransactionFingerprint.compute(frame)
+        return self._skip_existing(frame, Transaction)
+
+    def _skip_existing(self, frame: pd.DataFrame, model) -> pd.DataFrame:
+        """
+        Vynechá záznamy, jejichž otisk má účet v tabulce modelu uložený
+        z dřívějška (při skip_duplicates)
+        """
+        if not self.skip_duplicates or frame.empty:
+            return frame
+        table = model.__tablename__
+        written = self.written_fingerprints.get(table, np.empty(0, dtype="int64"))
+        fingerprints = frame['fingerprint'].to_numpy()
+        stored = np.setdiff1d(
+            TransactionFingerprint.existing(self.db, self.account_id, fingerprints, model),
+            written
+        )
+        existing = np.isin(fingerprints, stored)
+        self.skipped += int(existing.sum())
+        frame = frame[~existing]
+        self.written_fingerprints[table] = np.union1d(written, frame['fingerprint'].to_numpy())
+        return frame
+
+    def _prepare_dividends(self, batch: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Sloučí řádky DIVIDEND stejného aktiva, dne a měny do záznamů tabulky
+        dividends a přiřadí k nim srážkovou daň z řádků TAX - každá daň patří
+        nejbližší dividendě stejného aktiva a měny v okně TAX_MATCH_WINDOW.
+        Vrací záznamy dividend a řádky TAX, ke kterým dividenda není.
+        """
+        trans_type = self._column(batch, 'type').astype(str).str.upper()
+        amount = pd.to_numeric(self._column(batch, 'gross_amount')).abs().fillna(0)
+        tax = pd.to_numeric(self._column(batch, 'tax', 0)).abs().fillna(0)
+        rows = pd.DataFrame({
+            'asset_id': self._asset_ids(batch),
+            'pay_date': pd.to_datetime(self._column(batch, 'date')).dt.normalize(),
+            'currency': self._currency(batch),
+            'gross_amount': amount,
+            'withholding_tax': tax
+        }, index=batch.index)
+
+        if rows['asset_id'].isna().any():
+            raise ValueError("Missing symbol in imported rows")
+        is_tax = trans_type == 'TAX'
+        frame = rows[~is_tax].groupby(['asset_id', 'pay_date', 'currency'], sort=False)\
+            .sum()\
+            .reset_index()
+
+        taxes = rows[is_tax].rename_axis('row').reset_index()\
+            .astype({'currency': str})\
+            .sort_values('pay_date', kind='stable')
+        dividends = frame[['asset_id', 'pay_date', 'currency']]\
+            .astype({'currency': str})\
+            .assign(dividend=np.arange(len(frame)))\
+            .sort_values('pay_date', kind='stable')
+        matched = pd.merge_asof(
+            taxes,
+            dividends,
+            on='pay_date',
+            by=['asset_id', 'currency'],
+            direction='nearest',
+            tolerance=self.TAX_MATCH_WINDOW
+        )
+        withheld = matched.groupby('dividend')['gross_amount'].sum()
+        frame['withholding_tax'] += withheld.reindex(np.arange(len(frame)), fill_value=0.0).to_numpy()
+
+        frame['account_id'] = self.account_id
+        # Export ex-date neobsahuje
+        frame['ex_date'] = None
+        frame['net_amount'] = frame['gross_amount'] - frame['withholding_tax']
+        frame['fingerprint'] = TransactionFingerprint.compute_dividends(frame)
+        return self._skip_existing(frame, Dividend), batch.loc[matched.loc[matched['dividend'].isna(), 'row']]
+
+    def _prepare_conversions(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """Převede řádky FX na záznamy tabulky fx_conversions"""
+        def column(name, default=None):
+            return self._column(batch, name, default)
+
+        frame = pd.DataFrame({
+            'account_id': self.account_id,
+            'trade_time': pd.to_datetime(column('date')),
+            'source_currency': column('source_currency'),
+            'target_currency': column('target_currency'),
+            'source_amount': pd.to_numeric(column('source_amount')),
+            'target_amount': pd.to_numeric(column('target_amount')),
+            'fx_rate': pd.to_numeric(column('fx_rate')),
+            'fee': pd.to_numeric(column('fee', 0)).fillna(0),
+            'notes': column('notes')
+        }, index=batch.index)
+        # Bez obou měn a částek nelze převod zaznamenat
+        frame = frame.dropna(subset=['source_currency', 'target_currency', 'source_amount', 'target_amount'])
+        frame['fingerprint'] = TransactionFingerprint.compute_conversions(frame)
+        return self._skip_existing(frame, FxConversion)
+
+    def _copy(self, frame: pd.DataFrame, table: str, columns: List[str]) -> None:
+        buffer = io.StringIO()
+        frame.to_csv(buffer, columns=columns, header=False, index=False)
+        buffer.seek(0)
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def _executemany(self, frame: pd.DataFrame, model, columns: List[str]) -> None:
+        rows = frame[columns].astype(object).where(frame[columns].notna(), None)
+        self.db.execute(sa_insert(model), rows.to_dict('records'))
+
+    def _write(self, frame: pd.DataFrame, model, columns: List[str]) -> None:
+        for start in range(0, len(frame), self.batch_size):
+            part = frame.iloc[start:start + self.batch_size]
+            if self.use_copy:
+                self._copy(part, model.__tablename__, columns)
+            else:
+                self._executemany(part, model, columns)
+
+    def write(self, batch: pd.DataFrame) -> int:
+        """
+        Zapíše dávku normalizovaných řádků importu, vrací počet zapsaných řádků
+        """
+        if batch.empty:
+            return 0
+        started = time.perf_counter()
+        frame = self._prepare(batch)
+        self._write(frame, Transaction, self.COLUMNS)
+
+        self.rows += len(frame)
+        self.seconds += time.perf_counter() - started
+        return len(frame)
+
+    def write_dividends(self, batch: pd.DataFrame) -> int:
+        """
+        Zapíše řádky DIVIDEND a TAX do tabulky dividends, vrací počet záznamů.
+        Daň bez dividendy v okně se zapíše jako transakce TAX. Řádky
+        se párují jen v rámci batch, volající proto předává všechny
+        dividendy importu najednou.
+        """
+        if batch.empty:
+            return 0
+        started = time.perf_counter()
+        frame, unmatched = self._prepare_dividends(batch)
+        self._write(frame, Dividend, self.DIVIDEND_COLUMNS)
+        self.dividends += len(frame)
+        self.seconds += time.perf_counter() - started
+
+        # Daň není pohyb množství aktiva
+        return len(frame) + self.write(unmatched.assign(quantity=0.0))
+
+    def write_conversions(self, batch: pd.DataFrame) -> int:
+        """
+        Zapíše řádky FX do tabulky fx_conversions, vrací počet záznamů
+        """
+        if batch.empty:
+            return 0
+        started = time.perf_counter()
+        frame = self._prepare_conversions(batch)
+        self._write(frame, FxConversion, self.CONVERSION_COLUMNS)
+
+        self.conversions += len(frame)
+        self.seconds += time.perf_counter() - started
+        return len(frame)
+
+    def stats(self) -> Dict:
+        records = self.rows + self.dividends + self.conversions
+        return {
+            'rows': self.rows,
+            'skipped_duplicates': self.skipped,
+            'dividends': self.dividends,
+            'fx_conversions': self.conversions,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(records / self.seconds, 1) if self.seconds else None
+        }
@@ -0,0 +1,327 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import json
+import logging
+import threading
+import time
+import uuid
+
+import pandas as pd
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalTTLCache:
+    """
+    Lokální LRU cache s omezenou velikostí a dobou platnosti záznamů
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Vrátí hodnotu nebo _MISSING"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float = None) -> None:
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AnalyticsCache:
+    """
+    Dvouúrovňová cache analytiky: lokální LRU s TTL před Redisem.
+
+    Klíče portfolií a aktiv obsahují číslo generace uložené v Redisu,
+    zneplatnění tak znamená jen zvýšení generace a staré záznamy vyprší.
+    Souběžné požadavky na stejný klíč spustí výpočet jen jednou
+    (v rámci procesu přes Event, mezi procesy přes zámek v Redisu).
+    Bez dostupného Redisu cache funguje jen lokálně.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        namespace: str = "analytics",
+        max_entries: int = None,
+        ttl: int = None,
+        lock_timeout: int = None
+    ):
+        self.namespace = namespace
+        self.ttl = ttl or settings.ANALYTICS_CACHE_TTL
+        self.lock_timeout = lock_timeout or settings.ANALYTICS_CACHE_LOCK_TIMEOUT
+        self.local = LocalTTLCache(
+            max_entries or settings.ANALYTICS_CACHE_MAX_ENTRIES,
+            self.ttl
+        )
+        self._redis = redis_client
+        self._redis_checked = redis_client is not None
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        self._local_generations: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "coalesced": 0}
+
+    # Redis
+
+    @property
+    def redis(self) -> Optional[redis.Redis]:
+        """Redis klient vytvořený při prvním použití z REDIS_URL"""
+        if not self._redis_checked:
+            self._redis_checked = True
+            try:
+                client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1)
+                client.ping()
+                self._redis = client
+            except redis.RedisError as e:
+                logger.warning("Redis is not available, using local cache only: %s", e)
+                self._redis = None
+        return self._redis
+
+    def _redis_call(self, method: str, *args, **kwargs):
+        client = self.redis
+        if client is None:
+            return None
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except redis.RedisError as e:
+            logger.warning("Redis %s failed: %s", method, e)
+            return None
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    # Generace
+
+    def generation(self, scope: str) -> int:
+        """Aktuální generace oboru (např. portfolio:<id>, asset:<id>)"""
+        return self.generations([scope])[scope]
+
+    def bump(self, scopes: Iterable[str]) -> None:
+        """Zneplatní všechny záznamy oborů zvýšením jejich generace"""
+        for scope in set(scopes):
+            self._local_generations[scope] = self._local_generations.get(scope, 0) + 1
+            self._redis_call("incr", self._key(f"gen:{scope}"))
+
+    def generations(self, scopes: List[str]) -> Dict[str, int]:
+        """Generace více oborů jedním dotazem"""
+        values = self._redis_call("mget", [self._key(f"gen:{s}") for s in scopes])
+        if values is None:
+            return {s: self._local_generations.get(s, 0) for s in scopes}
+        return {s: int(v) if v is not None else 0 for s, v in zip(scopes, values)}
+
+    def portfolio_key(self, portfolio_id: uuid.UUID, key: str) -> str:
+        scope = f"portfolio:{portfolio_id}"
+        return f"{scope}:{self.generation(scope)}:{key}"
+
+    def asset_keys(self, asset_ids: Iterable[uuid.UUID], key: str) -> Dict[uuid.UUID, str]:
+        """Klíče pro více aktiv (generace se načtou jedním MGET)"""
+        scopes = {asset_id: f"asset:{asset_id}" for asset_id in asset_ids}
+        generations = self.generations(list(scopes.values()))
+        return {
+            asset_id: f"{scope}:{generations[scope]}:{key}"
+            for asset_id, scope in scopes.items()
+        }
+
+    # Čtení a zápis
+
+    def get(self, key: str, decode: Callable = json.loads) -> Any:
+        """Vrátí hodnotu z lokální cache nebo z Redisu, jinak _MISSING"""
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count("local_hits")
+            return value
+
+        raw = self._redis_call("get", self._key(key))
+        if raw is not None:
+            value = decode(raw)
+            self.local.set(key, value)
+            self._count("redis_hits")
+            return value
+
+        self._count("misses")
+        return _MISSING
+
+    def get_many(self, keys: List[str], decode: Callable = json.loads) -> Dict[str, Any]:
+        """Hromadné čtení - vrací jen nalezené klíče"""
+        found = {}
+        remote = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is not _MISSING:
+                found[key] = value
+            else:
+                remote.append(key)
+        self._count("local_hits", len(found))
+
+        if remote:
+            raws = self._redis_call("mget", [self._key(k) for k in remote]) or [None] * len(remote)
+            for key, raw in zip(remote, raws):
+                if raw is not None:
+                    found[key] = decode(raw)
+                    self.local.set(key, found[key])
+                    self._count("redis_hits")
+                else:
+                    self._count("misses")
+        return found
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = None,
+        encode: Callable = json.dumps
+    ) -> None:
+        ttl = ttl or self.ttl
+        self.local.set(key, value, ttl)
+        self._redis_call("set", self._key(key), encode(value), ex=ttl)
+
+    def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: int = None,
+        encode: Callable = json.dumps
+    ) -> None:
+        ttl = ttl or self.ttl
+        for key, value in items.items():
+            self.local.set(key, value, ttl)
+
+        client = self.redis
+        if client is None or not items:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(self._key(key), encode(value), ex=ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Redis pipeline failed: %s", e)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int = None,
+        encode: Callable = json.dumps,
+        decode: Callable = json.loads
+    ) -> Any:
+        """
+        Vrátí hodnotu z cache, jinak ji spočítá - souběžné požadavky
+        na stejný klíč čekají na jediný výpočet
+        """
+        value = self.get(key, decode)
+        if value is not _MISSING:
+            return value
+
+        # Single-flight v rámci procesu
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            self._count("coalesced")
+            event.wait(self.lock_timeout)
+            value = self.local.get(key)
+            if value is not _MISSING:
+                return value
+            # Vedoucí výpočet selhal nebo vypršel - počítáme sami
+            return compute()
+
+        try:
+            return self._compute_distributed(key, compute, ttl, encode, decode)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _compute_distributed(self, key, compute, ttl, encode, decode) -> Any:
+        """Výpočet chráněný zámkem v Redisu proti souběhu mezi procesy"""
+        lock_key = self._key(f"lock:{key}")
+        acquired = self._redis_call("set", lock_key, "1", nx=True, px=self.lock_timeout * 1000)
+
+        if acquired is None and self.redis is not None:
+            # Výpočet běží v jiném procesu - čekáme na jeho výsledek
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                raw = self._redis_call("get", self._key(key))
+                if raw is not None:
+                    value = decode(raw)
+                    self.local.set(key, value)
+                    self._count("coalesced")
+                    return value
+                if not self._redis_call("exists", lock_key):
+                    break
+                time.sleep(0.05)
+
+        try:
+            value = compute()
+            self.set(key, value, ttl, encode)
+            return value
+        finally:
+            if acquired:
+                self._redis_call("delete", lock_key)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["local_entries"] = len(self.local)
+        stats["redis"] = self.redis is not None
+        return stats
+
+
+def encode_series(series: pd.Series) -> str:
+    """Serializace denní cenové řady (dny jako ISO data, hodnoty jako float)"""
+    return json.dumps({
+        "dates": [d.isoformat() for d in series.index.date],
+        "values": [None if pd.isna(v) else v for v in series.tolist()]
+    })
+
+
+def decode_series(raw) -> pd.Series:
+    data = json.loads(raw)
+    return pd.Series(
+        data["values"],
+        index=pd.DatetimeIndex(data["dates"]),
+        dtype="float64"
+    )
+
+
+analytics_cache = AnalyticsCache()
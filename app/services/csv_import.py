@@ -1,9 +1,10 @@
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from pydantic import BaseModel, Field
 import pandas as pd
 from datetime import datetime
-import hashlib
+
+from app.core.config import settings
 
 
 class CSVColumnType(str, Enum):
@@ -36,6 +37,8 @@ class CSVImportPreview(BaseModel):
     preview_rows: List[Dict]
     checksum: str
     duplicates: List[Dict]
+    existing_duplicates: List[Dict] = []  # řádky již uložené na cílovém účtu
+    existing_duplicate_count: int = 0
 
 
 class CSVImportService:
@@ -98,108 +101,29 @@ class CSVImportService:
     }
 
     @staticmethod
-    def _calculate_row_hash(row: Dict) -> str:
-        """Vytvoří hash z klíčových hodnot řádku pro detekci duplicit"""
-        key_values = [
-            str(row.get(col.value, "")) for col in [
-                CSVColumnType.ACCOUNT,
-                CSVColumnType.DATE,
-                CSVColumnType.TYPE,
-                CSVColumnType.SYMBOL,
-                CSVColumnType.QUANTITY,
-                CSVColumnType.PRICE
-            ]
-        ]
-        return hashlib.sha256("|".join(key_values).encode()).hexdigest()
-
-    @staticmethod
-    def preview_import(
+    def read_chunks(
         file_path: str,
         mapping: CSVMapping,
-        preview_rows: int = 100
-    ) -> CSVImportPreview:
-        """
-        Načte CSV soubor a vrátí náhled dat včetně kontrolního součtu
-        """
-        # Načtení CSV s použitím mapování
-        df = pd.read_csv(
+        chunksize: int = None
+    ) -> Iterator[pd.DataFrame]:
+        """Čte CSV po částech pevné velikosti"""
+        return pd.read_csv(
             file_path,
             skiprows=mapping.skip_rows,
             decimal=mapping.decimal_separator,
-            thousands=mapping.thousands_separator
-        )
-
-        # Přejmenování sloupců podle mapování
-        reverse_mapping = {v: k.value for k, v in mapping.column_mapping.items()}
-        df = df.rename(columns=reverse_mapping)
-
-        # Převod data
-        if CSVColumnType.DATE.value in df.columns:
-            df[CSVColumnType.DATE.value] = pd.to_datetime(
-                df[CSVColumnType.DATE.value],
-                format=mapping.date_format
-            )
-
-        # Výpočet kontrolního součtu
-        checksum = hashlib.sha256(
-            pd.util.hash_pandas_object(df).values.tobytes()
-        ).hexdigest()
-
-        # Detekce duplicit
-        df['row_hash'] = df.apply(
-            lambda row: CSVImportService._calculate_row_hash(row.to_dict()),
-            axis=1
-        )
-        duplicates = df[df.duplicated('row_hash', keep=False)]\
-            .sort_values('row_hash')\
-            .head(preview_rows)\
-            .to_dict('records')
-
-        # Příprava náhledu
-        preview = df.head(preview_rows).to_dict('records')
-
-        return CSVImportPreview(
-            total_rows=len(df),
-            preview_rows=preview,
-            checksum=checksum,
-            duplicates=duplicates
+            thousands=mapping.thousands_separator,
+            chunksize=chunksize or settings.IMPORT_CHUNK_SIZE
         )
 
     @staticmethod
-    def import_csv(
-        file_path: str,
-        mapping: CSVMapping,
-        checksum: str
-    ) -> List[Dict]:
-        """
-        Importuje data z CSV souboru podle mapování
-        """
-        # Načtení CSV
-        df = pd.read_csv(
-            file_path,
-            skiprows=mapping.skip_rows,
-            decimal=mapping.decimal_separator,
-            thousands=mapping.thousands_separator
-        )
-
-        # Ověření kontrolního součtu
-        current_checksum = hashlib.sha256(
-            pd.util.hash_pandas_object(df).values.tobytes()
-        ).hexdigest()
-        
-        if current_checksum != checksum:
-            raise ValueError("Checksum mismatch - file has changed since preview")
-
-        # Přejmenování sloupců
+    def normalize_chunk(chunk: pd.DataFrame, mapping: CSVMapping) -> pd.DataFrame:
+        """Přejmenuje sloupce podle mapování a převede datum"""
         reverse_mapping = {v: k.value for k, v in mapping.column_mapping.items()}
-        df = df.rename(columns=reverse_mapping)
+        chunk = chunk.rename(columns=reverse_mapping)
 
-        # Převod data
-        if CSVColumnType.DATE.value in df.columns:
-            df[CSVColumnType.DATE.value] = pd.to_datetime(
-                df[CSVColumnType.DATE.value],
+        if CSVColumnType.DATE.value in chunk.columns:
+            chunk[CSVColumnType.DATE.value] = pd.to_datetime(
+                chunk[CSVColumnType.DATE.value],
                 format=mapping.date_format
             )
-
-        # Vrácení všech řádků jako seznam slovníků
-        return df.to_dict('records')
\ No newline at end of file
+        return chunk
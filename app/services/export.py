@@ -0,0 +1,186 @@
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, List
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Date, Float, String, cast, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.models import Account, Asset, Price, Transaction
+
+
+class _ByteSink:
+    """
+    Výstup zapisovačů Arrow/Parquet, který se průběžně vyprazdňuje.
+    Pozice (tell) roste i po vyprázdnění - Parquet z ní počítá offsety.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """Vrátí dosud zapsané bajty a vyprázdní buffer"""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ColumnarExport:
+    """
+    Export transakcí a cen portfolia ve sloupcovém formátu (Arrow IPC
+    stream nebo Parquet). Data se čtou serverovým kurzorem a zapisují
+    po dávkách, bez ORM objektů a validace jednotlivých řádků.
+    """
+
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+    MEDIA_TYPES = {
+        ARROW: "application/vnd.apache.arrow.stream",
+        PARQUET: "application/vnd.apache.parquet"
+    }
+
+    TRANSACTION_SCHEMA = pa.schema([
+        ("id", pa.string()),
+        ("account_id", pa.string()),
+        ("asset_id", pa.string()),
+        ("symbol", pa.string()),
+        ("type", pa.string()),
+        ("quantity", pa.float64()),
+        ("price", pa.float64()),
+        ("fee", pa.float64()),
+        ("tax", pa.float64()),
+        ("gross_amount", pa.float64()),
+        ("trade_currency", pa.string()),
+        ("fx_rate_to_portfolio", pa.float64()),
+        ("trade_time", pa.timestamp("us", tz="UTC")),
+        ("notes", pa.string())
+    ])
+
+    PRICE_SCHEMA = pa.schema([
+        ("asset_id", pa.string()),
+        ("symbol", pa.string()),
+        ("date", pa.date32()),
+        ("close", pa.float64()),
+        ("currency", pa.string())
+    ])
+
+    @staticmethod
+    def transactions_query(
+        portfolio_id: uuid.UUID,
+        start_date: date = None,
+        end_date: date = None
+    ):
+        """Transakce portfolia seřazené podle času obchodu"""
+        query = select(
+            cast(Transaction.id, String),
+            cast(Transaction.account_id, String),
+            cast(Transaction.asset_id, String),
+            Asset.symbol,
+            Transaction.type,
+            cast(Transaction.quantity, Float),
+            cast(Transaction.price, Float),
+            cast(Transaction.fee, Float),
+            cast(Transaction.tax, Float),
+            cast(Transaction.gross_amount, Float),
+            Transaction.trade_currency,
+            cast(Transaction.fx_rate_to_portfolio, Float),
+            Transaction.trade_time,
+            Transaction.notes
+        ).join(Account, Account.id == Transaction.account_id)\
+            .join(Asset, Asset.id == Transaction.asset_id)\
+            .where(Account.portfolio_id == portfolio_id)
+
+        if start_date:
+            query = query.where(Transaction.trade_time >= datetime.combine(start_date, time.min))
+        if end_date:
+            query = query.where(Transaction.trade_time < datetime.combine(end_date + timedelta(days=1), time.min))
+        return query.order_by(Transaction.trade_time, Transaction.id)
+
+    @staticmethod
+    def prices_query(
+        portfolio_id: uuid.UUID,
+        start_date: date = None,
+        end_date: date = None
+    ):
+        """Denní ceny aktiv, se kterými portfolio obchodovalo"""
+        asset_ids = select(Transaction.asset_id)\
+            .join(Account, Account.id == Transaction.account_id)\
+            .where(Account.portfolio_id == portfolio_id)\
+            .distinct()
+
+        query = select(
+            cast(Price.asset_id, String),
+            Asset.symbol,
+            # prices.date je v databázi typu date
+            cast(Price.date, Date),
+            cast(Price.close, Float),
+            Price.currency
+        ).join(Asset, Asset.id == Price.asset_id)\
+            .where(Price.asset_id.in_(asset_ids))
+
+        if start_date:
+            query = query.where(Price.date >= datetime.combine(start_date, time.min))
+        if end_date:
+            query = query.where(Price.date < datetime.combine(end_date + timedelta(days=1), time.min))
+        return query.order_by(Price.asset_id, Price.date)
+
+    @staticmethod
+    def _batches(db: Session, query, schema: pa.Schema, batch_size: int) -> Iterator[pa.RecordBatch]:
+        """Výsledek dotazu po record batchích (serverový kurzor)"""
+        result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+        for rows in result.partitions():
+            columns = list(zip(*rows))
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            )
+
+    @classmethod
+    def stream(
+        cls,
+        query,
+        schema: pa.Schema,
+        fmt: str,
+        batch_size: int = None
+    ) -> Iterator[bytes]:
+        """
+        Bajty exportu pro StreamingResponse. Používá vlastní session,
+        aby kurzor přežil ukončení zpracování požadavku.
+        """
+        batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+        buffer = _ByteSink()
+        sink = pa.PythonFile(buffer, mode="w")
+        if fmt == cls.PARQUET:
+            writer = pq.ParquetWriter(sink, schema)
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        db = SessionLocal()
+        try:
+            for batch in cls._batches(db, query, schema, batch_size):
+                writer.write_batch(batch)
+                yield buffer.drain()
+            writer.close()
+            yield buffer.drain()
+        finally:
+            db.close()
@@ -0,0 +1,129 @@
+from typing import Iterable, List
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.models import Transaction
+
+
+class TransactionFingerprint:
+    """
+    64bitový otisk záznamu importu pro detekci duplicit proti uloženým datům.
+
+    Otisk vzniká z normalizovaných hodnot (čas obchodu v UTC na sekundy,
+    typ, aktivum, množství a cena zaokrouhlené na 8 desetinných míst)
+    přes hash_pandas_object, takže se počítá vektorově pro celé dávky.
+    Stejně se otiskují dividendy (aktivum, den výplaty, měna a částky)
+    a převody měn (čas, měny a částky).
+    """
+
+    COLUMNS = ['trade_time', 'type', 'asset_id', 'quantity', 'price']
+    DIVIDEND_COLUMNS = ['asset_id', 'pay_date', 'currency', 'gross_amount', 'withholding_tax']
+    CONVERSION_COLUMNS = ['trade_time', 'source_currency', 'target_currency', 'source_amount', 'target_amount']
+
+    # Počet otisků v jednom dotazu IN (...)
+    LOOKUP_SIZE = 5000
+
+    @staticmethod
+    def _utc_seconds(values: pd.Series) -> pd.Series:
+        times = pd.to_datetime(values)
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert("UTC").dt.tz_localize(None)
+        return times.dt.floor("s").dt.strftime("%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def _day(values: pd.Series) -> pd.Series:
+        times = pd.to_datetime(values)
+        if times.dt.tz is not None:
+            times = times.dt.tz_localize(None)
+        return times.dt.strftime("%Y-%m-%d")
+
+    @staticmethod
+    def _number(values: pd.Series) -> pd.Series:
+        return pd.to_numeric(values).astype("float64").round(8).astype(str)
+
+    @staticmethod
+    def _text(values: pd.Series) -> pd.Series:
+        return values.astype(str).str.upper()
+
+    @staticmethod
+    def _hash(parts: List[pd.Series]) -> np.ndarray:
+        key = parts[0]
+        for part in parts[1:]:
+            key = key + "|" + part
+        hashes = pd.util.hash_pandas_object(key, index=False).to_numpy()
+        return hashes.view("int64")
+
+    @classmethod
+    def compute(cls, frame: pd.DataFrame) -> np.ndarray:
+        """Otisky transakcí (sloupce COLUMNS) jako pole int64"""
+        if frame.empty:
+            return np.empty(0, dtype="int64")
+        return cls._hash([
+            cls._utc_seconds(frame['trade_time']),
+            cls._text(frame['type']),
+            frame['asset_id'].astype(str),
+            cls._number(frame['quantity']),
+            cls._number(frame['price'])
+        ])
+
+    @classmethod
+    def compute_dividends(cls, frame: pd.DataFrame) -> np.ndarray:
+        """Otisky dividend (sloupce DIVIDEND_COLUMNS)"""
+        if frame.empty:
+            return np.empty(0, dtype="int64")
+        return cls._hash([
+            frame['asset_id'].astype(str),
+            cls._day(frame['pay_date']),
+            cls._text(frame['currency']),
+            cls._number(frame['gross_amount']),
+            cls._number(frame['withholding_tax'])
+        ])
+
+    @classmethod
+    def compute_conversions(cls, frame: pd.DataFrame) -> np.ndarray:
+        """Otisky převodů měn (sloupce CONVERSION_COLUMNS)"""
+        if frame.empty:
+            return np.empty(0, dtype="int64")
+        return cls._hash([
+            cls._utc_seconds(frame['trade_time']),
+            cls._text(frame['source_currency']),
+            cls._text(frame['target_currency']),
+            cls._number(frame['source_amount']),
+            cls._number(frame['target_amount'])
+        ])
+
+    @classmethod
+    def for_transactions(cls, transactions: Iterable[Transaction]) -> np.ndarray:
+        """Otisky ORM transakcí"""
+        return cls.compute(pd.DataFrame(
+            [{column: getattr(t, column) for column in cls.COLUMNS} for t in transactions],
+            columns=cls.COLUMNS
+        ))
+
+    @classmethod
+    def existing(
+        cls,
+        db: Session,
+        account_id: uuid.UUID,
+        fingerprints: np.ndarray,
+        model=Transaction
+    ) -> np.ndarray:
+        """
+        Otisky z fingerprints, které účet už má uložené v tabulce modelu
+        (transactions, dividends, fx_conversions) - dotazy IN (...)
+        po částech přes index (account_id, fingerprint)
+        """
+        values = np.unique(fingerprints)
+        found = []
+        for start in range(0, len(values), cls.LOOKUP_SIZE):
+            part = values[start:start + cls.LOOKUP_SIZE].tolist()
+            found.extend(
+                row.fingerprint for row in db.query(model.fingerprint)
+                .filter(
+                    model.account_id == account_id,
+                    model.fingerprint.in_(part)
+                ).distinct()
+            )
+        return np.array(found, dtype="int64")
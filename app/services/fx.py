@@ -0,0 +1,160 @@
+from typing import Dict, Iterable, List, Optional
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, func, or_, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+
+from app.models.models import FxRate
+from app.services.cache import analytics_cache, decode_series, encode_series
+from app.services.valuation import ValuationEngine
+
+
+class FxRates:
+    """
+    Kurzy měn vůči základní měně portfolia.
+
+    Tabulka fx_rates drží páry v libovolném směru (1 base = rate quote),
+    pro převod měny C do základní měny B se použije přímý pár C/B nebo
+    převrácený B/C. Řady kurzů s dopředným doplněním se cachují
+    po měnách a obdobích.
+    """
+
+    @staticmethod
+    def _scope(currency: str) -> str:
+        return f"fx:{currency}"
+
+    @staticmethod
+    def _closes(
+        db: Session,
+        currencies: List[str],
+        base: str,
+        start_date: date,
+        end_date: date
+    ):
+        """
+        Kurzy měn do základní měny za období a poslední kurz každého páru
+        před obdobím - pozice měny, den a kurz seřazené podle času
+        """
+        first = datetime.combine(start_date, time.min)
+        after = datetime.combine(end_date + timedelta(days=1), time.min)
+        pairs = or_(
+            and_(FxRate.base_currency.in_(currencies), FxRate.quote_currency == base),
+            and_(FxRate.base_currency == base, FxRate.quote_currency.in_(currencies))
+        )
+
+        earlier = aliased(FxRate)
+        prior_date = select(func.max(earlier.date))\
+            .where(
+                earlier.base_currency == FxRate.base_currency,
+                earlier.quote_currency == FxRate.quote_currency,
+                earlier.date < first
+            ).scalar_subquery()
+
+        columns = (FxRate.base_currency, FxRate.quote_currency, FxRate.date, FxRate.rate)
+        prior = select(*columns).where(pairs, FxRate.date == prior_date)
+        period = select(*columns).where(pairs, FxRate.date >= first, FxRate.date < after)
+        rates = union_all(prior, period).subquery()
+
+        rows = db.execute(select(rates).order_by(rates.c.date)).all()
+        df = pd.DataFrame(rows, columns=["base_currency", "quote_currency", "date", "rate"])
+
+        # Převrácený pár B/C dává kurz 1 / rate
+        direct = (df["quote_currency"] == base).to_numpy()
+        currency = np.where(direct, df["base_currency"], df["quote_currency"])
+        rate = pd.to_numeric(df["rate"]).to_numpy(dtype="float64")
+        with np.errstate(divide="ignore"):
+            rate = np.where(direct, rate, 1.0 / rate)
+        days = pd.to_datetime(df["date"]).dt.tz_localize(None).dt.normalize()\
+            .astype("datetime64[ns]").to_numpy()
+
+        positions = pd.Index(currencies, dtype=object).get_indexer(currency)
+        return positions, days, rate
+
+    @classmethod
+    def matrix(
+        cls,
+        db: Session,
+        currencies: Iterable[str],
+        base: str,
+        dates: pd.DatetimeIndex
+    ) -> pd.DataFrame:
+        """
+        Matice kurzů (datum × měna) pro převod do základní měny
+        s dopředným doplněním. Chybějící kurz je NaN.
+        """
+        currencies = list(dict.fromkeys(currencies))
+        foreign = [c for c in currencies if c != base]
+        first_day, through = dates[0].date(), dates[-1].date()
+
+        scopes = {c: cls._scope(c) for c in foreign}
+        generations = analytics_cache.generations(list(scopes.values())) if foreign else {}
+        keys = {
+            c: f"{scope}:{generations[scope]}:{base}:{first_day}:{through}:{len(dates)}"
+            for c, scope in scopes.items()
+        }
+        series = analytics_cache.get_many(list(keys.values()), decode=decode_series)
+
+        missing = [c for c in foreign if keys[c] not in series]
+        if missing:
+            positions, days, rates = cls._closes(db, missing, base, first_day, through)
+            fresh = ValuationEngine.price_matrix_from_arrays(
+                positions, days, rates, dates, pd.Index(missing, dtype=object)
+            )
+            fresh = {keys[c]: fresh[c] for c in missing}
+            analytics_cache.set_many(fresh, encode=encode_series)
+            series.update(fresh)
+
+        return pd.DataFrame(
+            {
+                c: series[keys[c]].to_numpy() if c != base else np.ones(len(dates))
+                for c in currencies
+            },
+            index=dates,
+            columns=pd.Index(currencies, dtype=object)
+        )
+
+    @classmethod
+    def missing(
+        cls,
+        db: Session,
+        currencies: Iterable[str],
+        base: str,
+        dates: pd.DatetimeIndex
+    ) -> List[str]:
+        """Měny, kterým alespoň v jeden den chybí kurz do základní měny"""
+        if not len(dates):
+            return []
+        matrix = cls.matrix(db, currencies, base, dates)
+        return sorted(c for c in matrix.columns if matrix[c].isna().any())
+
+    @staticmethod
+    def latest_date(db: Session, base: str) -> Optional[date]:
+        """Den nejnovějšího kurzu mezi základní měnou a kteroukoli jinou"""
+        value = db.query(func.max(FxRate.date))\
+            .filter(or_(FxRate.base_currency == base, FxRate.quote_currency == base))\
+            .scalar()
+        return pd.Timestamp(value).date() if value is not None else None
+
+    @staticmethod
+    def store(db: Session, rows: List[Dict], overwrite: bool = True) -> int:
+        """
+        Uloží kurzy (base_currency, quote_currency, date, rate, source),
+        existující záznamy přepíše (s overwrite=False ponechá). Vrací počet
+        zapsaných kurzů. Commit a zneplatnění odvozených dat
+        (CacheInvalidation.fx_rates_changed) provádí volající.
+        """
+        if not rows:
+            return 0
+        upsert = insert(FxRate)
+        if overwrite:
+            upsert = upsert.on_conflict_do_update(
+                index_elements=['base_currency', 'quote_currency', 'date'],
+                set_={'rate': upsert.excluded.rate, 'source': upsert.excluded.source}
+            )
+        else:
+            upsert = upsert.on_conflict_do_nothing(
+                index_elements=['base_currency', 'quote_currency', 'date']
+            )
+        return len(db.execute(upsert.returning(FxRate.date), rows).all())
@@ -0,0 +1,116 @@
+"""
+Načtení měnových kurzů do tabulky fx_rates.
+
+Spuštění se souborem CSV (sloupce base_currency, quote_currency, date,
+rate; 1 base = rate quote) proti databázi z DATABASE_URL:
+
+    python -m app.services.fx_loader kurzy.csv [zdroj]
+"""
+import sys
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.db.base import SessionLocal
+import app.models.user  # noqa: F401 - vztah Portfolio.user
+from app.services.fx import FxRates
+from app.services.invalidation import CacheInvalidation
+
+
+class FxRateLoader:
+    """
+    Zápis kurzů se zneplatněním odvozených dat (materializované hodnoty,
+    reporty a cache portfolií v dotčených měnách).
+
+    Kurzy pocházejí ze souboru nebo z převodů měn importovaných z výpisu
+    brokera. Kurz převodu (objemově vážený za pár a den) nepřepíše kurz
+    z jiného zdroje, jen doplní chybějící dny.
+    """
+
+    COLUMNS = ['base_currency', 'quote_currency', 'date', 'rate']
+    CONVERSION_SOURCE = "fx_conversion"
+
+    @staticmethod
+    def load(db: Session, rates: pd.DataFrame, source: str, overwrite: bool = True) -> int:
+        """
+        Uloží kurzy (sloupce COLUMNS) a zneplatní dotčená portfolia od
+        nejstaršího zapsaného dne, vrací počet zapsaných kurzů. Commit
+        provádí volající.
+        """
+        frame = pd.DataFrame({
+            'base_currency': rates['base_currency'].astype(str).str.strip().str.upper(),
+            'quote_currency': rates['quote_currency'].astype(str).str.strip().str.upper(),
+            'date': pd.to_datetime(rates['date']).dt.normalize(),
+            'rate': pd.to_numeric(rates['rate'], errors='coerce')
+        }, index=rates.index)
+        frame = frame[(frame['rate'] > 0) & (frame['base_currency'] != frame['quote_currency'])]\
+            .drop_duplicates(['base_currency', 'quote_currency', 'date'], keep='last')
+        if frame.empty:
+            return 0
+
+        written = FxRates.store(
+            db,
+            [{**row, 'source': source} for row in frame.to_dict('records')],
+            overwrite=overwrite
+        )
+        if written:
+            CacheInvalidation.fx_rates_changed(
+                db,
+                set(frame['base_currency']) | set(frame['quote_currency']),
+                frame['date'].min().date()
+            )
+        return written
+
+    @classmethod
+    def from_conversions(cls, db: Session, conversions: pd.DataFrame) -> int:
+        """
+        Kurzy z normalizovaných řádků FX importu (date, source_currency,
+        target_currency, source_amount, target_amount). Pár se ukládá
+        v abecedním pořadí měn, převody obou směrů se sčítají.
+        """
+        if conversions.empty:
+            return 0
+        rows = conversions.dropna(
+            subset=['source_currency', 'target_currency', 'source_amount', 'target_amount']
+        )
+        source = rows['source_currency'].astype(str).str.upper()
+        target = rows['target_currency'].astype(str).str.upper()
+        source_amount = pd.to_numeric(rows['source_amount']).abs()
+        target_amount = pd.to_numeric(rows['target_amount']).abs()
+
+        direct = source < target
+        frame = pd.DataFrame({
+            'base_currency': source.where(direct, target),
+            'quote_currency': target.where(direct, source),
+            'date': pd.to_datetime(rows['date']).dt.normalize(),
+            'base_amount': source_amount.where(direct, target_amount),
+            'quote_amount': target_amount.where(direct, source_amount)
+        })
+        daily = frame.groupby(['base_currency', 'quote_currency', 'date'], as_index=False)\
+            [['base_amount', 'quote_amount']]\
+            .sum()
+        daily['rate'] = daily['quote_amount'] / daily['base_amount']
+        return cls.load(db, daily, cls.CONVERSION_SOURCE, overwrite=False)
+
+    @classmethod
+    def from_csv(cls, db: Session, path: str, source: str = "csv") -> int:
+        """Kurzy ze souboru CSV se sloupci COLUMNS"""
+        return cls.load(db, pd.read_csv(path, usecols=cls.COLUMNS), source)
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("usage: python -m app.services.fx_loader <rates.csv> [source]")
+        return 2
+
+    db = SessionLocal()
+    try:
+        written = FxRateLoader.from_csv(db, *sys.argv[1:3])
+        db.commit()
+    finally:
+        db.close()
+    print(f"stored {written} rates")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional
+import logging
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.models import Account
+from app.services.brokers.base import BrokerParser
+from app.services.brokers.pipeline import ImportPipeline
+from app.services.import_stash import ImportStash
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJob(BaseModel):
+    """Stav úlohy importu"""
+    id: str
+    status: str = "queued"  # queued, running, completed, failed
+    broker: str
+    account_id: uuid.UUID
+    checksum: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    rows_parsed: int = 0
+    rows_written: int = 0
+    rows_per_second: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class ImportJobQueue:
+    """
+    Fronta importů zpracovávaných na pozadí v thread poolu.
+
+    Úloha je určena účtem a kontrolním součtem souboru - opakované
+    odeslání stejného souboru na stejný účet vrátí existující úlohu
+    (kromě neúspěšné). Stav úloh je uložen v paměti procesu.
+    """
+
+    ACTIVE = {"queued", "running", "completed"}
+
+    def __init__(self, max_workers: int = None, ttl: int = None):
+        self.max_workers = max_workers or settings.IMPORT_WORKERS
+        self.ttl = ttl or settings.IMPORT_JOB_TTL
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, ImportJob] = {}
+        self._owners: Dict[str, uuid.UUID] = {}
+        self._keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool workerů vytvořený při prvním použití"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="import"
+                )
+            return self._executor
+
+    @staticmethod
+    def _key(account_id: uuid.UUID, checksum: str) -> str:
+        return f"{account_id}:{checksum}"
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def _prune(self) -> None:
+        """Odstraní dokončené úlohy starší než TTL (volá se pod zámkem)"""
+        now = self._now()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None
+            and (now - job.finished_at).total_seconds() > self.ttl
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            self._owners.pop(job_id, None)
+            key = self._key(job.account_id, job.checksum)
+            if self._keys.get(key) == job_id:
+                del self._keys[key]
+
+    def submit(
+        self,
+        broker: str,
+        frames: Callable[[], Iterable[pd.DataFrame]],
+        checksum: str,
+        account_id: uuid.UUID,
+        user_id: uuid.UUID,
+        cleanup: Callable[[], None] = None
+    ) -> ImportJob:
+        """
+        Zařadí import do fronty. frames vrací normalizované dávky (ze
+        souboru nebo z uloženého náhledu), cleanup se zavolá po dokončení
+        úlohy. Pokud už stejný import běží nebo proběhl, zavolá se cleanup
+        hned a vrátí se existující úloha.
+        """
+        key = self._key(account_id, checksum)
+        with self._lock:
+            self._prune()
+            existing = self._jobs.get(self._keys.get(key))
+            if existing is not None and existing.status in self.ACTIVE:
+                if cleanup is not None:
+                    cleanup()
+                return existing.model_copy()
+
+            job = ImportJob(
+                id=uuid.uuid4().hex,
+                broker=broker,
+                account_id=account_id,
+                checksum=checksum,
+                created_at=self._now()
+            )
+            self._jobs[job.id] = job
+            self._owners[job.id] = user_id
+            self._keys[key] = job.id
+
+        self.executor.submit(self._run, job.id, frames, cleanup)
+        return job.model_copy()
+
+    def submit_file(
+        self,
+        parser: BrokerParser,
+        file_path: str,
+        checksum: str,
+        account_id: uuid.UUID,
+        user_id: uuid.UUID
+    ) -> ImportJob:
+        """Import nahraného souboru, soubor se po dokončení smaže"""
+        return self.submit(
+            parser.name,
+            partial(ImportPipeline.iter_verified, parser, file_path, checksum),
+            checksum,
+            account_id,
+            user_id,
+            cleanup=partial(os.unlink, file_path)
+        )
+
+    def submit_stashed(
+        self,
+        checksum: str,
+        account_id: uuid.UUID,
+        user_id: uuid.UUID
+    ) -> Optional[ImportJob]:
+        """Import uloženého náhledu, None pokud náhled neexistuje nebo vypršel"""
+        meta = ImportStash.meta(checksum, user_id)
+        # Zámek drží náhled do dokončení úlohy, prune ho mezitím nesmaže
+        lease = ImportStash.acquire(checksum, user_id) if meta is not None else None
+        if lease is None:
+            return None
+        return self.submit(
+            meta["parser"],
+            partial(ImportStash.iter_frames, checksum, user_id),
+            checksum,
+            account_id,
+            user_id,
+            cleanup=partial(ImportStash.release, lease)
+        )
+
+    def get(self, job_id: str, user_id: uuid.UUID) -> Optional[ImportJob]:
+        """Stav úlohy (jen pro uživatele, který ji založil)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or self._owners.get(job_id) != user_id:
+                return None
+            return job.model_copy()
+
+    def _update(self, job_id: str, **values) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            for name, value in values.items():
+                setattr(job, name, value)
+
+    def _run(
+        self,
+        job_id: str,
+        frames: Callable[[], Iterable[pd.DataFrame]],
+        cleanup: Optional[Callable[[], None]]
+    ) -> None:
+        """Zpracování úlohy ve workeru: parsování, deduplikace, zápis"""
+        job = self._jobs[job_id]
+        started = time.perf_counter()
+        self._update(job_id, status="running", started_at=self._now())
+
+        def progress(rows_parsed: int, rows_written: int) -> None:
+            elapsed = time.perf_counter() - started
+            self._update(
+                job_id,
+                rows_parsed=rows_parsed,
+                rows_written=rows_written,
+                rows_per_second=round(rows_parsed / elapsed, 1) if elapsed else None
+            )
+
+        db = SessionLocal()
+        try:
+            account = db.query(Account).filter(Account.id == job.account_id).first()
+            if account is None:
+                raise ValueError("Account not found")
+
+            result = ImportPipeline.execute_frames(
+                frames(),
+                db,
+                account,
+                skip_duplicates=True,
+                progress=progress
+            )
+            self._update(job_id, status="completed", result=result, finished_at=self._now())
+        except Exception as e:
+            logger.exception("Import job %s failed", job_id)
+            self._update(job_id, status="failed", error=str(e), finished_at=self._now())
+        finally:
+            db.close()
+            if cleanup is not None:
+                cleanup()
+
+
+import_jobs = ImportJobQueue()
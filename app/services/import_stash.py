@@ -0,0 +1,179 @@
+from typing import Dict, Iterator, Optional
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+import pandas as pd
+
+from app.core.config import settings
+
+
+class StashWriter:
+    """
+    Průběžný zápis normalizovaných dávek náhledu, každá dávka
+    do vlastního Parquet souboru v dočasném adresáři
+    """
+
+    def __init__(self, root: str):
+        self.path = tempfile.mkdtemp(prefix=".pending-", dir=root)
+        self.parts = 0
+        self.rows = 0
+
+    def append(self, frame: pd.DataFrame) -> None:
+        frame.to_parquet(
+            os.path.join(self.path, f"part-{self.parts:05d}.parquet"),
+            index=False
+        )
+        self.parts += 1
+        self.rows += len(frame)
+
+    def discard(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class ImportStash:
+    """
+    Úložiště zpracovaných náhledů importu na lokálním disku.
+
+    Náhled uloží normalizované dávky pod uživatelem a kontrolním součtem
+    souboru, import je pak načte bez nového nahrání a parsování souboru.
+    Záznamy vyprší po IMPORT_STASH_TTL sekundách, záznam používaný úlohou
+    importu drží zámek (soubor lease-*) a prune ho nesmaže.
+    """
+
+    CHECKSUM_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+    META_FILE = "meta.json"
+    LEASE_PREFIX = "lease-"
+
+    @staticmethod
+    def root() -> str:
+        path = settings.IMPORT_STASH_DIR or os.path.join(tempfile.gettempdir(), "stock-app-imports")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @classmethod
+    def _path(cls, checksum: str, user_id: uuid.UUID) -> Optional[str]:
+        # Uživatel a kontrolní součet tvoří název adresáře, jiné hodnoty se odmítnou
+        if not cls.CHECKSUM_PATTERN.match(checksum or ""):
+            return None
+        try:
+            user = uuid.UUID(str(user_id)).hex
+        except ValueError:
+            return None
+        return os.path.join(cls.root(), f"{user}-{checksum}")
+
+    @classmethod
+    def _leased(cls, path: str) -> bool:
+        """Záznam drží úloha importu (zámky starší než IMPORT_JOB_TTL se ignorují)"""
+        limit = time.time() - settings.IMPORT_JOB_TTL
+        for name in os.listdir(path):
+            if name.startswith(cls.LEASE_PREFIX) \
+                    and os.path.getmtime(os.path.join(path, name)) >= limit:
+                return True
+        return False
+
+    @classmethod
+    def prune(cls) -> None:
+        """Smaže záznamy starší než TTL, které nepoužívá žádná úloha"""
+        root = cls.root()
+        limit = time.time() - settings.IMPORT_STASH_TTL
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < limit and not cls._leased(path):
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+    @classmethod
+    def writer(cls) -> StashWriter:
+        cls.prune()
+        return StashWriter(cls.root())
+
+    @classmethod
+    def commit(cls, writer: StashWriter, checksum: str, user_id: uuid.UUID, parser: str) -> None:
+        """
+        Zveřejní zapsané dávky pod uživatelem a kontrolním součtem
+        (nahradí starší záznam, pokud ho nepoužívá úloha importu)
+        """
+        with open(os.path.join(writer.path, cls.META_FILE), "w") as f:
+            json.dump({
+                "user_id": str(user_id),
+                "parser": parser,
+                "rows": writer.rows,
+                "parts": writer.parts
+            }, f)
+
+        target = cls._path(checksum, user_id)
+        try:
+            if cls._leased(target):
+                writer.discard()
+                return
+        except OSError:
+            pass
+        shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(writer.path, target)
+        except OSError:
+            # Souběžný náhled stejného souboru už záznam vytvořil
+            writer.discard()
+
+    @classmethod
+    def meta(cls, checksum: str, user_id: uuid.UUID) -> Optional[Dict]:
+        """Metadata záznamu uživatele, None pokud neexistuje nebo vypršel"""
+        path = cls._path(checksum, user_id)
+        if path is None:
+            return None
+        try:
+            if os.path.getmtime(path) < time.time() - settings.IMPORT_STASH_TTL:
+                return None
+            with open(os.path.join(path, cls.META_FILE)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("user_id") != str(user_id):
+            return None
+        return meta
+
+    @classmethod
+    def acquire(cls, checksum: str, user_id: uuid.UUID) -> Optional[str]:
+        """
+        Zamkne záznam pro úlohu importu, vrací cestu zámku
+        (pro release) nebo None, pokud záznam neexistuje
+        """
+        path = cls._path(checksum, user_id)
+        if path is None:
+            return None
+        lease = os.path.join(path, f"{cls.LEASE_PREFIX}{uuid.uuid4().hex}")
+        try:
+            with open(lease, "x"):
+                pass
+        except OSError:
+            return None
+        return lease
+
+    @staticmethod
+    def release(lease: str) -> None:
+        """Uvolní zámek záznamu, záznam pak vyprší podle TTL"""
+        try:
+            os.unlink(lease)
+        except OSError:
+            pass
+
+    @classmethod
+    def iter_frames(cls, checksum: str, user_id: uuid.UUID) -> Iterator[pd.DataFrame]:
+        """Uložené dávky v původním pořadí"""
+        path = cls._path(checksum, user_id)
+        with open(os.path.join(path, cls.META_FILE)) as f:
+            parts = json.load(f)["parts"]
+        for part in range(parts):
+            yield pd.read_parquet(os.path.join(path, f"part-{part:05d}.parquet"))
+
+    @classmethod
+    def discard(cls, checksum: str, user_id: uuid.UUID) -> None:
+        path = cls._path(checksum, user_id)
+        if path is not None:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,85 @@
+from typing import Dict, Iterable
+from datetime import date
+import uuid
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import Account, Asset, Portfolio, Transaction
+from app.services.cache import analytics_cache
+from app.services.ledger_store import LedgerStore
+from app.services.report_cache import ReportCacheService
+from app.services.valuation_store import ValuationStore
+
+
+class CacheInvalidation:
+    """
+    Zneplatnění odvozených dat (materializované hodnoty, reporty, analytická cache)
+    po změně vstupů
+    """
+
+    @staticmethod
+    def portfolios_changed(
+        db: Session,
+        portfolio_ids: Iterable[uuid.UUID],
+        from_date: date = None
+    ) -> None:
+        """
+        Změna transakcí nebo dividend portfolií. Pokud je zadán from_date,
+        zneplatní se i materializované hodnoty a snapshoty lotové knihy
+        od tohoto dne.
+        """
+        portfolio_ids = list(set(portfolio_ids))
+        if from_date is not None:
+            ValuationStore.invalidate(db, portfolio_ids, from_date)
+            LedgerStore.invalidate(db, portfolio_ids, from_date)
+        ReportCacheService.invalidate(db, portfolio_ids)
+        analytics_cache.bump(f"portfolio:{p}" for p in portfolio_ids)
+
+    @classmethod
+    def prices_changed(
+        cls,
+        db: Session,
+        from_dates: Dict[uuid.UUID, date]
+    ) -> None:
+        """
+        Nové nebo opravené ceny aktiv - {asset_id: nejstarší změněný den}.
+        Lotové knihy ceny nepoužívají, jejich snapshoty zůstanou.
+        """
+        if not from_dates:
+            return
+        analytics_cache.bump(f"asset:{a}" for a in from_dates)
+        holders = db.execute(
+            select(Account.portfolio_id, Transaction.asset_id)
+            .join(Transaction, Transaction.account_id == Account.id)
+            .where(Transaction.asset_id.in_(list(from_dates)))
+            .distinct()
+        ).all()
+
+        # Každé portfolio od nejstaršího dne změny svých aktiv
+        portfolios: Dict[uuid.UUID, date] = {}
+        for portfolio_id, asset_id in holders:
+            day = from_dates[asset_id]
+            portfolios[portfolio_id] = min(portfolios.get(portfolio_id, day), day)
+        for day in set(portfolios.values()):
+            ValuationStore.invalidate(db, [p for p, d in portfolios.items() if d == day], day)
+        ReportCacheService.invalidate(db, portfolios)
+        analytics_cache.bump(f"portfolio:{p}" for p in portfolios)
+
+    @classmethod
+    def fx_rates_changed(
+        cls,
+        db: Session,
+        currencies: Iterable[str],
+        from_date: date
+    ) -> None:
+        """Nové nebo opravené kurzy měn od daného dne"""
+        currencies = list(set(currencies))
+        analytics_cache.bump(f"fx:{c}" for c in currencies)
+        # Dotčena jsou portfolia v těchto měnách a portfolia s aktivy v nich
+        held = select(Account.portfolio_id)\
+            .join(Transaction, Transaction.account_id == Account.id)\
+            .join(Asset, Asset.id == Transaction.asset_id)\
+            .where(Asset.currency.in_(currencies))
+        based = select(Portfolio.id).where(Portfolio.base_currency.in_(currencies))
+        portfolio_ids = db.execute(held.union(based)).scalars().all()
+        cls.portfolios_changed(db, portfolio_ids, from_date)
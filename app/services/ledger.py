@@ -0,0 +1,261 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, case, func, select
+
+from app.models.models import Account, Transaction
+
+# Znaménko obchodu podle typu - uložené znaménko množství se nebere v úvahu
+TRADE_SIGNS = {"BUY": 1.0, "SELL": -1.0}
+# Split nese v quantity poměr (nové kusy za jeden starý, např. 4 nebo 0.1)
+SPLIT_TYPE = "SPLIT"
+LEDGER_TYPES = (*TRADE_SIGNS, SPLIT_TYPE)
+
+# Zbytky lotů menší než tato hodnota se považují za uzavřené
+EPSILON = 1e-9
+
+
+def split_adjusted_quantities(portfolio_id: uuid.UUID, before: Optional[datetime] = None):
+    """
+    Dotaz na obchody portfolia (account_id, asset_id, quantity) s množstvím
+    se znaménkem (BUY +, SELL -) vynásobeným poměry pozdějších splitů na
+    stejném účtu a aktivu. Součet po aktivu (nebo účtu a aktivu) dává
+    držené množství včetně splitů.
+    """
+    ratio = case(
+        (and_(Transaction.type == SPLIT_TYPE, Transaction.quantity > 0), func.ln(Transaction.quantity)),
+        else_=0
+    )
+    # Součet logaritmů poměrů splitů po obchodu = log násobku množství
+    later_splits = func.sum(ratio).over(
+        partition_by=(Transaction.account_id, Transaction.asset_id),
+        order_by=(Transaction.trade_time, Transaction.id),
+        rows=(1, None)
+    )
+    signed = case(
+        (Transaction.type == "BUY", func.abs(Transaction.quantity)),
+        (Transaction.type == "SELL", -func.abs(Transaction.quantity)),
+        else_=0
+    )
+    query = select(
+        Transaction.account_id,
+        Transaction.asset_id,
+        (signed * func.exp(func.coalesce(later_splits, 0))).label('quantity')
+    ).join(Account, Account.id == Transaction.account_id)\
+        .where(
+            Account.portfolio_id == portfolio_id,
+            Transaction.type.in_(LEDGER_TYPES)
+        )
+    if before is not None:
+        query = query.where(Transaction.trade_time < before)
+    return query.subquery('trades')
+
+
+class LotBook:
+    """
+    Otevřené loty jednoho aktiva v polích numpy (množství a náklad na kus).
+
+    Loty se přidávají na konec, FIFO prodej je odebírá od začátku posunem
+    ukazatele head. Pole se při zaplnění zhutní nebo zdvojnásobí.
+    """
+
+    def __init__(self, capacity: int = 8):
+        self.quantity = np.zeros(capacity)
+        self.unit_cost = np.zeros(capacity)
+        self.head = 0
+        self.size = 0
+        self.realized = 0.0
+        # Prodané množství, pro které nebyl otevřený lot (neúplná historie)
+        self.unmatched = 0.0
+
+    @property
+    def open_quantity(self) -> float:
+        return float(self.quantity[self.head:self.size].sum())
+
+    @property
+    def cost_basis(self) -> float:
+        window = slice(self.head, self.size)
+        return float((self.quantity[window] * self.unit_cost[window]).sum())
+
+    def _push(self, quantity: float, unit_cost: float) -> None:
+        if self.size == len(self.quantity):
+            count = self.size - self.head
+            capacity = len(self.quantity) * 2 if count * 2 > len(self.quantity) else len(self.quantity)
+            for name in ("quantity", "unit_cost"):
+                values = np.zeros(capacity)
+                values[:count] = getattr(self, name)[self.head:self.size]
+                setattr(self, name, values)
+            self.head, self.size = 0, count
+        self.quantity[self.size] = quantity
+        self.unit_cost[self.size] = unit_cost
+        self.size += 1
+
+    def buy(self, quantity: float, price: float, fee: float = 0.0) -> None:
+        if quantity <= EPSILON:
+            return
+        self._push(quantity, (quantity * price + fee) / quantity)
+
+    def sell(self, quantity: float, price: float, fee: float = 0.0, average: bool = False) -> float:
+        """Prodej z lotů (FIFO nebo průměrnou cenou), vrací realizovaný zisk"""
+        held = self.open_quantity
+        matched = min(quantity, held)
+        self.unmatched += quantity - matched
+        if matched <= EPSILON:
+            return 0.0
+
+        window = slice(self.head, self.size)
+        if average or matched >= held - EPSILON:
+            # Průměrná cena - všechny loty se zmenší ve stejném poměru
+            cost = self.cost_basis * matched / held
+            self.quantity[window] *= 1.0 - matched / held
+        else:
+            # FIFO - plně spotřebované loty a část prvního zbývajícího
+            open_quantity = self.quantity[window]
+            consumed = np.cumsum(open_quantity)
+            full = int(np.searchsorted(consumed, matched + EPSILON, side="right"))
+            rest = max(matched - (consumed[full - 1] if full else 0.0), 0.0)
+            cost = float((open_quantity[:full] * self.unit_cost[window][:full]).sum())
+            cost += rest * self.unit_cost[self.head + full]
+            self.quantity[self.head + full] -= rest
+            self.head += full
+
+        # Uzavřené loty na začátku se přeskočí
+        while self.head < self.size and self.quantity[self.head] <= EPSILON:
+            self.head += 1
+
+        proceeds = matched * price - fee * matched / quantity
+        realized = float(proceeds - cost)
+        self.realized += realized
+        return realized
+
+    def split(self, ratio: float) -> None:
+        if ratio <= 0:
+            return
+        window = slice(self.head, self.size)
+        self.quantity[window] *= ratio
+        self.unit_cost[window] /= ratio
+
+    def state(self) -> Dict:
+        window = slice(self.head, self.size)
+        return {
+            'quantity': self.quantity[window].tolist(),
+            'unit_cost': self.unit_cost[window].tolist(),
+            'realized': self.realized,
+            'unmatched': self.unmatched
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "LotBook":
+        book = cls(max(len(state['quantity']), 8))
+        book.size = len(state['quantity'])
+        book.quantity[:book.size] = state['quantity']
+        book.unit_cost[:book.size] = state['unit_cost']
+        book.realized = state['realized']
+        book.unmatched = state['unmatched']
+        return book
+
+
+class PositionLedger:
+    """
+    Pozice portfolia po lotech s náklady FIFO nebo průměrnou cenou.
+
+    Transakce (BUY, SELL, SPLIT) se přehrají jednou v pořadí času obchodu.
+    Kniha se vede pro každou dvojici účet, aktivum - prodej spotřebuje loty
+    svého účtu a split z výpisu účtu se týká jen jeho pozice. Částky jsou
+    v měně obchodu. Stav lze uložit (state) a po obnovení
+    (from_state) přehrát jen novější transakce.
+    """
+
+    FIFO = "fifo"
+    AVERAGE = "average"
+    METHODS = (FIFO, AVERAGE)
+
+    def __init__(self, method: str = FIFO):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown cost method: {method}")
+        self.method = method
+        # Klíč "account_id:asset_id"
+        self.books: Dict[str, LotBook] = {}
+
+    @property
+    def asset_ids(self) -> List[str]:
+        return list(dict.fromkeys(key.split(":")[1] for key in self.books))
+
+    def apply(
+        self,
+        account_id,
+        asset_id,
+        transaction_type: str,
+        quantity: float,
+        price: float,
+        fee: float = 0.0
+    ) -> None:
+        book = self.books.setdefault(f"{account_id}:{asset_id}", LotBook())
+        quantity = abs(quantity)
+        if transaction_type == "BUY":
+            book.buy(quantity, price, fee)
+        elif transaction_type == "SELL":
+            book.sell(quantity, price, fee, average=self.method == self.AVERAGE)
+        elif transaction_type == SPLIT_TYPE:
+            book.split(quantity)
+
+    def replay(self, transactions: pd.DataFrame) -> None:
+        """
+        Přehraje transakce seřazené podle času (account_id, asset_id, type,
+        quantity, price, fee)
+        """
+        if transactions.empty:
+            return
+        columns = [
+            transactions["account_id"].astype(str).to_numpy(),
+            transactions["asset_id"].astype(str).to_numpy(),
+            transactions["type"].to_numpy(),
+            pd.to_numeric(transactions["quantity"]).to_numpy(dtype="float64"),
+            pd.to_numeric(transactions["price"]).to_numpy(dtype="float64"),
+            pd.to_numeric(transactions["fee"]).fillna(0.0).to_numpy(dtype="float64")
+        ]
+        for row in zip(*columns):
+            self.apply(*row)
+
+    def positions(self, prices: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        Pozice po účtech a aktivech - množství, nákladová cena, realizovaný
+        a (se zadanými cenami podle asset_id) nerealizovaný zisk
+        """
+        prices = prices or {}
+        result = []
+        for key, book in self.books.items():
+            account_id, asset_id = key.split(":")
+            quantity = book.open_quantity
+            cost_basis = book.cost_basis
+            price = prices.get(asset_id)
+            market_value = quantity * price if price is not None else None
+            result.append({
+                'account_id': account_id,
+                'asset_id': asset_id,
+                'quantity': quantity,
+                'cost_basis': cost_basis,
+                'average_cost': cost_basis / quantity if quantity > EPSILON else None,
+                'realized_pnl': book.realized,
+                'market_value': market_value,
+                'unrealized_pnl': market_value - cost_basis if market_value is not None else None,
+                'unmatched_quantity': book.unmatched
+            })
+        return result
+
+    def state(self) -> Dict:
+        return {
+            'method': self.method,
+            'books': {key: book.state() for key, book in self.books.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "PositionLedger":
+        ledger = cls(state['method'])
+        ledger.books = {
+            key: LotBook.from_state(book)
+            for key, book in state['books'].items()
+        }
+        return ledger
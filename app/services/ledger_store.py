@@ -0,0 +1,126 @@
+from typing import Iterable, Optional
+from datetime import date, datetime, time, timedelta, timezone
+import uuid
+import pandas as pd
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Account, PositionSnapshot, Transaction
+from app.services.ledger import LEDGER_TYPES, PositionLedger
+
+
+class LedgerStore:
+    """
+    Lotová kniha portfolia s uloženým snapshotem.
+
+    Snapshot drží stav knihy po poslední přehrané transakci (podle
+    trade_time a id). Další výpočet snapshot načte a přehraje jen
+    novější transakce. Změna transakcí snapshot od daného dne zneplatní.
+    """
+
+    @staticmethod
+    def _transactions(
+        db: Session,
+        portfolio_id: uuid.UUID,
+        after: Optional[PositionSnapshot] = None,
+        through: Optional[date] = None
+    ) -> pd.DataFrame:
+        """Transakce knihy seřazené podle času obchodu (za snapshotem, do dne)"""
+        query = db.query(
+            Transaction.id,
+            Transaction.account_id,
+            Transaction.trade_time,
+            Transaction.asset_id,
+            Transaction.type,
+            Transaction.quantity,
+            Transaction.price,
+            Transaction.fee
+        ).join(Account)\
+            .filter(
+                Account.portfolio_id == portfolio_id,
+                Transaction.type.in_(LEDGER_TYPES)
+            )
+        if after is not None:
+            query = query.filter(
+                tuple_(Transaction.trade_time, Transaction.id)
+                > tuple_(after.as_of, after.last_transaction_id)
+            )
+        if through is not None:
+            query = query.filter(
+                Transaction.trade_time < datetime.combine(through + timedelta(days=1), time.min, timezone.utc)
+            )
+        rows = query.order_by(Transaction.trade_time, Transaction.id).all()
+        return pd.DataFrame(
+            rows,
+            columns=["id", "account_id", "trade_time", "asset_id", "type", "quantity", "price", "fee"]
+        )
+
+    @classmethod
+    def get(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        method: str = PositionLedger.FIFO,
+        as_of: Optional[date] = None
+    ) -> PositionLedger:
+        """
+        Kniha po všech transakcích (nebo po transakcích do dne as_of).
+        Novější stav se uloží jako snapshot.
+        """
+        ledger = PositionLedger(method)
+        snapshot = db.get(PositionSnapshot, (portfolio_id, method))
+        if snapshot is not None and (as_of is None or snapshot.as_of.date() <= as_of):
+            ledger = PositionLedger.from_state(snapshot.state)
+            start = snapshot
+        else:
+            start = None
+
+        transactions = cls._transactions(db, portfolio_id, start, as_of)
+        ledger.replay(transactions)
+
+        # Snapshot se posouvá jen dopředu
+        if not transactions.empty and (snapshot is None or start is not None):
+            last = transactions.iloc[-1]
+            upsert = insert(PositionSnapshot).values(
+                portfolio_id=portfolio_id,
+                method=method,
+                as_of=last["trade_time"],
+                last_transaction_id=last["id"],
+                state=ledger.state(),
+                updated_at=datetime.utcnow()
+            )
+            db.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=['portfolio_id', 'method'],
+                    set_={
+                        'as_of': upsert.excluded.as_of,
+                        'last_transaction_id': upsert.excluded.last_transaction_id,
+                        'state': upsert.excluded.state,
+                        'updated_at': upsert.excluded.updated_at
+                    }
+                )
+            )
+            db.commit()
+        return ledger
+
+    @staticmethod
+    def invalidate(
+        db: Session,
+        portfolio_ids: Iterable[uuid.UUID],
+        from_date: date
+    ) -> None:
+        """
+        Smaže snapshoty, které už zahrnují transakce od daného dne.
+        Commit provádí volající spolu se změnou transakcí.
+        """
+        portfolio_ids = list(set(portfolio_ids))
+        if not portfolio_ids:
+            return
+        db.execute(
+            delete(PositionSnapshot)
+            .where(
+                PositionSnapshot.portfolio_id.in_(portfolio_ids),
+                PositionSnapshot.as_of >= datetime.combine(from_date, time.min, timezone.utc)
+            )
+        )
@@ -0,0 +1,156 @@
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple, Type
+import base64
+import json
+import uuid
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+
+
+class KeysetPagination:
+    """
+    Stránkování podle klíče (seek) místo OFFSET.
+
+    Záznamy se řadí podle sloupců klíče (poslední musí být jedinečný, např. id)
+    a další stránka začíná za posledním vráceným záznamem, takže latence
+    nezávisí na hloubce stránky. Pozice se předává jako neprůhledný kurzor.
+    """
+
+    def __init__(self, name: str, columns: List, descending: bool = False):
+        self.name = name
+        self.columns = columns
+        self.descending = descending
+
+    # Kurzor
+
+    @staticmethod
+    def _encode_value(value) -> str:
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def _decode_value(column, value: str):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type is uuid.UUID:
+            return uuid.UUID(value)
+        return python_type(value)
+
+    def cursor_for(self, item) -> str:
+        """Kurzor ukazující za daný záznam"""
+        payload = {
+            "k": self.name,
+            "v": [self._encode_value(getattr(item, column.key)) for column in self.columns]
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Tuple:
+        """Hodnoty klíče z kurzoru, ValueError pro neplatný kurzor"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            if payload["k"] != self.name or len(payload["v"]) != len(self.columns):
+                raise ValueError
+            return tuple(
+                self._decode_value(column, value)
+                for column, value in zip(self.columns, payload["v"])
+            )
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+
+    # Dotazy
+
+    def apply(self, query: Query, cursor: Optional[str] = None) -> Query:
+        """Seřadí dotaz podle klíče a omezí ho na záznamy za kurzorem"""
+        if cursor:
+            key = tuple_(*self.columns)
+            values = tuple_(*self.decode_cursor(cursor))
+            query = query.filter(key < values if self.descending else key > values)
+        order = [column.desc() if self.descending else column.asc() for column in self.columns]
+        return query.order_by(*order)
+
+    def fetch(
+        self,
+        query: Query,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        skip: int = 0
+    ) -> Tuple[List, Optional[str]]:
+        """Jedna stránka záznamů a kurzor další stránky (None na konci)"""
+        query = self.apply(query, cursor)
+        if skip:
+            query = query.offset(skip)
+        items = query.limit(limit + 1).all()
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, self.cursor_for(items[-1])
+
+    def stream_ndjson(
+        self,
+        query: Query,
+        cursor: Optional[str],
+        schema: Type[BaseModel],
+        batch_size: int = None
+    ) -> Iterator[str]:
+        """
+        Všechny záznamy za kurzorem jako NDJSON. Čte serverovým kurzorem
+        (yield_per) ve vlastní session, aby přežil ukončení požadavku.
+        """
+        # Kurzor se ověří hned, ne až při odesílání odpovědi
+        return self._ndjson(self.apply(query, cursor), schema, batch_size or settings.STREAM_BATCH_SIZE)
+
+    @staticmethod
+    def _ndjson(query: Query, schema: Type[BaseModel], batch_size: int) -> Iterator[str]:
+        db = SessionLocal()
+        try:
+            lines = []
+            for item in query.with_session(db).yield_per(batch_size):
+                lines.append(schema.model_validate(item).model_dump_json())
+                if len(lines) >= batch_size:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+        finally:
+            db.close()
+
+    def respond(
+        self,
+        query: Query,
+        response: Response,
+        schema: Type[BaseModel],
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        skip: int = 0,
+        stream: bool = False
+    ):
+        """
+        Odpověď seznamového endpointu: stránka záznamů s kurzorem další
+        stránky v hlavičce X-Next-Cursor, nebo se stream=True všechny
+        záznamy jako NDJSON
+        """
+        try:
+            if stream:
+                return StreamingResponse(
+                    self.stream_ndjson(query, cursor, schema),
+                    media_type="application/x-ndjson"
+                )
+            items, next_cursor = self.fetch(query, cursor, limit, skip)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return items
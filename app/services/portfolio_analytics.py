@@ -2,9 +2,14 @@ from typing import List, Dict, Optional
 from datetime import datetime, date
 import pandas as pd
 import numpy as np
-from scipy.optimize import minimize
 from decimal import Decimal
 
+from app.services.benchmark import BenchmarkComparison
+from app.services.risk import RiskEngine
+from app.services.trading_calendar import TRADING_DAYS_PER_YEAR
+from app.services.valuation import ValuationEngine
+from app.services.xirr import XIRRSolver
+
 
 class PortfolioAnalytics:
     @staticmethod
@@ -17,51 +22,30 @@ class PortfolioAnalytics:
         """
         Výpočet Time-Weighted Rate of Return (TWRR)
         """
-        # Převod na DataFrame
-        df_trans = pd.DataFrame(transactions)
-        df_prices = pd.DataFrame(prices)
-        
-        # Seřazení podle data
-        df_trans = df_trans.sort_values('trade_time')
-        df_prices = df_prices.sort_values('date')
-        
-        # Výpočet denních hodnot portfolia
-        daily_values = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            # Hodnota portfolia k danému dni
-            portfolio_value = 0
-            
-            # Procházení transakcí do aktuálního dne
-            day_transactions = df_trans[df_trans['trade_time'].dt.date <= current_date]
-            
-            for asset_id in day_transactions['asset_id'].unique():
-                asset_trans = day_transactions[day_transactions['asset_id'] == asset_id]
-                quantity = asset_trans['quantity'].sum()
-                
-                if quantity > 0:
-                    # Získání poslední ceny pro dané aktivum
-                    last_price = df_prices[
-                        (df_prices['asset_id'] == asset_id) &
-                        (df_prices['date'].dt.date <= current_date)
-                    ]['close'].iloc[-1]
-                    
-                    portfolio_value += quantity * last_price
-            
-            daily_values.append({
-                'date': current_date,
-                'value': portfolio_value
-            })
-            
-            current_date += pd.Timedelta(days=1)
+        # Denní hodnoty portfolia z matic množství a cen
+        values = ValuationEngine.calculate_daily_values(
+            transactions,
+            prices,
+            start_date,
+            end_date
+        )
+        return PortfolioAnalytics.calculate_ttwrr_from_values(values)
+
+    @staticmethod
+    def calculate_ttwrr_from_values(values: pd.Series) -> Dict:
+        """
+        Výpočet TWRR z již spočtené řady hodnot portfolia v obchodních dnech
+        """
+        daily_values = [
+            {'date': day, 'value': value}
+            for day, value in zip(values.index.date, values.tolist())
+        ]
         
         # Výpočet TWRR
-        df_values = pd.DataFrame(daily_values)
-        daily_returns = df_values['value'].pct_change()
+        daily_returns = values.pct_change()
         
         cumulative_return = (1 + daily_returns).prod() - 1
-        annualized_return = (1 + cumulative_return) ** (365 / len(daily_returns)) - 1
+        annualized_return = (1 + cumulative_return) ** (TRADING_DAYS_PER_YEAR / len(daily_returns)) - 1
         
         return {
             'daily_values': daily_values,
@@ -69,46 +53,82 @@ class PortfolioAnalytics:
             'annualized_return': float(annualized_return)
         }
 
+    # Znaménko cashflow podle typu transakce (vklad do portfolia je kladný)
+    CASHFLOW_SIGNS = {'BUY': 1, 'SELL': -1, 'DIVIDEND': -1}
+
+    @staticmethod
+    def _cashflows(transactions: List[Dict]) -> pd.DataFrame:
+        """
+        Převede transakce na cashflow - buď přímo ze sloupců date/cashflow,
+        nebo z trade_time, type a gross_amount
+        """
+        df = pd.DataFrame(transactions)
+        if df.empty:
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'cashflow': pd.Series(dtype='float64')})
+        if 'cashflow' not in df.columns:
+            signs = df['type'].map(PortfolioAnalytics.CASHFLOW_SIGNS)
+            df = pd.DataFrame({
+                'date': df['trade_time'],
+                'cashflow': pd.to_numeric(df['gross_amount']).astype('float64').abs() * signs
+            }).dropna(subset=['cashflow'])
+        dates = pd.to_datetime(df['date'])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        return pd.DataFrame({
+            'date': dates,
+            'cashflow': pd.to_numeric(df['cashflow']).astype('float64')
+        })
+
     @staticmethod
     def calculate_xirr(
         transactions: List[Dict],
-        current_value: float
-    ) -> float:
+        current_value: float,
+        valuation_date: date = None
+    ) -> Optional[float]:
         """
         Výpočet XIRR (Extended Internal Rate of Return)
         """
-        # Převod na DataFrame
-        df = pd.DataFrame(transactions)
-        
-        # Přidání současné hodnoty jako poslední cashflow
-        last_row = pd.DataFrame([{
-            'date': pd.Timestamp.now(),
-            'cashflow': -current_value
-        }])
-        df = pd.concat([df, last_row])
-        
-        # Seřazení podle data
-        df = df.sort_values('date')
-        
-        # Výpočet počtu dní od první transakce
-        df['days'] = (df['date'] - df['date'].min()).dt.days
-        
-        def xirr_objective(rate):
-            """Pomocná funkce pro výpočet XIRR"""
-            return np.sum(
-                df['cashflow'] / (1 + rate) ** (df['days'] / 365)
-            )
+        return PortfolioAnalytics.calculate_xirr_batch(
+            {None: (transactions, current_value)},
+            valuation_date
+        )[None]
+
+    @staticmethod
+    def calculate_xirr_batch(
+        groups: Dict,
+        valuation_date: date = None,
+        opening_values: Dict = None,
+        start_date: date = None
+    ) -> Dict:
+        """
+        XIRR pro více skupin (portfolia, účty) jedním vektorovým výpočtem.
+        groups mapuje klíč skupiny na dvojici (transakce, současná hodnota),
+        opening_values volitelně na hodnotu skupiny na začátku období.
+        """
+        valuation_date = pd.Timestamp(valuation_date or datetime.now())
+        opening_values = opening_values or {}
+        
+        cashflows = []
+        for key, (transactions, current_value) in groups.items():
+            df = PortfolioAnalytics._cashflows(transactions)
+            dates = list(df['date'])
+            amounts = list(df['cashflow'])
+            # Počáteční hodnota jako první vklad
+            if opening_values.get(key) and start_date is not None:
+                dates.insert(0, pd.Timestamp(start_date))
+                amounts.insert(0, float(opening_values[key]))
+            # Současná hodnota jako poslední cashflow
+            dates.append(valuation_date)
+            amounts.append(-float(current_value or 0))
+            cashflows.append((dates, amounts))
+        
+        amounts, years = XIRRSolver.pack(cashflows)
+        rates = XIRRSolver.solve_batch(amounts, years)
         
-        # Nalezení XIRR pomocí optimalizace
-        try:
-            result = minimize(
-                lambda x: xirr_objective(x[0]) ** 2,
-                [0.1],
-                method='Nelder-Mead'
-            )
-            return float(result.x[0])
-        except:
-            return None
+        return {
+            key: float(rate) if np.isfinite(rate) else None
+            for key, rate in zip(groups.keys(), rates)
+        }
 
     @staticmethod
     def calculate_risk_metrics(
@@ -116,28 +136,9 @@ class PortfolioAnalytics:
         risk_free_rate: float = 0.02
     ) -> Dict:
         """
-        Výpočet rizikových metrik (volatilita, Sharpe ratio, max drawdown)
+        Výpočet rizikových metrik (volatilita, Sharpe a Sortino ratio, max drawdown)
         """
-        returns = pd.Series(daily_returns)
-        
-        # Volatilita (annualizovaná)
-        volatility = returns.std() * np.sqrt(252)
-        
-        # Sharpe ratio
-        excess_returns = returns - risk_free_rate / 252
-        sharpe = np.sqrt(252) * excess_returns.mean() / returns.std()
-        
-        # Maximum drawdown
-        cumulative = (1 + returns).cumprod()
-        rolling_max = cumulative.expanding().max()
-        drawdowns = cumulative / rolling_max - 1
-        max_drawdown = drawdowns.min()
-        
-        return {
-            'volatility': float(volatility),
-            'sharpe_ratio': float(sharpe),
-            'max_drawdown': float(max_drawdown)
-        }
+        return RiskEngine.metrics(np.asarray(daily_returns, dtype="float64"), risk_free_rate)
 
     @staticmethod
     def calculate_benchmark_comparison(
@@ -145,28 +146,23 @@ class PortfolioAnalytics:
         benchmark_values: List[Dict]
     ) -> Dict:
         """
-        Porovnání s benchmarkem (tracking error, beta)
+        Porovnání s benchmarkem - řady se zarovnají podle data, výnosy
+        se počítají jen mezi dny, kdy jsou známé obě hodnoty
         """
-        # Převod na DataFrame
-        df_portfolio = pd.DataFrame(portfolio_values)
-        df_benchmark = pd.DataFrame(benchmark_values)
-        
-        # Výpočet denních výnosů
-        portfolio_returns = df_portfolio['value'].pct_change().dropna()
-        benchmark_returns = df_benchmark['value'].pct_change().dropna()
-        
-        # Tracking error
-        tracking_error = np.std(portfolio_returns - benchmark_returns) * np.sqrt(252)
-        
-        # Beta
-        covariance = np.cov(portfolio_returns, benchmark_returns)[0][1]
-        benchmark_variance = np.var(benchmark_returns)
-        beta = covariance / benchmark_variance
-        
-        return {
-            'tracking_error': float(tracking_error),
-            'beta': float(beta)
-        }
+        df_portfolio = pd.DataFrame(portfolio_values, columns=['date', 'value'])
+        df_benchmark = pd.DataFrame(benchmark_values, columns=['date', 'value'])
+        for df in (df_portfolio, df_benchmark):
+            df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None).dt.normalize()
+
+        aligned = df_portfolio.drop_duplicates('date', keep='last')\
+            .merge(df_benchmark.drop_duplicates('date', keep='last'), on='date', suffixes=('', '_benchmark'))\
+            .sort_values('date')
+        aligned = aligned[aligned['value'] > 0]
+
+        return BenchmarkComparison.compare(
+            aligned['value'].to_numpy(dtype='float64'),
+            aligned[['value_benchmark']].to_numpy(dtype='float64')
+        )[0]
 
     @staticmethod
     def calculate_asset_allocation(
@@ -0,0 +1,82 @@
+from typing import Dict, List
+from datetime import date
+import uuid
+import numpy as np
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+
+from app.models.models import Asset, Portfolio, Price
+from app.services.fx import FxRates
+from app.services.ledger import EPSILON, split_adjusted_quantities
+from app.services.valuation import ValuationEngine
+
+
+class PortfolioData:
+    """
+    Datové dotazy pro analytiku portfolia
+    """
+
+    @staticmethod
+    def get_current_holdings(db: Session, portfolio_id: uuid.UUID) -> List[Dict]:
+        """
+        Aktuální pozice portfolia - jeden řádek na aktivum s čistým
+        množstvím, poslední známou cenou (v měně aktiva) a tržní hodnotou
+        v základní měně portfolia (None, pokud chybí kurz měny aktiva)
+        """
+        # Čisté množství na aktivum (včetně splitů) se agreguje přímo v SQL
+        trades = split_adjusted_quantities(portfolio_id)
+        positions = select(
+            trades.c.asset_id,
+            func.sum(trades.c.quantity).label('quantity')
+        ).group_by(trades.c.asset_id)\
+            .having(func.sum(trades.c.quantity) > EPSILON)\
+            .subquery('positions')
+
+        # Poslední cena přes index (asset_id, date) - jeden řádek na aktivum
+        latest = select(Price.close)\
+            .where(Price.asset_id == positions.c.asset_id)\
+            .order_by(Price.date.desc())\
+            .limit(1)\
+            .lateral('latest')
+
+        rows = db.execute(
+            select(
+                Asset.id,
+                Asset.symbol,
+                Asset.name,
+                Asset.type,
+                Asset.sector,
+                Asset.region,
+                Asset.currency,
+                positions.c.quantity,
+                latest.c.close.label('price'),
+                (positions.c.quantity * latest.c.close).label('market_value')
+            ).select_from(positions)
+            .join(Asset, Asset.id == positions.c.asset_id)
+            .join(latest, true())
+        ).all()
+
+        if not rows:
+            return []
+
+        # Tržní hodnota v základní měně portfolia podle posledního kurzu
+        base = db.query(Portfolio.base_currency).filter(Portfolio.id == portfolio_id).scalar()
+        today = date.today()
+        fx = FxRates.matrix(
+            db,
+            {row.currency for row in rows},
+            base,
+            ValuationEngine.date_index(today, today)
+        ).iloc[0]
+
+        holdings = []
+        for row in rows:
+            rate = fx[row.currency]
+            holdings.append({
+                **row._asdict(),
+                'quantity': float(row.quantity),
+                'price': float(row.price),
+                # Pozice bez kurzu do základní měny nemá hodnotu (ne nulovou)
+                'market_value': float(row.market_value) * float(rate) if not np.isnan(rate) else None
+            })
+        return holdings
@@ -0,0 +1,88 @@
+"""
+Načtení denních cen do tabulky prices.
+
+Spuštění se souborem CSV (sloupce symbol, date, close, volitelně
+currency - jinak měna aktiva) proti databázi z DATABASE_URL:
+
+    python -m app.services.price_loader ceny.csv [zdroj]
+"""
+import sys
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.db.base import SessionLocal
+from app.models.models import Asset
+import app.models.user  # noqa: F401 - vztah Portfolio.user
+from app.services.invalidation import CacheInvalidation
+from app.services.price_repository import PriceRepository
+
+
+class PriceLoader:
+    """
+    Zápis cen se zneplatněním odvozených dat - materializované hodnoty
+    portfolií od nejstaršího změněného dne, reporty a řady cen v cache.
+    Ceny do prices se mají zapisovat jen tudy.
+    """
+
+    COLUMNS = ['symbol', 'date', 'close']
+
+    @staticmethod
+    def load(db: Session, prices: pd.DataFrame, source: str) -> int:
+        """
+        Uloží ceny (sloupce COLUMNS, volitelně currency) a zneplatní
+        dotčená portfolia, vrací počet aktiv se změněnou cenou. Řádky
+        neznámých symbolů se přeskočí. Commit provádí volající.
+        """
+        symbols = prices['symbol'].astype(str).str.strip()
+        assets = {
+            row.symbol: row
+            for row in db.query(Asset.id, Asset.symbol, Asset.currency)
+            .filter(Asset.symbol.in_(list(symbols.unique())))
+        }
+        known = symbols.isin(list(assets))
+
+        frame = pd.DataFrame({
+            'asset_id': symbols[known].map(lambda s: assets[s].id),
+            'date': pd.to_datetime(prices.loc[known, 'date']).dt.date,
+            'close': pd.to_numeric(prices.loc[known, 'close'], errors='coerce'),
+            'currency': (
+                prices.loc[known, 'currency'].astype(str).str.strip().str.upper()
+                if 'currency' in prices.columns
+                else symbols[known].map(lambda s: assets[s].currency)
+            )
+        })
+        frame = frame[frame['close'] > 0]\
+            .drop_duplicates(['asset_id', 'date'], keep='last')
+        if frame.empty:
+            return 0
+
+        changed = PriceRepository.store(
+            db,
+            [{**row, 'source': source} for row in frame.to_dict('records')]
+        )
+        CacheInvalidation.prices_changed(db, changed)
+        return len(changed)
+
+    @classmethod
+    def from_csv(cls, db: Session, path: str, source: str = "csv") -> int:
+        """Ceny ze souboru CSV se sloupci COLUMNS (a volitelně currency)"""
+        return cls.load(db, pd.read_csv(path), source)
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("usage: python -m app.services.price_loader <prices.csv> [source]")
+        return 2
+
+    db = SessionLocal()
+    try:
+        changed = PriceLoader.from_csv(db, *sys.argv[1:3])
+        db.commit()
+    finally:
+        db.close()
+    print(f"updated prices of {changed} assets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy import column, func, or_, select, table, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+
+from app.models.models import LatestPrice, Price
+
+
+class PriceRepository:
+    """
+    Čtení cenových řad s rozlišením podle délky období.
+
+    Na TimescaleDB se týdenní a měsíční řady čtou z continuous agregací
+    prices_weekly / prices_monthly a poslední ceny z tabulky latest_prices
+    (migrace 003). Na ostatních databázích (SQLite) se stejné výsledky
+    počítají z denních cen v pandas.
+    """
+
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+
+    # Nejdelší období (dny), pro které se ještě použije dané rozlišení
+    DAILY_MAX_DAYS = 366
+    WEEKLY_MAX_DAYS = 3 * 366
+
+    _aggregates = {
+        WEEKLY: table(
+            "prices_weekly",
+            column("asset_id"), column("bucket"), column("date"), column("close")
+        ),
+        MONTHLY: table(
+            "prices_monthly",
+            column("asset_id"), column("bucket"), column("date"), column("close")
+        ),
+    }
+    # Týdny začínají pondělím stejně jako time_bucket v TimescaleDB
+    _periods = {WEEKLY: "W-SUN", MONTHLY: "M"}
+
+    @classmethod
+    def resolution_for(cls, start_date: date, end_date: date) -> str:
+        """Rozlišení řady pro dané období"""
+        days = (end_date - start_date).days
+        if days <= cls.DAILY_MAX_DAYS:
+            return cls.DAILY
+        if days <= cls.WEEKLY_MAX_DAYS:
+            return cls.WEEKLY
+        return cls.MONTHLY
+
+    @staticmethod
+    def _has_aggregates(db: Session) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def _frame(rows) -> pd.DataFrame:
+        df = pd.DataFrame(
+            [(r.asset_id, r.date, r.close) for r in rows],
+            columns=["asset_id", "date", "close"]
+        )
+        df["date"] = pd.to_datetime(df["date"]).dt.tz_localize(None).dt.normalize()\
+            .astype("datetime64[ns]")
+        df["close"] = pd.to_numeric(df["close"]).astype("float64")
+        return df
+
+    @classmethod
+    def _bucket_bounds(cls, resolution: str, start_date: date, end_date: date):
+        """První den intervalu obsahujícího start a den po intervalu obsahujícím konec"""
+        freq = cls._periods[resolution]
+        first = pd.Period(start_date, freq).start_time.date()
+        after = pd.Period(end_date, freq).end_time.date() + timedelta(days=1)
+        return first, after
+
+    @classmethod
+    def get_history(
+        cls,
+        db: Session,
+        asset_ids: List[uuid.UUID],
+        start_date: date,
+        end_date: date,
+        resolution: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Cenová řada aktiv (sloupce asset_id, date, close) seřazená podle data.
+        U týdenního a měsíčního rozlišení je pro každý interval překrývající
+        období jeden řádek s posledním close v intervalu.
+        """
+        resolution = resolution or cls.resolution_for(start_date, end_date)
+        if not asset_ids:
+            return cls._frame([])
+
+        if resolution == cls.DAILY:
+            rows = db.query(Price.asset_id, Price.date, Price.close)\
+                .filter(
+                    Price.asset_id.in_(asset_ids),
+                    Price.date >= datetime.combine(start_date, time.min),
+                    Price.date < datetime.combine(end_date + timedelta(days=1), time.min)
+                ).order_by(Price.asset_id, Price.date)\
+                .all()
+            return cls._frame(rows)
+
+        first, after = cls._bucket_bounds(resolution, start_date, end_date)
+
+        if cls._has_aggregates(db):
+            aggregate = cls._aggregates[resolution]
+            rows = db.execute(
+                select(aggregate.c.asset_id, aggregate.c.date, aggregate.c.close)
+                .where(
+                    aggregate.c.asset_id.in_(asset_ids),
+                    aggregate.c.bucket >= first,
+                    aggregate.c.bucket < after
+                ).order_by(aggregate.c.asset_id, aggregate.c.bucket)
+            ).all()
+            return cls._frame(rows)
+
+        # Bez TimescaleDB - převzorkování denních cen
+        daily = cls.get_history(
+            db, asset_ids, first, after - timedelta(days=1), cls.DAILY
+        )
+        daily["bucket"] = daily["date"].dt.to_period(cls._periods[resolution])
+        return daily.groupby(["asset_id", "bucket"], sort=False)\
+            .last()\
+            .reset_index()[["asset_id", "date", "close"]]\
+            .sort_values(["asset_id", "date"], ignore_index=True)
+
+    @classmethod
+    def get_closes(
+        cls,
+        db: Session,
+        asset_ids: List[uuid.UUID],
+        start_date: date,
+        end_date: date
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Denní close aktiv za období a navíc poslední close každého aktiva
+        před začátkem období (pro dopředné doplnění). Vrací pole seřazená
+        podle času: pozice aktiva v asset_ids, den (datetime64) a close (float64).
+        """
+        if not asset_ids:
+            return cls._arrays(cls._frame([]), asset_ids)
+
+        first = datetime.combine(start_date, time.min)
+        after = datetime.combine(end_date + timedelta(days=1), time.min)
+
+        # Poslední cena před obdobím - jeden skok po indexu (asset_id, date) na aktivum
+        earlier = aliased(Price)
+        prior_date = select(func.max(earlier.date))\
+            .where(earlier.asset_id == Price.asset_id, earlier.date < first)\
+            .scalar_subquery()
+
+        prior = select(Price.asset_id, Price.date, Price.close)\
+            .where(Price.asset_id.in_(asset_ids), Price.date == prior_date)
+        period = select(Price.asset_id, Price.date, Price.close)\
+            .where(
+                Price.asset_id.in_(asset_ids),
+                Price.date >= first,
+                Price.date < after
+            )
+        closes = union_all(prior, period).subquery()
+
+        rows = db.execute(
+            select(closes.c.asset_id, closes.c.date, closes.c.close)
+            .order_by(closes.c.date)
+        ).all()
+        return cls._arrays(cls._frame(rows), asset_ids)
+
+    @staticmethod
+    def _arrays(df: pd.DataFrame, asset_ids: List[uuid.UUID]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        positions = pd.Index(asset_ids, dtype=object).get_indexer(df["asset_id"])
+        return positions, df["date"].to_numpy(), df["close"].to_numpy()
+
+    @classmethod
+    def get_latest(
+        cls,
+        db: Session,
+        asset_ids: List[uuid.UUID]
+    ) -> Dict[uuid.UUID, Dict]:
+        """
+        Poslední známá cena aktiv - {asset_id: {'date', 'close'}}
+        """
+        if not asset_ids:
+            return {}
+
+        if cls._has_aggregates(db):
+            rows = db.query(LatestPrice.asset_id, LatestPrice.date, LatestPrice.close)\
+                .filter(LatestPrice.asset_id.in_(asset_ids))\
+                .all()
+        else:
+            last = db.query(Price.asset_id, func.max(Price.date).label("date"))\
+                .filter(Price.asset_id.in_(asset_ids))\
+                .group_by(Price.asset_id)\
+                .subquery()
+            rows = db.query(Price.asset_id, Price.date, Price.close)\
+                .join(last, (Price.asset_id == last.c.asset_id) & (Price.date == last.c.date))\
+                .all()
+
+        return {
+            r.asset_id: {
+                'date': pd.Timestamp(r.date).date(),
+                'close': float(r.close)
+            }
+            for r in rows
+        }
+
+    @classmethod
+    def latest_date(cls, db: Session, asset_ids) -> Optional[date]:
+        """
+        Den nejnovější ceny ze zadaných aktiv (seznam id nebo select id)
+        """
+        if cls._has_aggregates(db):
+            value = db.query(func.max(LatestPrice.date))\
+                .filter(LatestPrice.asset_id.in_(asset_ids))\
+                .scalar()
+        else:
+            value = db.query(func.max(Price.date))\
+                .filter(Price.asset_id.in_(asset_ids))\
+                .scalar()
+        return pd.Timestamp(value).date() if value is not None else None
+
+    @staticmethod
+    def store(db: Session, rows: List[Dict]) -> Dict[uuid.UUID, date]:
+        """
+        Uloží ceny (asset_id, date, close, currency, source), existující
+        záznamy přepíše. Vrací nejstarší změněný den každého aktiva - ceny
+        beze změny se nepočítají. Commit a zneplatnění odvozených dat
+        (CacheInvalidation.prices_changed) provádí volající.
+        """
+        if not rows:
+            return {}
+        upsert = insert(Price)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=['asset_id', 'date'],
+            set_={
+                'close': upsert.excluded.close,
+                'currency': upsert.excluded.currency,
+                'source': upsert.excluded.source
+            },
+            where=or_(
+                Price.close != upsert.excluded.close,
+                Price.currency != upsert.excluded.currency
+            )
+        )
+        changed: Dict[uuid.UUID, date] = {}
+        for asset_id, day in db.execute(upsert.returning(Price.asset_id, Price.date), rows).all():
+            day = pd.Timestamp(day).date()
+            changed[asset_id] = min(changed.get(asset_id, day), day)
+        return changed
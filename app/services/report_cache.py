@@ -0,0 +1,144 @@
+from typing import Dict, Iterable, Optional
+from datetime import date, datetime
+import math
+import threading
+import uuid
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import ReportCache
+
+
+class ReportCacheService:
+    """
+    Read-through cache výsledků analytiky v tabulce report_cache
+    """
+
+    _lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(report: str, **params) -> str:
+        """
+        Sestaví klíč z názvu reportu a normalizovaných parametrů
+        (seřazené názvy, data v ISO formátu, prázdné hodnoty vynechány)
+        """
+        parts = [report]
+        for name in sorted(params):
+            value = params[name]
+            if value is None:
+                continue
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            parts.append(f"{name}={value}")
+        return "|".join(parts)
+
+    @classmethod
+    def _sanitize(cls, value):
+        """JSONB nepřijímá NaN ani nekonečno - nahradí je hodnotou None"""
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        if isinstance(value, dict):
+            return {k: cls._sanitize(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [cls._sanitize(v) for v in value]
+        return value
+
+    @classmethod
+    def to_payload(cls, result) -> Dict:
+        """Převede výsledek analytiky na JSON kompatibilní payload"""
+        return cls._sanitize(jsonable_encoder(result))
+
+    @classmethod
+    def _count(cls, name: str) -> None:
+        with cls._lock:
+            cls._stats[name] += 1
+
+    @classmethod
+    def get(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        key: str
+    ) -> Optional[Dict]:
+        """Vrátí uložený payload nebo None"""
+        payload = db.execute(
+            select(ReportCache.payload).where(
+                ReportCache.portfolio_id == portfolio_id,
+                ReportCache.key == key
+            )
+        ).scalar_one_or_none()
+        cls._count("hits" if payload is not None else "misses")
+        return payload
+
+    @staticmethod
+    def set(
+        db: Session,
+        portfolio_id: uuid.UUID,
+        key: str,
+        payload: Dict
+    ) -> None:
+        """Uloží payload (commit provádí volající)"""
+        upsert = insert(ReportCache).values(
+            portfolio_id=portfolio_id,
+            key=key,
+            payload=payload,
+            computed_at=datetime.utcnow()
+        )
+        db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=['portfolio_id', 'key'],
+                set_={
+                    'payload': upsert.excluded.payload,
+                    'computed_at': upsert.excluded.computed_at
+                }
+            )
+        )
+
+    @classmethod
+    def get_or_compute(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        key: str,
+        compute
+    ) -> Dict:
+        """
+        Vrátí payload z cache, případně ho spočítá funkcí compute() a uloží
+        """
+        payload = cls.get(db, portfolio_id, key)
+        if payload is not None:
+            return payload
+
+        payload = cls.to_payload(compute())
+        cls.set(db, portfolio_id, key, payload)
+        db.commit()
+        return payload
+
+    @staticmethod
+    def invalidate(db: Session, portfolio_ids: Iterable[uuid.UUID]) -> None:
+        """Smaže všechny uložené reporty portfolií (commit provádí volající)"""
+        portfolio_ids = list(set(portfolio_ids))
+        if not portfolio_ids:
+            return
+        db.execute(
+            delete(ReportCache).where(ReportCache.portfolio_id.in_(portfolio_ids))
+        )
+
+    @classmethod
+    def stats(cls, db: Session = None, portfolio_id: uuid.UUID = None) -> Dict:
+        """Počty zásahů a minutí cache v tomto procesu"""
+        with cls._lock:
+            stats = dict(cls._stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / total if total else None
+
+        if db is not None and portfolio_id is not None:
+            stats["entries"] = db.execute(
+                select(func.count()).select_from(ReportCache)
+                .where(ReportCache.portfolio_id == portfolio_id)
+            ).scalar()
+        return stats
+
@@ -0,0 +1,190 @@
+from collections import deque
+from typing import Dict, List, Optional
+import math
+import numpy as np
+
+from app.services.trading_calendar import TRADING_DAYS_PER_YEAR
+
+
+def finite_or_none(value: float) -> Optional[float]:
+    """Nedefinovaná hodnota (NaN, nekonečno) se vrací jako None"""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class RiskEngine:
+    """
+    Rizikové metriky celé řady denních výnosů nad souvislým float64 polem
+    """
+
+    @staticmethod
+    def returns(values: np.ndarray, dropna: bool = True) -> np.ndarray:
+        """
+        Denní výnosy z řady hodnot portfolia. Dny s nulovou předchozí
+        hodnotou (před první pozicí) výnos nemají - vynechají se, nebo
+        s dropna=False zůstanou jako NaN.
+        """
+        values = np.ascontiguousarray(values, dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = values[1:] / values[:-1] - 1.0
+        if dropna:
+            return returns[np.isfinite(returns)]
+        return np.where(np.isfinite(returns), returns, np.nan)
+
+    @staticmethod
+    def metrics(returns: np.ndarray, risk_free_rate: float = 0.02) -> Dict:
+        """
+        Volatilita, Sharpe a Sortino ratio, maximální drawdown a jeho
+        nejdelší trvání (ve dnech)
+        """
+        returns = np.ascontiguousarray(returns, dtype="float64")
+        if len(returns) < 2:
+            return {
+                'volatility': None,
+                'sharpe_ratio': None,
+                'sortino_ratio': None,
+                'max_drawdown': 0.0,
+                'max_drawdown_duration': 0
+            }
+
+        excess = returns - risk_free_rate / TRADING_DAYS_PER_YEAR
+        std = returns.std(ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+
+        # Drawdown vůči dosavadnímu maximu (včetně počáteční hodnoty)
+        wealth = np.empty(len(returns) + 1)
+        wealth[0] = 1.0
+        np.cumprod(1.0 + returns, out=wealth[1:])
+        peaks = np.maximum.accumulate(wealth)
+        drawdowns = wealth / peaks - 1.0
+
+        # Trvání = počet dní od posledního maxima
+        days = np.arange(len(wealth))
+        last_peak = np.maximum.accumulate(np.where(wealth >= peaks, days, 0))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                'volatility': finite_or_none(std * np.sqrt(TRADING_DAYS_PER_YEAR)),
+                'sharpe_ratio': finite_or_none(np.sqrt(TRADING_DAYS_PER_YEAR) * excess.mean() / std),
+                'sortino_ratio': finite_or_none(np.sqrt(TRADING_DAYS_PER_YEAR) * excess.mean() / downside),
+                'max_drawdown': float(drawdowns.min()),
+                'max_drawdown_duration': int((days - last_peak).max())
+            }
+
+
+class RollingRisk:
+    """
+    Klouzavé rizikové metriky za posledních window obchodních dní.
+
+    Výnosy se drží v kruhovém bufferu s průběžnými součty a maxima hodnoty
+    v monotónní frontě, takže přidání dne je O(1) a historie se nepřepočítává.
+    Stav lze uložit (state) a obnovit (from_state) a pokračovat dalšími dny.
+    """
+
+    WINDOWS = (30, 90, 252)
+
+    def __init__(self, window: int, risk_free_rate: float = 0.02):
+        self.window = window
+        self.risk_free_rate = risk_free_rate
+        self.count = 0
+        self._buffer = np.zeros(window)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._down_sq = 0.0
+        # Logaritmus hodnoty (1 na začátku) a kandidáti na maximum v okně
+        self._log_wealth = 0.0
+        self._peaks = deque([(0, 0.0)])
+
+    def _downside(self, value: float) -> float:
+        return min(value - self.risk_free_rate / TRADING_DAYS_PER_YEAR, 0.0) ** 2
+
+    def _resum(self) -> None:
+        """Přepočet součtů z bufferu, aby se nehromadila zaokrouhlovací chyba"""
+        values = self._buffer[:min(self.count, self.window)]
+        self._sum = float(values.sum())
+        self._sum_sq = float((values ** 2).sum())
+        self._down_sq = float((np.minimum(values - self.risk_free_rate / TRADING_DAYS_PER_YEAR, 0.0) ** 2).sum())
+
+    def append(self, value: float) -> None:
+        """Přidá výnos dalšího dne"""
+        position = self.count % self.window
+        if self.count >= self.window:
+            old = float(self._buffer[position])
+            self._sum -= old
+            self._sum_sq -= old * old
+            self._down_sq -= self._downside(old)
+        self._buffer[position] = value
+        self._sum += value
+        self._sum_sq += value * value
+        self._down_sq += self._downside(value)
+        self.count += 1
+        if self.count % self.window == 0:
+            self._resum()
+
+        if value <= -1.0:
+            # Ztráta celé hodnoty - drawdown -100 %, další den začne nová řada
+            self._log_wealth = -math.inf
+        else:
+            if self._log_wealth == -math.inf:
+                self._log_wealth = 0.0
+                self._peaks = deque([(self.count - 1, 0.0)])
+            self._log_wealth += math.log1p(value)
+        while self._peaks and self._peaks[-1][1] <= self._log_wealth:
+            self._peaks.pop()
+        self._peaks.append((self.count, self._log_wealth))
+        while self._peaks[0][0] < self.count - self.window:
+            self._peaks.popleft()
+
+    def extend(self, values: np.ndarray) -> List[Dict]:
+        """Přidá výnosy více dní a vrátí metriky po každém z nich"""
+        result = []
+        for value in np.asarray(values, dtype="float64"):
+            self.append(float(value))
+            result.append(self.metrics())
+        return result
+
+    def metrics(self) -> Dict:
+        """Metriky aktuálního okna (None, dokud okno není plné)"""
+        drawdown = math.exp(self._log_wealth - self._peaks[0][1]) - 1.0
+        if self.count < self.window:
+            return {
+                'volatility': None,
+                'sharpe_ratio': None,
+                'sortino_ratio': None,
+                'drawdown': drawdown
+            }
+
+        n = self.window
+        mean = self._sum / n
+        variance = max((self._sum_sq - self._sum * mean) / (n - 1), 0.0)
+        std = math.sqrt(variance)
+        excess = mean - self.risk_free_rate / TRADING_DAYS_PER_YEAR
+        downside = math.sqrt(max(self._down_sq, 0.0) / n)
+        scale = math.sqrt(TRADING_DAYS_PER_YEAR)
+        return {
+            'volatility': std * scale,
+            'sharpe_ratio': scale * excess / std if std > 0 else None,
+            'sortino_ratio': scale * excess / downside if downside > 0 else None,
+            'drawdown': drawdown
+        }
+
+    def state(self) -> Dict:
+        """Stav pro uložení (JSON)"""
+        return {
+            'window': self.window,
+            'risk_free_rate': self.risk_free_rate,
+            'count': self.count,
+            'buffer': self._buffer.tolist(),
+            'log_wealth': self._log_wealth,
+            'peaks': [list(peak) for peak in self._peaks]
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "RollingRisk":
+        rolling = cls(state['window'], state['risk_free_rate'])
+        rolling.count = state['count']
+        rolling._buffer = np.asarray(state['buffer'], dtype="float64")
+        rolling._log_wealth = state['log_wealth']
+        rolling._peaks = deque((int(i), float(w)) for i, w in state['peaks'])
+        rolling._resum()
+        return rolling
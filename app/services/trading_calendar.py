@@ -0,0 +1,104 @@
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    EasterMonday,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday
+)
+
+from app.core.config import settings
+
+# Počet obchodních dní v roce pro annualizaci výnosů a rizika
+TRADING_DAYS_PER_YEAR = 252
+
+
+class TradingCalendar:
+    """
+    Obchodní dny burz (pracovní dny bez svátků burzy).
+
+    Svátky se počítají lokálně z pravidel, bez externích služeb.
+    Indexy pro burzu a období se cachují, DatetimeIndex je neměnný
+    a lze ho sdílet mezi požadavky.
+    """
+
+    RULES: Dict[str, List[Holiday]] = {
+        # New York Stock Exchange
+        "XNYS": [
+            Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+            USMartinLutherKingJr,
+            USPresidentsDay,
+            GoodFriday,
+            USMemorialDay,
+            Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+            Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+            USLaborDay,
+            USThanksgivingDay,
+            Holiday("Christmas Day", month=12, day=25, observance=nearest_workday)
+        ],
+        # Burza cenných papírů Praha
+        "XPRA": [
+            Holiday("Nový rok", month=1, day=1),
+            GoodFriday,
+            EasterMonday,
+            Holiday("Svátek práce", month=5, day=1),
+            Holiday("Den vítězství", month=5, day=8),
+            Holiday("Cyril a Metoděj", month=7, day=5),
+            Holiday("Jan Hus", month=7, day=6),
+            Holiday("Den české státnosti", month=9, day=28),
+            Holiday("Vznik Československa", month=10, day=28),
+            Holiday("Den boje za svobodu", month=11, day=17),
+            Holiday("Štědrý den", month=12, day=24),
+            Holiday("1. svátek vánoční", month=12, day=25),
+            Holiday("2. svátek vánoční", month=12, day=26)
+        ],
+        # Xetra (Frankfurt)
+        "XETR": [
+            Holiday("Neujahr", month=1, day=1),
+            GoodFriday,
+            EasterMonday,
+            Holiday("Tag der Arbeit", month=5, day=1),
+            Holiday("Heiligabend", month=12, day=24),
+            Holiday("1. Weihnachtstag", month=12, day=25),
+            Holiday("2. Weihnachtstag", month=12, day=26),
+            Holiday("Silvester", month=12, day=31)
+        ]
+    }
+
+    @classmethod
+    def holidays(cls, start_date: date, end_date: date, exchange: str = None) -> pd.DatetimeIndex:
+        """Svátky burzy v období (jen dny, na které připadá zavřeno)"""
+        exchange = exchange or settings.TRADING_CALENDAR
+        if exchange not in cls.RULES:
+            raise ValueError(f"Unknown exchange calendar: {exchange}")
+        calendar = AbstractHolidayCalendar(name=exchange, rules=cls.RULES[exchange])
+        return calendar.holidays(pd.Timestamp(start_date), pd.Timestamp(end_date))
+
+    @classmethod
+    def trading_days(cls, start_date: date, end_date: date, exchange: str = None) -> pd.DatetimeIndex:
+        """Obchodní dny v období (včetně obou krajních dnů)"""
+        return _trading_days(exchange or settings.TRADING_CALENDAR, start_date, end_date)
+
+    @classmethod
+    def is_trading_day(cls, day: date, exchange: str = None) -> bool:
+        return len(cls.trading_days(day, day, exchange)) > 0
+
+
+@lru_cache(maxsize=256)
+def _trading_days(exchange: str, start_date: date, end_date: date) -> pd.DatetimeIndex:
+    holidays = TradingCalendar.holidays(start_date, end_date, exchange)
+    return pd.bdate_range(
+        pd.Timestamp(start_date),
+        pd.Timestamp(end_date),
+        freq="C",
+        holidays=holidays
+    )
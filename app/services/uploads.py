@@ -0,0 +1,66 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import hashlib
+import os
+import tempfile
+from fastapi import UploadFile
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+
+class StoredUpload(BaseModel):
+    """Nahraný soubor uložený v dočasném souboru"""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+
+class UploadIngest:
+    """
+    Příjem nahraných souborů. Upload se čte po částech a průběžně se
+    hashuje do unikátního dočasného souboru; zápis na disk i zpracování
+    parserem běží mimo event loop.
+    """
+
+    @staticmethod
+    async def save(file: UploadFile, suffix: str = ".csv") -> StoredUpload:
+        """Uloží upload do nového dočasného souboru, vrací jeho cestu a hash"""
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix="upload-", dir=settings.UPLOAD_DIR)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as target:
+                while True:
+                    chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > settings.UPLOAD_MAX_BYTES:
+                        raise ValueError("Uploaded file is too large")
+                    hasher.update(chunk)
+                    await run_in_threadpool(target.write, chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        return StoredUpload(
+            path=path,
+            filename=file.filename or "",
+            size=size,
+            sha256=hasher.hexdigest()
+        )
+
+    @staticmethod
+    @asynccontextmanager
+    async def stored(file: UploadFile, suffix: str = ".csv") -> AsyncIterator[StoredUpload]:
+        """Dočasně uložený upload, soubor se po opuštění bloku smaže"""
+        upload = await UploadIngest.save(file, suffix)
+        try:
+            yield upload
+        finally:
+            if os.path.exists(upload.path):
+                os.unlink(upload.path)
+
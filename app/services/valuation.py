@@ -0,0 +1,197 @@
+from typing import List, Dict
+from datetime import date
+import pandas as pd
+import numpy as np
+
+from app.services.ledger import SPLIT_TYPE, TRADE_SIGNS
+from app.services.trading_calendar import TradingCalendar
+
+
+class ValuationEngine:
+    """
+    Vektorizované ocenění portfolia pomocí matic datum × aktivum
+    """
+
+    @staticmethod
+    def _to_day(values: pd.Series) -> pd.Series:
+        """Převede časové značky na půlnoc daného dne (bez časové zóny)"""
+        values = pd.to_datetime(values)
+        if values.dt.tz is not None:
+            # Den se určuje v časové zóně záznamu, stejně jako .dt.date
+            values = values.dt.tz_localize(None)
+        return values.dt.normalize()
+
+    @staticmethod
+    def date_index(start_date: date, end_date: date) -> pd.DatetimeIndex:
+        """Denní index pro zadané období (včetně obou krajních dnů)"""
+        return pd.date_range(pd.Timestamp(start_date), pd.Timestamp(end_date), freq="D")
+
+    @staticmethod
+    def trading_index(start_date: date, end_date: date) -> pd.DatetimeIndex:
+        """Index obchodních dní burzy pro zadané období"""
+        return TradingCalendar.trading_days(start_date, end_date)
+
+    @classmethod
+    def build_quantity_matrix(
+        cls,
+        df_trans: pd.DataFrame,
+        dates: pd.DatetimeIndex
+    ) -> pd.DataFrame:
+        """
+        Matice drženého množství (datum × aktivum) z kumulativních součtů transakcí.
+        Se sloupcem type se znaménko bere z typu (BUY +, SELL -, ostatní 0)
+        a SPLIT násobí držené množství poměrem v quantity (se sloupcem
+        account_id jen na účtu, z jehož výpisu split pochází).
+        """
+        if df_trans.empty:
+            return pd.DataFrame(index=dates, dtype="float64")
+
+        frame = pd.DataFrame({
+            "day": cls._to_day(df_trans["trade_time"]).values,
+            "time": pd.to_datetime(df_trans["trade_time"]).values,
+            "asset_id": df_trans["asset_id"].values,
+            "quantity": pd.to_numeric(df_trans["quantity"], errors="coerce").astype("float64").values
+        })
+        if "type" not in df_trans.columns:
+            daily = frame.groupby(["day", "asset_id"])["quantity"].sum().unstack(fill_value=0.0)
+            # Stav ke každému dni = poslední kumulativní stav k tomuto dni
+            return daily.sort_index().cumsum().reindex(dates, method="ffill").fillna(0.0)
+
+        frame["type"] = df_trans["type"].values
+        # Split z výpisu účtu násobí jen pozici na tomto účtu
+        frame["account_id"] = df_trans["account_id"].values if "account_id" in df_trans.columns else ""
+        frame = frame.sort_values("time", kind="stable")
+        split = (frame["type"] == SPLIT_TYPE) & (frame["quantity"] > 0)
+        position = ["account_id", "asset_id"]
+
+        # Množství se vede v jednotkách před všemi splity (dělené kumulativním
+        # poměrem k času obchodu) a ke dni se násobí poměrem platným v tom dni
+        factor = frame["quantity"].where(split, 1.0).groupby([frame[c] for c in position]).cumprod()
+        sign = frame["type"].map(TRADE_SIGNS).fillna(0.0)
+        frame["units"] = (frame["quantity"].abs() * sign / factor).fillna(0.0)
+        frame["factor"] = factor
+
+        grouped = frame.groupby(["day", *position])
+        units = grouped["units"].sum().unstack(position, fill_value=0.0).sort_index().cumsum()
+        factors = grouped["factor"].last().unstack(position).sort_index().ffill()\
+            .reindex(columns=units.columns)
+
+        units = units.reindex(dates, method="ffill").fillna(0.0)
+        factors = factors.reindex(dates, method="ffill").fillna(1.0)
+        # Součet pozic aktiva přes účty
+        return (units * factors).T.groupby(level="asset_id").sum().T
+
+    @classmethod
+    def build_price_matrix(
+        cls,
+        df_prices: pd.DataFrame,
+        dates: pd.DatetimeIndex,
+        asset_ids: pd.Index
+    ) -> pd.DataFrame:
+        """
+        Matice posledních známých cen (datum × aktivum) s dopředným doplněním
+        """
+        if df_prices.empty:
+            return pd.DataFrame(np.nan, index=dates, columns=asset_ids)
+
+        closes = pd.DataFrame({
+            "day": cls._to_day(df_prices["date"]),
+            "asset_id": df_prices["asset_id"].values,
+            "close": pd.to_numeric(df_prices["close"], errors="coerce").astype("float64").values
+        })
+        # Pro každý den a aktivum platí poslední záznam
+        closes = closes.sort_values("day", kind="stable")\
+            .drop_duplicates(["day", "asset_id"], keep="last")\
+            .pivot(index="day", columns="asset_id", values="close")\
+            .sort_index()
+
+        # Doplnění dopředu ještě před reindexací, aby se mezery jednoho aktiva
+        # nepřekrývaly s obchodními dny ostatních aktiv
+        return closes.reindex(columns=asset_ids).ffill().reindex(dates, method="ffill")
+
+    @staticmethod
+    def price_matrix_from_arrays(
+        positions: np.ndarray,
+        days: np.ndarray,
+        closes: np.ndarray,
+        dates: pd.DatetimeIndex,
+        asset_ids: pd.Index
+    ) -> pd.DataFrame:
+        """
+        Matice posledních známých cen (datum × aktivum) z polí seřazených
+        podle času - pozice aktiva ve sloupcích, den a close. Cena ze dne
+        mimo index (víkend, svátek, den před obdobím) platí od nejbližšího
+        dalšího dne indexu.
+        """
+        matrix = np.full((len(dates), len(asset_ids)), np.nan)
+        inside = np.searchsorted(dates.to_numpy(), days) < len(dates)
+        positions, days, closes = positions[inside], days[inside], closes[inside]
+        if len(closes):
+            rows = np.searchsorted(dates.to_numpy(), days)
+
+            # Pro každý den a aktivum platí poslední záznam
+            keys = rows * len(asset_ids) + positions
+            _, last = np.unique(keys[::-1], return_index=True)
+            last = len(keys) - 1 - last
+            matrix[rows[last], positions[last]] = closes[last]
+
+            # Dopředné doplnění - každý řádek převezme poslední známou cenu
+            known = np.where(~np.isnan(matrix), np.arange(len(dates))[:, None], 0)
+            np.maximum.accumulate(known, axis=0, out=known)
+            matrix = matrix[known, np.arange(len(asset_ids))]
+
+        return pd.DataFrame(matrix, index=dates, columns=asset_ids)
+
+    @classmethod
+    def calculate_daily_values(
+        cls,
+        transactions: List[Dict],
+        prices: List[Dict],
+        start_date: date,
+        end_date: date
+    ) -> pd.Series:
+        """
+        Hodnota portfolia v obchodních dnech jako součin matice množství a matice cen
+        """
+        dates = cls.trading_index(start_date, end_date)
+        df_trans = pd.DataFrame(transactions)
+        df_prices = pd.DataFrame(prices)
+
+        quantities = cls.build_quantity_matrix(df_trans, dates)
+        price_matrix = cls.build_price_matrix(df_prices, dates, quantities.columns)
+
+        return cls.calculate_values(quantities, price_matrix)
+
+    @staticmethod
+    def calculate_values(
+        quantities: pd.DataFrame,
+        price_matrix: pd.DataFrame,
+        fx_matrix: pd.DataFrame = None,
+        asset_currencies: Dict = None
+    ) -> pd.Series:
+        """
+        Součin matice množství a matice cen (stejný index i sloupce).
+        S maticí kurzů (datum × měna) a měnami aktiv se hodnoty převedou
+        do základní měny v tomtéž násobení.
+        """
+        qty = quantities.to_numpy(dtype="float64")
+        px = price_matrix.reindex(
+            index=quantities.index,
+            columns=quantities.columns
+        ).to_numpy(dtype="float64")
+
+        if fx_matrix is not None:
+            # Sloupec kurzu pro každé aktivum podle jeho měny
+            columns = fx_matrix.columns.get_indexer(
+                [asset_currencies.get(asset_id) for asset_id in quantities.columns]
+            )
+            fx = fx_matrix.reindex(index=quantities.index).to_numpy(dtype="float64")
+            # Měna bez kurzu (index -1) ukazuje na přidaný sloupec NaN
+            fx = np.column_stack([fx, np.full(len(fx), np.nan)])[:, columns]
+            px = px * fx
+
+        # Oceňují se jen kladné pozice; aktivum bez známé ceny (kurzu) nepřispívá
+        held = (qty > 0) & ~np.isnan(px)
+        values = np.where(held, qty * np.nan_to_num(px), 0.0).sum(axis=1)
+
+        return pd.Series(values, index=quantities.index, name="value")
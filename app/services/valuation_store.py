@@ -0,0 +1,297 @@
+from typing import Dict, Iterable, List, Tuple
+from datetime import date, datetime, time, timedelta
+import uuid
+import pandas as pd
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import (
+    Account, Asset, Portfolio, Transaction, PortfolioValue, PortfolioValuationState
+)
+from app.services.cache import analytics_cache, decode_series, encode_series
+from app.services.fx import FxRates
+from app.services.ledger import EPSILON, split_adjusted_quantities
+from app.services.price_repository import PriceRepository
+from app.services.valuation import ValuationEngine
+
+
+class ValuationStore:
+    """
+    Materializovaná řada denních hodnot portfolia s watermarkem platnosti.
+
+    Hodnoty v tabulce portfolio_values jsou platné do dne valid_through
+    (nejvýše včerejšek). Nové transakce a ceny posunou watermark zpět na den
+    před nejstarším dotčeným dnem a další čtení dopočítá jen dny od tohoto
+    dne dál.
+    """
+
+    @staticmethod
+    def _day_start(day: date) -> datetime:
+        return datetime.combine(day, time.min)
+
+    @classmethod
+    def _price_matrix(
+        cls,
+        db: Session,
+        asset_ids: List[uuid.UUID],
+        dates: pd.DatetimeIndex
+    ) -> pd.DataFrame:
+        """
+        Matice cen s dopředným doplněním - řady jednotlivých aktiv se berou
+        z analytické cache, z DB se načtou jen chybějící aktiva
+        """
+        first_day, through = dates[0].date(), dates[-1].date()
+        # Počet dní odliší obchodní a kalendářní index stejného období
+        keys = analytics_cache.asset_keys(asset_ids, f"ffill:{first_day}:{through}:{len(dates)}")
+        series = analytics_cache.get_many(list(keys.values()), decode=decode_series)
+
+        missing = [a for a in asset_ids if keys[a] not in series]
+        if missing:
+            # Ceny za období a jedna předchozí cena na aktivum, ne celá historie
+            positions, days, closes = PriceRepository.get_closes(db, missing, first_day, through)
+            matrix = ValuationEngine.price_matrix_from_arrays(
+                positions,
+                days,
+                closes,
+                dates,
+                pd.Index(missing, dtype=object)
+            )
+            fresh = {keys[a]: matrix[a] for a in missing}
+            analytics_cache.set_many(fresh, encode=encode_series)
+            series.update(fresh)
+
+        return pd.DataFrame(
+            {a: series[keys[a]].to_numpy() for a in asset_ids},
+            index=dates,
+            columns=pd.Index(asset_ids, dtype=object)
+        )
+
+    @staticmethod
+    def _currencies(
+        db: Session,
+        portfolio_id: uuid.UUID,
+        asset_ids: List[uuid.UUID]
+    ) -> Tuple[str, Dict[uuid.UUID, str]]:
+        """Základní měna portfolia a měny aktiv"""
+        base = db.query(Portfolio.base_currency).filter(Portfolio.id == portfolio_id).scalar()
+        rows = db.query(Asset.id, Asset.currency).filter(Asset.id.in_(asset_ids)).all() if asset_ids else []
+        return base, {r.id: r.currency for r in rows}
+
+    @classmethod
+    def _values(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        quantities: pd.DataFrame
+    ) -> pd.Series:
+        """Hodnoty pozic v základní měně portfolia (součet přes aktiva)"""
+        asset_ids = list(quantities.columns)
+        base, currencies = cls._currencies(db, portfolio_id, asset_ids)
+        return ValuationEngine.calculate_values(
+            quantities,
+            cls._price_matrix(db, asset_ids, quantities.index),
+            FxRates.matrix(db, set(currencies.values()), base, quantities.index),
+            currencies
+        )
+
+    @classmethod
+    def refresh(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        through: date
+    ) -> None:
+        """
+        Dopočítá chybějící hodnoty portfolia v obchodních dnech až do daného dne
+        """
+        state = db.get(PortfolioValuationState, portfolio_id)
+        valid_through = state.valid_through if state else None
+        if valid_through is not None and valid_through >= through:
+            return
+
+        # Kumulativní stav vyžaduje všechny transakce až do konce období
+        next_day = cls._day_start(through + timedelta(days=1))
+        transactions = db.query(
+            Transaction.account_id,
+            Transaction.trade_time,
+            Transaction.asset_id,
+            Transaction.type,
+            Transaction.quantity
+        ).join(Account)\
+            .filter(
+                Account.portfolio_id == portfolio_id,
+                Transaction.trade_time < next_day
+            ).all()
+
+        if valid_through is not None:
+            first_day = valid_through + timedelta(days=1)
+        elif transactions:
+            first_day = min(t.trade_time for t in transactions).date()
+        else:
+            first_day = next_day.date()
+
+        # Materializují se jen obchodní dny (prázdný index, pokud first_day > through)
+        dates = ValuationEngine.trading_index(first_day, through)
+        if len(dates):
+            quantities = ValuationEngine.build_quantity_matrix(
+                pd.DataFrame([t._asdict() for t in transactions]),
+                dates
+            )
+            values = cls._values(db, portfolio_id, quantities)
+            rows = [
+                {'portfolio_id': portfolio_id, 'date': day, 'value': value}
+                for day, value in zip(values.index.date, values.tolist())
+            ]
+            upsert = insert(PortfolioValue)
+            db.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=['portfolio_id', 'date'],
+                    set_={'value': upsert.excluded.value}
+                ),
+                rows
+            )
+
+        # Dnešní a budoucí dny jsou jen předběžné (close ještě nemusí být
+        # načtený), watermark končí nejpozději včerejškem a další čtení je
+        # dopočítá znovu. Posune se jen, pokud ho mezitím nikdo nezneplatnil.
+        watermark = insert(PortfolioValuationState).values(
+            portfolio_id=portfolio_id,
+            valid_through=min(through, date.today() - timedelta(days=1)),
+            updated_at=datetime.utcnow()
+        )
+        db.execute(
+            watermark.on_conflict_do_update(
+                index_elements=['portfolio_id'],
+                set_={
+                    'valid_through': watermark.excluded.valid_through,
+                    'updated_at': watermark.excluded.updated_at
+                },
+                where=PortfolioValuationState.valid_through.is_not_distinct_from(valid_through)
+            )
+        )
+        db.commit()
+
+    @classmethod
+    def get_daily_values(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        start_date: date,
+        end_date: date
+    ) -> pd.Series:
+        """
+        Vrátí hodnoty portfolia v obchodních dnech období (po případném dopočtu)
+        """
+        cls.refresh(db, portfolio_id, end_date)
+
+        rows = db.query(PortfolioValue.date, PortfolioValue.value)\
+            .filter(
+                PortfolioValue.portfolio_id == portfolio_id,
+                PortfolioValue.date.between(start_date, end_date)
+            ).order_by(PortfolioValue.date)\
+            .all()
+
+        values = pd.Series(
+            [float(r.value) for r in rows],
+            index=pd.DatetimeIndex([pd.Timestamp(r.date) for r in rows]),
+            dtype="float64"
+        )
+        # Dny před první transakcí nejsou materializované - hodnota je nulová
+        dates = ValuationEngine.trading_index(start_date, end_date)
+        return values.reindex(dates, fill_value=0.0).rename("value")
+
+    @classmethod
+    def get_account_values(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        day: date
+    ) -> Dict[uuid.UUID, float]:
+        """
+        Hodnota pozic jednotlivých účtů portfolia k danému dni (v základní měně)
+        """
+        trades = split_adjusted_quantities(portfolio_id, cls._day_start(day + timedelta(days=1)))
+        positions = db.execute(
+            select(
+                trades.c.account_id,
+                trades.c.asset_id,
+                func.sum(trades.c.quantity).label('quantity')
+            ).group_by(trades.c.account_id, trades.c.asset_id)
+        ).all()
+        if not positions:
+            return {}
+
+        df = pd.DataFrame([p._asdict() for p in positions])
+        quantity = pd.to_numeric(df['quantity']).astype('float64')
+        asset_ids = list(df['asset_id'].unique())
+        dates = ValuationEngine.date_index(day, day)
+        base, currencies = cls._currencies(db, portfolio_id, asset_ids)
+
+        # Cena aktiva v základní měně portfolia
+        fx = FxRates.matrix(db, set(currencies.values()), base, dates).iloc[0]
+        prices = cls._price_matrix(db, asset_ids, dates).iloc[0]\
+            * fx.reindex([currencies.get(a) for a in asset_ids]).to_numpy()
+        df['value'] = (quantity * df['asset_id'].map(prices)).where(quantity > EPSILON).fillna(0.0)
+        return df.groupby('account_id')['value'].sum().to_dict()
+
+    @classmethod
+    def missing_fx_rates(
+        cls,
+        db: Session,
+        portfolio_id: uuid.UUID,
+        start_date: date,
+        end_date: date
+    ) -> List[str]:
+        """
+        Měny aktiv portfolia, kterým v některém obchodním dni období chybí
+        kurz do základní měny - pozice v nich se v tyto dny neoceňují
+        """
+        asset_ids = [
+            r.asset_id for r in db.query(Transaction.asset_id)
+            .join(Account)
+            .filter(
+                Account.portfolio_id == portfolio_id,
+                Transaction.trade_time < cls._day_start(end_date + timedelta(days=1))
+            ).distinct()
+        ]
+        base, currencies = cls._currencies(db, portfolio_id, asset_ids)
+        return FxRates.missing(
+            db,
+            set(currencies.values()),
+            base,
+            ValuationEngine.trading_index(start_date, end_date)
+        )
+
+    @staticmethod
+    def invalidate(
+        db: Session,
+        portfolio_ids: Iterable[uuid.UUID],
+        from_date: date
+    ) -> None:
+        """
+        Zneplatní materializované hodnoty portfolií od daného dne dál.
+        Commit provádí volající spolu se změnou, která zneplatnění vyvolala.
+        """
+        portfolio_ids = list(set(portfolio_ids))
+        if not portfolio_ids:
+            return
+
+        db.execute(
+            update(PortfolioValuationState)
+            .where(
+                PortfolioValuationState.portfolio_id.in_(portfolio_ids),
+                PortfolioValuationState.valid_through >= from_date
+            )
+            .values(
+                valid_through=from_date - timedelta(days=1),
+                updated_at=datetime.utcnow()
+            )
+        )
+        db.execute(
+            delete(PortfolioValue)
+            .where(
+                PortfolioValue.portfolio_id.in_(portfolio_ids),
+                PortfolioValue.date >= from_date
+            )
+        )
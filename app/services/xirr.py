@@ -0,0 +1,211 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+DAYS_PER_YEAR = 365.0
+
+
+class XIRRSolver:
+    """
+    Řešič XIRR - Newtonova metoda s analytickou derivací NPV,
+    při selhání Brentova metoda na nalezeném intervalu
+    """
+
+    MIN_RATE = -0.999999
+    MAX_RATE = 1e6
+
+    @staticmethod
+    def year_fractions(dates: Sequence) -> np.ndarray:
+        """Počet let od prvního cashflow pro každé datum"""
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[ns]")
+        days = (dates - dates.min()) / np.timedelta64(1, "D")
+        return days.astype("float64") / DAYS_PER_YEAR
+
+    @staticmethod
+    def npv(rate: float, amounts: np.ndarray, years: np.ndarray) -> float:
+        return float(np.sum(amounts * (1.0 + rate) ** -years))
+
+    @staticmethod
+    def _has_sign_change(amounts: np.ndarray) -> bool:
+        return bool((amounts > 0).any() and (amounts < 0).any())
+
+    @classmethod
+    def solve(
+        cls,
+        amounts: np.ndarray,
+        years: np.ndarray,
+        guess: float = 0.1,
+        tol: float = 1e-10,
+        max_iter: int = 50
+    ) -> Optional[float]:
+        """
+        Najde sazbu, pro kterou je NPV cashflow nulová. Vrací None, pokud
+        cashflow nemají obě znaménka nebo kořen neexistuje.
+        """
+        amounts = np.asarray(amounts, dtype="float64")
+        years = np.asarray(years, dtype="float64")
+        if not cls._has_sign_change(amounts):
+            return None
+
+        rate = cls._newton(amounts, years, guess, tol, max_iter)
+        if rate is not None:
+            return rate
+        return cls._brent(amounts, years, tol, max_iter * 4)
+
+    @classmethod
+    def _newton(cls, amounts, years, guess, tol, max_iter) -> Optional[float]:
+        rate = guess
+        with np.errstate(all="ignore"):
+            for _ in range(max_iter):
+                base = 1.0 + rate
+                discount = base ** -years
+                value = np.dot(amounts, discount)
+                derivative = np.dot(-years * amounts, discount) / base
+                if derivative == 0 or not np.isfinite(derivative):
+                    return None
+                step = value / derivative
+                rate -= step
+                if not np.isfinite(rate) or rate <= cls.MIN_RATE:
+                    return None
+                if abs(step) < tol:
+                    return float(rate)
+        return None
+
+    @classmethod
+    def _bracket(cls, amounts, years) -> Optional[Tuple[float, float]]:
+        """Najde interval se změnou znaménka NPV"""
+        grid = np.concatenate([
+            [cls.MIN_RATE, -0.99, -0.9, -0.5, 0.0],
+            np.geomspace(0.01, cls.MAX_RATE, 30)
+        ])
+        with np.errstate(all="ignore"):
+            values = np.array([cls.npv(r, amounts, years) for r in grid])
+        signs = np.sign(values)
+        changes = np.nonzero(signs[:-1] * signs[1:] <= 0)[0]
+        if len(changes) == 0:
+            return None
+        i = changes[0]
+        return float(grid[i]), float(grid[i + 1])
+
+    @classmethod
+    def _brent(cls, amounts, years, tol, max_iter) -> Optional[float]:
+        bracket = cls._bracket(amounts, years)
+        if bracket is None:
+            return None
+
+        a, b = bracket
+        fa, fb = cls.npv(a, amounts, years), cls.npv(b, amounts, years)
+        if fa == 0:
+            return a
+        if fb == 0:
+            return b
+
+        c, fc = a, fa
+        d = e = b - a
+        for _ in range(max_iter):
+            if fb * fc > 0:
+                c, fc = a, fa
+                d = e = b - a
+            if abs(fc) < abs(fb):
+                a, b, c = b, c, b
+                fa, fb, fc = fb, fc, fb
+
+            tol1 = 2 * np.finfo(float).eps * abs(b) + 0.5 * tol
+            m = 0.5 * (c - b)
+            if abs(m) <= tol1 or fb == 0:
+                return float(b)
+
+            if abs(e) >= tol1 and abs(fa) > abs(fb):
+                # Inverzní kvadratická interpolace / metoda sečen
+                s = fb / fa
+                if a == c:
+                    p, q = 2 * m * s, 1 - s
+                else:
+                    q, r = fa / fc, fb / fc
+                    p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                    q = (q - 1) * (r - 1) * (s - 1)
+                if p > 0:
+                    q = -q
+                p = abs(p)
+                if 2 * p < min(3 * m * q - abs(tol1 * q), abs(e * q)):
+                    e, d = d, p / q
+                else:
+                    d = e = m
+            else:
+                d = e = m
+
+            a, fa = b, fb
+            b += d if abs(d) > tol1 else (tol1 if m > 0 else -tol1)
+            fb = cls.npv(b, amounts, years)
+        return None
+
+    @staticmethod
+    def pack(
+        cashflows: List[Tuple[Sequence, Sequence]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Připraví předalokované matice (skupiny × cashflow) částek a let
+        pro dávkový výpočet, kratší skupiny jsou doplněné nulami
+        """
+        width = max((len(a) for _, a in cashflows), default=0)
+        amounts = np.zeros((len(cashflows), width), dtype="float64")
+        years = np.zeros((len(cashflows), width), dtype="float64")
+        for i, (dates, values) in enumerate(cashflows):
+            if len(values) == 0:
+                continue
+            amounts[i, :len(values)] = np.asarray(values, dtype="float64")
+            years[i, :len(values)] = XIRRSolver.year_fractions(dates)
+        return amounts, years
+
+    @classmethod
+    def solve_batch(
+        cls,
+        amounts: np.ndarray,
+        years: np.ndarray,
+        guess: float = 0.1,
+        tol: float = 1e-10,
+        max_iter: int = 50
+    ) -> np.ndarray:
+        """
+        XIRR pro více skupin cashflow najednou (řádky matic). Newtonova
+        iterace běží vektorově pro všechny řádky, řádky bez konvergence
+        se dořeší jednotlivě. Nevyřešené řádky mají hodnotu NaN.
+        """
+        amounts = np.asarray(amounts, dtype="float64")
+        years = np.asarray(years, dtype="float64")
+        k = amounts.shape[0]
+        result = np.full(k, np.nan)
+        if k == 0:
+            return result
+
+        valid = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+        rates = np.full(k, guess)
+        active = valid.copy()
+        converged = np.zeros(k, dtype=bool)
+
+        with np.errstate(all="ignore"):
+            for _ in range(max_iter):
+                if not active.any():
+                    break
+                idx = np.nonzero(active)[0]
+                base = 1.0 + rates[idx, None]
+                discount = base ** -years[idx]
+                value = (amounts[idx] * discount).sum(axis=1)
+                derivative = (-years[idx] * amounts[idx] * discount).sum(axis=1) / base[:, 0]
+                step = value / derivative
+                new_rates = rates[idx] - step
+
+                failed = ~np.isfinite(new_rates) | (new_rates <= cls.MIN_RATE)
+                done = ~failed & (np.abs(step) < tol)
+                rates[idx] = np.where(failed, rates[idx], new_rates)
+                converged[idx[done]] = True
+                active[idx[failed | done]] = False
+
+        result[converged] = rates[converged]
+
+        # Záložní výpočet pro řádky, kde Newton nekonvergoval
+        for i in np.nonzero(valid & ~converged)[0]:
+            rate = cls._brent(amounts[i], years[i], tol, max_iter * 4)
+            if rate is not None:
+                result[i] = rate
+        return result
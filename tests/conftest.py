@@ -0,0 +1,33 @@
+import os
+
+# Nastavení aplikace pro testy - musí předcházet importu app.core.config.
+# Testy nad PostgreSQL běží jen se zadaným TEST_DATABASE_URL.
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ENCRYPTION_KEY", "test-key")
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+# Registrace všech modelů - vztahy se dohledávají podle názvu tříd
+import app.models.models  # noqa: E402,F401
+import app.models.user  # noqa: E402,F401
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """Engine aplikace nad TEST_DATABASE_URL zmigrovanou na head"""
+    if not os.environ.get("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from alembic import command
+    from alembic.config import Config
+    from app.db.base import engine
+
+    config = Config()
+    config.set_main_option(
+        "script_location",
+        os.path.join(os.path.dirname(__file__), "..", "app", "db", "migrations")
+    )
+    command.upgrade(config, "head")
+    return engine
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.benchmark import BenchmarkComparison
+from app.services.trading_calendar import TradingCalendar
+
+
+def closes(*series):
+    """Pole (pozice, den, close) seřazená podle dne jako z PriceRepository.get_closes"""
+    frame = pd.concat([
+        pd.DataFrame({'position': k, 'day': pd.DatetimeIndex(days).to_numpy(dtype="datetime64[D]"), 'close': values})
+        for k, (days, values) in enumerate(series)
+    ]).sort_values(['day', 'position'], kind="stable")
+    return frame['position'].to_numpy(), frame['day'].to_numpy(), frame['close'].to_numpy(dtype="float64")
+
+
+def test_align_across_calendars():
+    # Portfolio oceněné v obchodních dnech NYSE
+    days = TradingCalendar.trading_days(pd.Timestamp("2025-10-24"), pd.Timestamp("2025-11-28"), "XNYS")
+    values = pd.Series(np.arange(1.0, len(days) + 1), index=days)
+    values[pd.Timestamp("2025-10-29")] = 0.0
+
+    # US benchmark v dny NYSE, pražský v dny XPRA (bez 28. 10. a 17. 11., s 27. 11.)
+    prague = TradingCalendar.trading_days(pd.Timestamp("2025-10-23"), pd.Timestamp("2025-11-28"), "XPRA")
+    assert pd.Timestamp("2025-11-27") in prague and pd.Timestamp("2025-11-27") not in days
+    portfolio, prices = BenchmarkComparison.align(
+        values,
+        *closes((days, np.arange(len(days)) + 100.0), (prague, np.arange(len(prague)) + 1000.0)),
+        2
+    )
+
+    shared = days[days.isin(prague) & (values.to_numpy() > 0)]
+    assert pd.Timestamp("2025-10-28") not in shared and pd.Timestamp("2025-11-17") not in shared
+    assert portfolio.tolist() == values[shared].tolist()
+    assert prices[:, 0].tolist() == [100.0 + days.get_loc(d) for d in shared]
+    assert prices[:, 1].tolist() == [1000.0 + prague.get_loc(d) for d in shared]
+
+
+def test_align_without_shared_days():
+    days = pd.DatetimeIndex(["2025-01-02", "2025-01-03"])
+    portfolio, prices = BenchmarkComparison.align(
+        pd.Series([1.0, 2.0], index=days),
+        *closes((pd.DatetimeIndex(["2024-12-31"]), [5.0])),
+        1
+    )
+    assert len(portfolio) == 0 and prices.shape == (0, 1)
+    assert BenchmarkComparison.compare(portfolio, prices) == [BenchmarkComparison.empty_metrics()]
+
+
+def test_compare_with_itself():
+    rng = np.random.default_rng(7)
+    values = 100.0 * np.cumprod(1.0 + rng.normal(0.0005, 0.01, 250))
+
+    metrics, = BenchmarkComparison.compare(values, values[:, None])
+    assert metrics['beta'] == pytest.approx(1.0)
+    assert metrics['alpha'] == pytest.approx(0.0, abs=1e-12)
+    assert metrics['tracking_error'] == pytest.approx(0.0, abs=1e-12)
+    assert metrics['up_capture'] == pytest.approx(1.0)
+    assert metrics['down_capture'] == pytest.approx(1.0)
+
+
+def test_compare_leveraged_benchmark():
+    # Benchmark s dvojnásobnými denními výnosy - beta 0,5
+    returns = np.array([0.01, -0.02, 0.015, 0.005, -0.01, 0.02])
+    portfolio = 100.0 * np.cumprod(np.r_[1.0, 1.0 + returns])
+    benchmark = 100.0 * np.cumprod(np.r_[1.0, 1.0 + 2 * returns])
+
+    metrics, = BenchmarkComparison.compare(portfolio, benchmark[:, None])
+    assert metrics['beta'] == pytest.approx(0.5)
+    assert metrics['up_capture'] == pytest.approx(0.5)
+    assert metrics['down_capture'] == pytest.approx(0.5)
+    assert metrics['tracking_error'] > 0
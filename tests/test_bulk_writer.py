@@ -0,0 +1,89 @@
+import uuid
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models.models import Account, Asset, Dividend, Portfolio, Transaction
+from app.models.user import User
+from app.services.bulk_writer import TransactionBulkWriter
+
+ACCOUNT = uuid.uuid4()
+
+
+@pytest.fixture
+def db():
+    """SQLite - zápis přes executemany"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Portfolio.__table__, Account.__table__,
+        Asset.__table__, Dividend.__table__, Transaction.__table__
+    ])
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def rows(*items):
+    return pd.DataFrame(
+        [
+            {'date': day, 'type': kind, 'symbol': symbol, 'currency': 'USD', 'quantity': 1, 'price': amount, 'gross_amount': amount}
+            for day, kind, symbol, amount in items
+        ]
+    )
+
+
+def dividends(db):
+    return db.query(Asset.symbol, Dividend.pay_date, Dividend.ex_date, Dividend.gross_amount, Dividend.withholding_tax, Dividend.net_amount)\
+        .join(Asset, Asset.id == Dividend.asset_id)\
+        .order_by(Dividend.pay_date)\
+        .all()
+
+
+def test_tax_matches_nearest_dividend(db):
+    writer = TransactionBulkWriter(db, ACCOUNT, 'USD')
+    written = writer.write_dividends(rows(
+        ('2025-01-10', 'DIVIDEND', 'AAA', 10.0),
+        ('2025-01-13', 'TAX', 'AAA', 1.5),
+        ('2025-04-10', 'DIVIDEND', 'AAA', 12.0),
+        ('2025-04-09', 'TAX', 'AAA', 1.8),
+        ('2025-04-10', 'DIVIDEND', 'BBB', 5.0)
+    ))
+
+    assert written == 3
+    result = [(r.symbol, r.pay_date.day, r.ex_date, float(r.gross_amount), float(r.withholding_tax), float(r.net_amount)) for r in dividends(db)]
+    assert result == [
+        ('AAA', 10, None, 10.0, 1.5, 8.5),
+        ('AAA', 10, None, 12.0, 1.8, 10.2),
+        ('BBB', 10, None, 5.0, 0.0, 5.0)
+    ]
+
+
+def test_tax_without_dividend_is_transaction(db):
+    writer = TransactionBulkWriter(db, ACCOUNT, 'USD')
+    written = writer.write_dividends(rows(
+        ('2025-01-10', 'DIVIDEND', 'AAA', 10.0),
+        ('2025-03-01', 'TAX', 'AAA', 2.0),
+        ('2025-01-10', 'TAX', 'BBB', 0.5)
+    ))
+
+    assert written == 3
+    assert [float(r.withholding_tax) for r in dividends(db)] == [0.0]
+    taxes = db.query(Transaction.type, Transaction.quantity, Transaction.gross_amount, Transaction.fx_rate_to_portfolio)\
+        .order_by(Transaction.gross_amount)\
+        .all()
+    assert [(t.type, float(t.quantity), float(t.gross_amount)) for t in taxes] == [('TAX', 0.0, 0.5), ('TAX', 0.0, 2.0)]
+    # Účet bez portfolia - kurz neznámý, ne 1
+    assert [t.fx_rate_to_portfolio for t in taxes] == [None, None]
+
+
+def test_skip_existing_dividends(db):
+    batch = rows(('2025-01-10', 'DIVIDEND', 'AAA', 10.0), ('2025-01-11', 'TAX', 'AAA', 1.5))
+    TransactionBulkWriter(db, ACCOUNT, 'USD').write_dividends(batch)
+
+    writer = TransactionBulkWriter(db, ACCOUNT, 'USD', skip_duplicates=True)
+    assert writer.write_dividends(batch) == 0
+    assert writer.skipped == 1
+    assert len(dividends(db)) == 1
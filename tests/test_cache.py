@@ -0,0 +1,127 @@
+import threading
+import time
+
+import fakeredis
+import pandas as pd
+import pytest
+
+from app.services.cache import AnalyticsCache, decode_series, encode_series
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_cache(server, **kwargs) -> AnalyticsCache:
+    """Samostatná instance (jako jiný proces) nad sdíleným Redisem"""
+    return AnalyticsCache(
+        redis_client=fakeredis.FakeRedis(server=server),
+        namespace="test",
+        max_entries=100,
+        ttl=60,
+        lock_timeout=kwargs.pop("lock_timeout", 5),
+        **kwargs
+    )
+
+
+def test_single_flight_in_process(server):
+    cache = make_cache(server)
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"value": 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+    leader.start()
+    started.wait(1)
+    followers = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+        for _ in range(8)
+    ]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 9
+    assert cache.stats()["coalesced"] == 8
+
+
+def test_single_flight_across_processes(server):
+    first, second = make_cache(server), make_cache(server)
+    # Výpočet drží zámek v "jiném procesu" a výsledek zapíše později
+    first.redis.set(first._key("lock:k"), "1", px=5000)
+
+    def finish():
+        time.sleep(0.2)
+        first.set("k", {"value": 7})
+        first.redis.delete(first._key("lock:k"))
+
+    writer = threading.Thread(target=finish)
+    writer.start()
+    value = second.get_or_compute("k", lambda: pytest.fail("computed twice"))
+    writer.join()
+
+    assert value == {"value": 7}
+    assert second.stats()["coalesced"] == 1
+
+
+def test_lock_released_after_compute(server):
+    cache = make_cache(server)
+    assert cache.get_or_compute("k", lambda: 1) == 1
+    assert not cache.redis.exists(cache._key("lock:k"))
+    assert cache.get_or_compute("k", lambda: pytest.fail("not cached")) == 1
+
+
+def test_bump_changes_keys_for_all_processes(server):
+    first, second = make_cache(server), make_cache(server)
+    old_key = first.portfolio_key("p1", "allocation")
+    first.set(old_key, {"value": 1})
+    assert second.get(old_key) == {"value": 1}
+
+    second.bump(["portfolio:p1"])
+
+    new_key = first.portfolio_key("p1", "allocation")
+    assert new_key != old_key
+    assert first.generation("portfolio:p1") == second.generation("portfolio:p1") == 1
+    assert first.get_or_compute(new_key, lambda: {"value": 2}) == {"value": 2}
+    # Jiné portfolio generaci nemění
+    assert first.generation("portfolio:p2") == 0
+
+
+def test_asset_keys_use_generations(server):
+    cache = make_cache(server)
+    cache.bump(["asset:a"])
+    keys = cache.asset_keys(["a", "b"], "ffill")
+    assert keys == {"a": "asset:a:1:ffill", "b": "asset:b:0:ffill"}
+
+
+def test_redis_hit_fills_local_cache(server):
+    first, second = make_cache(server), make_cache(server)
+    first.set("k", [1, 2])
+    assert second.get("k") == [1, 2]
+    assert second.get("k") == [1, 2]
+    stats = second.stats()
+    assert stats["redis_hits"] == 1 and stats["local_hits"] == 1
+
+
+def test_works_without_redis(server):
+    server.connected = False
+    cache = make_cache(server)
+    cache.bump(["portfolio:p1"])
+    assert cache.generation("portfolio:p1") == 1
+    assert cache.get_or_compute("k", lambda: 3) == 3
+    assert cache.get_or_compute("k", lambda: pytest.fail("not cached")) == 3
+
+
+def test_series_roundtrip():
+    series = pd.Series([1.5, None, 2.0], index=pd.date_range("2024-01-01", periods=3))
+    decoded = decode_series(encode_series(series))
+    pd.testing.assert_series_equal(decoded, series, check_freq=False)
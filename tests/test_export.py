@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+import io
+import uuid
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models.models import Account, Asset, Portfolio, Transaction
+from app.models.user import User
+from app.services import export
+from app.services.export import ColumnarExport
+
+
+@pytest.fixture
+def portfolio(monkeypatch):
+    """SQLite portfolio se třemi transakcemi"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Portfolio.__table__, Account.__table__,
+        Asset.__table__, Transaction.__table__
+    ])
+    # Export si otevírá vlastní session
+    monkeypatch.setattr(export, "SessionLocal", sessionmaker(bind=engine))
+
+    with Session(engine) as db:
+        user = User(email="export@example.com", hashed_password="x")
+        asset = Asset(symbol="AAA", name="A", type="stock", currency="USD")
+        db.add_all([user, asset])
+        db.flush()
+        portfolio = Portfolio(user_id=user.id, name="Export", base_currency="CZK")
+        db.add(portfolio)
+        db.flush()
+        account = Account(portfolio_id=portfolio.id, name="A", broker="FIO", type="broker", currency="USD")
+        db.add(account)
+        db.flush()
+        for day, kind, quantity, rate in [(2, "BUY", 10, 23.5), (3, "SELL", 4, None), (6, "BUY", 1, 23.7)]:
+            db.add(Transaction(
+                account_id=account.id,
+                asset_id=asset.id,
+                type=kind,
+                quantity=quantity,
+                price=100,
+                fee=1,
+                tax=0,
+                gross_amount=quantity * 100,
+                trade_currency="USD",
+                fx_rate_to_portfolio=rate,
+                trade_time=datetime(2025, 1, day, 15, 30, tzinfo=timezone.utc)
+            ))
+        db.commit()
+        yield portfolio.id
+    engine.dispose()
+
+
+def read(data: bytes, fmt: str) -> pa.Table:
+    if fmt == ColumnarExport.PARQUET:
+        return pq.read_table(io.BytesIO(data))
+    return pa.ipc.open_stream(data).read_all()
+
+
+@pytest.mark.parametrize("fmt", [ColumnarExport.ARROW, ColumnarExport.PARQUET])
+def test_transactions_round_trip(portfolio, fmt):
+    data = b"".join(ColumnarExport.stream(
+        ColumnarExport.transactions_query(portfolio),
+        ColumnarExport.TRANSACTION_SCHEMA,
+        fmt,
+        batch_size=2
+    ))
+    table = read(data, fmt)
+
+    assert table.schema.equals(ColumnarExport.TRANSACTION_SCHEMA)
+    assert table.column("type").to_pylist() == ["BUY", "SELL", "BUY"]
+    assert table.column("quantity").to_pylist() == [10.0, 4.0, 1.0]
+    assert table.column("gross_amount").to_pylist() == [1000.0, 400.0, 100.0]
+    assert table.column("fx_rate_to_portfolio").to_pylist() == [23.5, None, 23.7]
+    assert table.column("trade_time").to_pylist()[0] == datetime(2025, 1, 2, 15, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("fmt", [ColumnarExport.ARROW, ColumnarExport.PARQUET])
+def test_empty_result_is_valid_stream(portfolio, fmt):
+    data = b"".join(ColumnarExport.stream(
+        ColumnarExport.transactions_query(uuid.uuid4()),
+        ColumnarExport.TRANSACTION_SCHEMA,
+        fmt
+    ))
+    table = read(data, fmt)
+
+    assert table.schema.equals(ColumnarExport.TRANSACTION_SCHEMA)
+    assert table.num_rows == 0
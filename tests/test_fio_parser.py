@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.brokers.fio import FIOBrokerParser
+from app.services.brokers.registry import BrokerRegistry
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "broker-sample", "fio-all-sample.csv")
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return FIOBrokerParser.parse_frame(SAMPLE)
+
+
+def row(frame, **fields):
+    mask = pd.Series(True, index=frame.index)
+    for field, value in fields.items():
+        mask &= frame[field] == value
+    assert mask.sum() == 1
+    return frame[mask].iloc[0]
+
+
+def test_sniff_sample():
+    assert BrokerRegistry.get("fio").sniff(SAMPLE)
+
+
+def test_counts_per_type(frame):
+    assert frame["type"].value_counts().to_dict() == {
+        "DIVIDEND": 17,
+        "TAX": 14,
+        "BUY": 13,
+        "FEE": 7,
+        "SELL": 4,
+        "FX": 3,
+        "DEPOSIT": 1
+    }
+
+
+def test_amounts_are_float(frame):
+    # Částky jsou float64, ne Decimal v object sloupci
+    for column in ["quantity", "price", "amount", "fee", "source_amount", "target_amount", "fx_rate"]:
+        assert frame[column].dtype == "float64"
+
+
+def test_buy(frame):
+    buy = row(frame, type="BUY", date=pd.Timestamp("2025-04-09 20:17"))
+    assert (buy["symbol"], buy["currency"]) == ("TTD", "USD")
+    assert (buy["quantity"], buy["price"], buy["amount"], buy["fee"]) == (27.0, 53.55, 1453.80, 7.95)
+
+
+def test_dividend_and_tax(frame):
+    dividend = row(frame, type="DIVIDEND", symbol="BAYN")
+    assert (dividend["currency"], dividend["quantity"], dividend["amount"], dividend["fee"]) == ("EUR", 1.0, 4.62, 0.0)
+    # Daň je kladná částka, znaménko určuje typ
+    tax = row(frame, type="TAX", symbol="BAYN")
+    assert (tax["currency"], tax["price"], tax["amount"]) == ("EUR", 1.22, 1.22)
+    assert tax["date"] == dividend["date"] == pd.Timestamp("2025-04-30")
+
+
+def test_fx_direction(frame):
+    # Symbol a Počet - prodávaná měna, Měna a objem - nakupovaná měna
+    fx = row(frame, type="FX", date=pd.Timestamp("2025-03-25 16:20"))
+    assert (fx["source_currency"], fx["target_currency"]) == ("CZK", "USD")
+    assert (fx["source_amount"], fx["target_amount"]) == (53000.0, 2235.12)
+    assert fx["fx_rate"] == pytest.approx(2235.12 / 53000.0)
+    assert pd.isna(fx["amount"])
+
+    fx = row(frame, type="FX", date=pd.Timestamp("2025-06-22 20:47"))
+    assert (fx["source_currency"], fx["target_currency"]) == ("USD", "EUR")
+    assert (fx["source_amount"], fx["target_amount"]) == (6000.0, 5063.08)
+
+
+def test_chunks_match_whole_file(frame):
+    chunks = pd.concat(FIOBrokerParser().iter_frames(SAMPLE, chunksize=7), ignore_index=True)
+    pd.testing.assert_frame_equal(chunks, frame.rename(columns={"amount": "gross_amount"}), check_dtype=False)
@@ -0,0 +1,59 @@
+import os
+import time
+import uuid
+
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services.import_stash import ImportStash
+
+CHECKSUM = "a" * 64
+
+
+@pytest.fixture(autouse=True)
+def stash_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_STASH_DIR", str(tmp_path))
+
+
+def stash(user_id, rows):
+    writer = ImportStash.writer()
+    writer.append(pd.DataFrame({"x": range(rows)}))
+    ImportStash.commit(writer, CHECKSUM, user_id, "fio")
+
+
+def expire(user_id):
+    old = time.time() - settings.IMPORT_STASH_TTL - 10
+    os.utime(ImportStash._path(CHECKSUM, user_id), (old, old))
+
+
+def test_same_file_per_user():
+    first, second = uuid.uuid4(), uuid.uuid4()
+    stash(first, 1)
+    stash(second, 2)
+
+    assert ImportStash.meta(CHECKSUM, first)["rows"] == 1
+    assert ImportStash.meta(CHECKSUM, second)["rows"] == 2
+    assert len(pd.concat(ImportStash.iter_frames(CHECKSUM, first))) == 1
+
+
+def test_prune_keeps_leased():
+    user = uuid.uuid4()
+    stash(user, 3)
+    lease = ImportStash.acquire(CHECKSUM, user)
+    expire(user)
+
+    ImportStash.prune()
+    # Nový náhled stejného souboru nepřepíše záznam používaný úlohou
+    stash(user, 5)
+    assert len(pd.concat(ImportStash.iter_frames(CHECKSUM, user))) == 3
+
+    ImportStash.release(lease)
+    expire(user)
+    ImportStash.prune()
+    assert ImportStash.acquire(CHECKSUM, user) is None
+
+
+def test_rejects_invalid_keys():
+    assert ImportStash._path("../etc", uuid.uuid4()) is None
+    assert ImportStash._path(CHECKSUM, "../etc") is None
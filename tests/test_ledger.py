@@ -0,0 +1,227 @@
+from datetime import date, datetime, timezone
+import uuid
+
+import pandas as pd
+import pytest
+
+from app.db.base import SessionLocal
+from app.models.models import Account, Asset, Portfolio, PositionSnapshot, Price, Transaction
+from app.models.user import User
+from app.services.ledger import LotBook, PositionLedger
+from app.services.ledger_store import LedgerStore
+from app.services.portfolio_data import PortfolioData
+from app.services.valuation_store import ValuationStore
+
+
+COLUMNS = ["account_id", "asset_id", "type", "quantity", "price", "fee"]
+
+
+def replay(method, *rows):
+    ledger = PositionLedger(method)
+    ledger.replay(pd.DataFrame([row if len(row) == 6 else ("X", *row) for row in rows], columns=COLUMNS))
+    return ledger
+
+
+def position(ledger, asset_id="A", account_id=None):
+    return next(
+        p for p in ledger.positions()
+        if p["asset_id"] == asset_id and account_id in (None, p["account_id"])
+    )
+
+
+TRADES = [("A", "BUY", 10, 10.0, 0.0), ("A", "BUY", 15, 12.0, 0.0), ("A", "SELL", 15, 15.0, 0.0)]
+
+
+def test_fifo_sells_oldest_lots():
+    result = position(replay(PositionLedger.FIFO, *TRADES))
+    # 15 × 15 - (10 × 10 + 5 × 12)
+    assert result["realized_pnl"] == pytest.approx(65.0)
+    assert result["quantity"] == pytest.approx(10.0)
+    assert result["cost_basis"] == pytest.approx(120.0)
+
+
+def test_average_sells_at_average_cost():
+    result = position(replay(PositionLedger.AVERAGE, *TRADES))
+    # Průměrná cena 280 / 25 = 11.2
+    assert result["realized_pnl"] == pytest.approx(57.0)
+    assert result["cost_basis"] == pytest.approx(112.0)
+    assert result["average_cost"] == pytest.approx(11.2)
+
+
+def test_split_keeps_cost_basis():
+    ledger = replay(
+        PositionLedger.FIFO,
+        ("A", "BUY", 10, 100.0, 0.0),
+        ("A", "SPLIT", 4, 0.0, 0.0),
+        ("A", "SELL", 20, 30.0, 0.0)
+    )
+    result = position(ledger)
+    assert result["quantity"] == pytest.approx(20.0)
+    assert result["cost_basis"] == pytest.approx(500.0)
+    assert result["realized_pnl"] == pytest.approx(100.0)
+
+
+def test_books_per_account():
+    ledger = replay(
+        PositionLedger.FIFO,
+        ("X", "A", "BUY", 10, 10.0, 0.0),
+        ("Y", "A", "BUY", 10, 20.0, 0.0),
+        ("X", "A", "SPLIT", 4, 0.0, 0.0),
+        ("Y", "A", "SPLIT", 4, 0.0, 0.0),
+        ("Y", "A", "SELL", 20, 6.0, 0.0)
+    )
+    assert ledger.asset_ids == ["A"]
+    x, y = position(ledger, account_id="X"), position(ledger, account_id="Y")
+    assert (x["quantity"], x["cost_basis"]) == pytest.approx((40.0, 100.0))
+    # Prodej spotřebuje loty svého účtu (náklad 5 na kus po splitu)
+    assert (y["quantity"], y["realized_pnl"]) == pytest.approx((20.0, 20.0))
+
+
+def test_fifo_across_grown_book():
+    book = LotBook()
+    for i in range(20):
+        book.buy(1, float(i))
+    book.sell(15, 20.0)
+    book.buy(1, 100.0)
+
+    assert book.realized == pytest.approx(15 * 20.0 - sum(range(15)))
+    assert book.open_quantity == pytest.approx(6.0)
+    assert book.cost_basis == pytest.approx(sum(range(15, 20)) + 100.0)
+
+
+def test_sell_without_lots_is_unmatched():
+    result = position(replay(PositionLedger.FIFO, ("A", "BUY", 5, 10.0, 0.0), ("A", "SELL", 8, 12.0, 0.0)))
+    assert result["quantity"] == pytest.approx(0.0)
+    assert result["unmatched_quantity"] == pytest.approx(3.0)
+    assert result["average_cost"] is None
+
+
+def test_state_round_trip_resumes_replay():
+    later = [("A", "BUY", 5, 20.0, 1.0), ("A", "SELL", 12, 18.0, 0.0), ("B", "BUY", 3, 7.0, 0.0)]
+    for method in PositionLedger.METHODS:
+        full = replay(method, *TRADES, *later)
+
+        resumed = PositionLedger.from_state(replay(method, *TRADES).state())
+        resumed.replay(pd.DataFrame([("X", *row) for row in later], columns=COLUMNS))
+
+        assert resumed.state() == full.state()
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        PositionLedger("lifo")
+
+
+@pytest.fixture
+def portfolio(pg_engine):
+    """Portfolio se dvěma účty a jedním aktivem - transakce přidává funkce trade"""
+    db = SessionLocal()
+    user = User(email=f"ledger-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    asset = Asset(symbol=f"LEDGER-{uuid.uuid4().hex[:8]}", name="Ledger", type="stock", currency="USD")
+    db.add_all([user, asset])
+    db.flush()
+    portfolio = Portfolio(user_id=user.id, name="Ledger", base_currency="USD")
+    db.add(portfolio)
+    db.flush()
+    accounts = [
+        Account(portfolio_id=portfolio.id, name=name, broker="FIO", type="broker", currency="USD")
+        for name in ("A", "B")
+    ]
+    db.add_all(accounts)
+    db.commit()
+
+    def trade(day, kind, quantity, price, account=0):
+        db.add(Transaction(
+            account_id=accounts[account].id,
+            asset_id=asset.id,
+            type=kind,
+            quantity=quantity,
+            price=price,
+            fee=0,
+            tax=0,
+            gross_amount=quantity * price,
+            trade_currency="USD",
+            fx_rate_to_portfolio=1,
+            trade_time=datetime(2025, 1, day, 12, tzinfo=timezone.utc)
+        ))
+        db.commit()
+
+    yield db, portfolio.id, str(asset.id), trade
+
+    db.rollback()
+    db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+    db.query(Asset).filter(Asset.id == asset.id).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def tamper(db, portfolio_id, realized):
+    """Změní uložený snapshot - pozná se tak, zda výpočet z něj vychází"""
+    snapshot = db.get(PositionSnapshot, (portfolio_id, PositionLedger.FIFO))
+    state = dict(snapshot.state)
+    state["books"] = {k: {**book, "realized": realized} for k, book in state["books"].items()}
+    snapshot.state = state
+    db.commit()
+
+
+def test_snapshot_resume(portfolio):
+    db, portfolio_id, asset_id, trade = portfolio
+    trade(2, "BUY", 10, 10)
+    trade(3, "BUY", 15, 12)
+    LedgerStore.get(db, portfolio_id)
+    tamper(db, portfolio_id, 1000.0)
+
+    # Přehraje se jen novější prodej nad uloženým stavem
+    trade(6, "SELL", 15, 15)
+    result = position(LedgerStore.get(db, portfolio_id), asset_id)
+    assert result["realized_pnl"] == pytest.approx(1065.0)
+
+    snapshot = db.get(PositionSnapshot, (portfolio_id, PositionLedger.FIFO))
+    db.refresh(snapshot)
+    assert snapshot.as_of.date() == date(2025, 1, 6)
+
+    # Den před snapshotem se počítá od začátku a snapshot se nepřepíše
+    earlier = position(LedgerStore.get(db, portfolio_id, as_of=date(2025, 1, 2)), asset_id)
+    assert earlier["quantity"] == pytest.approx(10.0)
+    assert earlier["realized_pnl"] == pytest.approx(0.0)
+    db.refresh(snapshot)
+    assert snapshot.as_of.date() == date(2025, 1, 6)
+
+
+def test_snapshot_invalidation(portfolio):
+    db, portfolio_id, asset_id, trade = portfolio
+    trade(2, "BUY", 10, 10)
+    trade(6, "SELL", 5, 12)
+    LedgerStore.get(db, portfolio_id)
+    tamper(db, portfolio_id, 1000.0)
+
+    # Zpětně doplněný split zneplatní snapshot od svého dne
+    trade(4, "SPLIT", 2, 0)
+    LedgerStore.invalidate(db, [portfolio_id], date(2025, 1, 4))
+    db.commit()
+
+    result = position(LedgerStore.get(db, portfolio_id), asset_id)
+    assert result["quantity"] == pytest.approx(15.0)
+    # 5 × 12 - 5 × 5 (náklad na kus po splitu)
+    assert result["realized_pnl"] == pytest.approx(35.0)
+
+
+def test_split_per_account_agrees_everywhere(portfolio):
+    db, portfolio_id, asset_id, trade = portfolio
+    for account in (0, 1):
+        trade(2, "BUY", 10, 10, account)
+        trade(3, "SPLIT", 4, 0, account)
+    db.add_all([
+        Price(asset_id=uuid.UUID(asset_id), date=datetime(2025, 1, day), close=2, currency="USD", source="ledger-test")
+        for day in (2, 3, 6)
+    ])
+    db.commit()
+
+    # Každý účet má vlastní řádek splitu - 2 × 10 × 4, ne 20 × 4 × 4
+    assert [h["quantity"] for h in PortfolioData.get_current_holdings(db, portfolio_id)] == [80.0]
+    accounts = ValuationStore.get_account_values(db, portfolio_id, date(2025, 1, 6))
+    assert sorted(accounts.values()) == [80.0, 80.0]
+    values = ValuationStore.get_daily_values(db, portfolio_id, date(2025, 1, 2), date(2025, 1, 6))
+    assert values.tolist() == [40.0, 160.0, 160.0]
+    positions = LedgerStore.get(db, portfolio_id).positions()
+    assert [p["quantity"] for p in positions] == [40.0, 40.0]
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+import uuid
+
+from fastapi import HTTPException, Response
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.api.endpoints.transactions import transactions_page
+from app.db.base import Base
+from app.models.models import Transaction
+from app.schemas.models import Transaction as TransactionSchema
+from app.services.pagination import KeysetPagination
+
+ACCOUNT = uuid.uuid4()
+
+
+@pytest.fixture
+def db():
+    """SQLite s transakcemi, z nichž většina má stejný čas obchodu"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Transaction.__table__])
+    with Session(engine) as session:
+        times = [datetime(2025, 1, 2, 15, 30, tzinfo=timezone.utc)] * 7 + [
+            datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc),
+            datetime(2025, 1, 3, 9, 0, tzinfo=timezone.utc)
+        ]
+        session.add_all([
+            Transaction(
+                account_id=ACCOUNT,
+                asset_id=uuid.uuid4(),
+                type="BUY",
+                quantity=1,
+                price=1,
+                fee=0,
+                tax=0,
+                gross_amount=1,
+                trade_currency="USD",
+                fx_rate_to_portfolio=1,
+                trade_time=trade_time
+            )
+            for trade_time in times
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_cursor_round_trip(db):
+    item = db.query(Transaction).first()
+    cursor = transactions_page.cursor_for(item)
+    assert "=" not in cursor
+    trade_time, id = transactions_page.decode_cursor(cursor)
+    assert id == item.id
+    assert trade_time.replace(tzinfo=None) == item.trade_time.replace(tzinfo=None)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    "eyJrIjoidHJhbnNhY3Rpb25zIn0",  # bez hodnot klíče
+    KeysetPagination("accounts", [Transaction.trade_time, Transaction.id]).cursor_for(
+        Transaction(trade_time=datetime(2025, 1, 1), id=uuid.uuid4())
+    )
+])
+def test_invalid_cursor_is_bad_request(db, cursor):
+    with pytest.raises(ValueError):
+        transactions_page.decode_cursor(cursor)
+    with pytest.raises(HTTPException) as error:
+        transactions_page.respond(db.query(Transaction), Response(), TransactionSchema, cursor=cursor)
+    assert error.value.status_code == 400
+
+
+def test_pages_with_equal_trade_time(db):
+    ordered = transactions_page.apply(db.query(Transaction)).all()
+    assert [t.trade_time.day for t in ordered] == [3] + [2] * 7 + [1]
+    expected = [t.id for t in ordered]
+
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        items = transactions_page.respond(db.query(Transaction), response, TransactionSchema, cursor=cursor, limit=2)
+        seen += [t.id for t in items]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    # Bez vynechaných i zdvojených záznamů, v pořadí od nejnovějších
+    assert seen == expected
+    assert len(set(seen)) == 9
@@ -0,0 +1,80 @@
+"""Oprava ceny se projeví v materializovaných hodnotách (jen s TEST_DATABASE_URL)"""
+from datetime import date, datetime, timezone
+import uuid
+
+import pandas as pd
+import pytest
+
+from app.db.base import SessionLocal
+from app.models.models import Account, Asset, Portfolio, PortfolioValuationState, Transaction
+from app.models.user import User
+from app.services.price_loader import PriceLoader
+from app.services.valuation_store import ValuationStore
+
+
+@pytest.fixture
+def holding(pg_engine):
+    """Portfolio s 10 kusy jednoho aktiva"""
+    db = SessionLocal()
+    user = User(email=f"prices-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    asset = Asset(symbol=f"PRICE-{uuid.uuid4().hex[:8]}", name="Price", type="stock", currency="USD")
+    db.add_all([user, asset])
+    db.flush()
+    portfolio = Portfolio(user_id=user.id, name="Prices", base_currency="USD")
+    db.add(portfolio)
+    db.flush()
+    account = Account(portfolio_id=portfolio.id, name="A", broker="FIO", type="broker", currency="USD")
+    db.add(account)
+    db.flush()
+    db.add(Transaction(
+        account_id=account.id,
+        asset_id=asset.id,
+        type="BUY",
+        quantity=10,
+        price=1,
+        fee=0,
+        tax=0,
+        gross_amount=10,
+        trade_currency="USD",
+        fx_rate_to_portfolio=1,
+        trade_time=datetime(2025, 1, 2, 12, tzinfo=timezone.utc)
+    ))
+    db.commit()
+
+    yield db, portfolio.id, asset.symbol
+
+    db.rollback()
+    db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+    db.query(Asset).filter(Asset.id == asset.id).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def load(db, symbol, closes):
+    changed = PriceLoader.load(
+        db,
+        pd.DataFrame({'symbol': symbol, 'date': list(closes), 'close': list(closes.values())}),
+        "price-loader-test"
+    )
+    db.commit()
+    return changed
+
+
+def test_price_correction_changes_refreshed_values(holding):
+    db, portfolio_id, symbol = holding
+    start, end = date(2025, 1, 2), date(2025, 1, 7)
+    load(db, symbol, {"2025-01-02": 1, "2025-01-03": 2, "2025-01-06": 3, "2025-01-07": 4})
+
+    values = ValuationStore.get_daily_values(db, portfolio_id, start, end)
+    assert values.tolist() == [10.0, 20.0, 30.0, 40.0]
+    assert db.get(PortfolioValuationState, portfolio_id).valid_through == end
+
+    # Opravený close posune watermark před den opravy
+    assert load(db, symbol, {"2025-01-03": 2.5, "2025-01-06": 3}) == 1
+    db.expire_all()
+    assert db.get(PortfolioValuationState, portfolio_id).valid_through == date(2025, 1, 2)
+    values = ValuationStore.get_daily_values(db, portfolio_id, start, end)
+    assert values.tolist() == [10.0, 25.0, 30.0, 40.0]
+
+    # Stejné ceny nic nezneplatní
+    assert load(db, symbol, {"2025-01-03": 2.5}) == 0
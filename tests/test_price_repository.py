@@ -0,0 +1,76 @@
+from datetime import date, datetime, timedelta
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models.models import Price
+from app.services.price_repository import PriceRepository
+
+FIRST, SECOND = uuid.uuid4(), uuid.uuid4()
+
+
+@pytest.fixture
+def db():
+    """SQLite bez TimescaleDB - PriceRepository počítá agregace v pandas"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Price.__table__])
+    with Session(engine) as session:
+        day = datetime(2024, 1, 1)
+        while day <= datetime(2024, 3, 31):
+            # FIRST má cenu každý den, SECOND jen v pondělí
+            session.add(Price(asset_id=FIRST, date=day, close=100 + day.timetuple().tm_yday, currency="USD", source="test"))
+            if day.weekday() == 0:
+                session.add(Price(asset_id=SECOND, date=day, close=day.day, currency="EUR", source="test"))
+            day += timedelta(days=1)
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_resolution_for():
+    assert PriceRepository.resolution_for(date(2024, 1, 1), date(2024, 12, 31)) == PriceRepository.DAILY
+    assert PriceRepository.resolution_for(date(2022, 1, 1), date(2024, 12, 31)) == PriceRepository.WEEKLY
+    assert PriceRepository.resolution_for(date(2014, 1, 1), date(2024, 12, 31)) == PriceRepository.MONTHLY
+
+
+def test_daily_history(db):
+    history = PriceRepository.get_history(db, [FIRST], date(2024, 1, 10), date(2024, 1, 12), PriceRepository.DAILY)
+    assert history["date"].dt.day.tolist() == [10, 11, 12]
+    assert history["close"].tolist() == [110.0, 111.0, 112.0]
+
+
+def test_weekly_history_takes_last_close_of_week(db):
+    # 2024-01-10 je středa - první týden začíná pondělím 2024-01-08
+    history = PriceRepository.get_history(db, [FIRST], date(2024, 1, 10), date(2024, 1, 24), PriceRepository.WEEKLY)
+    assert [d.date() for d in history["date"]] == [date(2024, 1, 14), date(2024, 1, 21), date(2024, 1, 28)]
+    assert history["close"].tolist() == [114.0, 121.0, 128.0]
+
+
+def test_monthly_history(db):
+    history = PriceRepository.get_history(db, [FIRST, SECOND], date(2024, 1, 15), date(2024, 2, 15), PriceRepository.MONTHLY)
+    first = history[history["asset_id"] == FIRST]
+    second = history[history["asset_id"] == SECOND]
+    assert [d.date() for d in first["date"]] == [date(2024, 1, 31), date(2024, 2, 29)]
+    assert [d.date() for d in second["date"]] == [date(2024, 1, 29), date(2024, 2, 26)]
+
+
+def test_closes_include_prior_close(db):
+    positions, days, closes = PriceRepository.get_closes(db, [FIRST, SECOND], date(2024, 1, 10), date(2024, 1, 16))
+    second = positions == 1
+    # Poslední cena SECOND před obdobím (pondělí 8. 1.) a pondělí 15. 1.
+    assert days[second].astype("datetime64[D]").tolist() == [date(2024, 1, 8), date(2024, 1, 15)]
+    assert closes[second].tolist() == [8.0, 15.0]
+    assert (positions == 0).sum() == 1 + 7
+    assert np.all(np.diff(days.astype("datetime64[D]").astype(int)) >= 0)
+
+
+def test_latest(db):
+    latest = PriceRepository.get_latest(db, [FIRST, SECOND])
+    assert latest[FIRST] == {"date": date(2024, 3, 31), "close": 100.0 + 91}
+    assert latest[SECOND]["date"] == date(2024, 3, 25)
+    assert PriceRepository.latest_date(db, [SECOND]) == date(2024, 3, 25)
+    assert PriceRepository.get_latest(db, []) == {}
@@ -0,0 +1,169 @@
+"""
+Plány dotazů, které skutečně posílají endpointy a služby importu.
+
+Dotazy se zachytí (before_cursor_execute) při volání endpointů přes
+TestClient a při náhledu a importu výpisu, pak se pro každý spustí
+EXPLAIN s vypnutým sekvenčním čtením. Běží jen s TEST_DATABASE_URL.
+"""
+from datetime import date, timedelta
+from pathlib import Path
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.auth import get_current_active_user
+from app.db.base import SessionLocal
+from app.db.query_plans import explain_sql, hypertable_chunks, seq_scans
+from app.main import app
+from app.models.models import Account, Portfolio, Price, Transaction
+from app.models.user import User
+from app.services.brokers.pipeline import ImportPipeline
+from app.services.brokers.registry import BrokerRegistry
+
+SAMPLE = Path(__file__).resolve().parent.parent / "broker-sample" / "fio-all-sample.csv"
+
+SOURCE = "query-plans-test"
+
+# Tabulky, které nesmí žádný dotaz číst sekvenčně
+WATCHED = {"transactions", "prices", "dividends"}
+
+
+@pytest.fixture(scope="module")
+def seeded(pg_engine):
+    """Uživatel s portfoliem, importovaným výpisem a denními cenami"""
+    db = SessionLocal()
+    user = User(email=f"plans-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    portfolio = Portfolio(user_id=user.id, name="Plans", base_currency="USD")
+    db.add(portfolio)
+    db.flush()
+    account = Account(portfolio_id=portfolio.id, name="FIO", broker="FIO", type="broker", currency="USD")
+    db.add(account)
+    db.commit()
+
+    parser = BrokerRegistry.get("fio")
+    preview = ImportPipeline.preview(parser, str(SAMPLE))
+    ImportPipeline.execute(parser, str(SAMPLE), preview.checksum, db, account)
+
+    # Aktiva jsou sdílená podle symbolu - existující ceny zůstanou
+    asset_ids = [row[0] for row in db.query(Transaction.asset_id).filter(Transaction.account_id == account.id).distinct()]
+    days = [date(2024, 12, 1) + timedelta(days=i) for i in range(243)]
+    db.execute(
+        insert(Price).on_conflict_do_nothing(),
+        [
+            {"asset_id": asset_id, "date": day, "close": 100, "currency": "USD", "source": SOURCE}
+            for asset_id in asset_ids for day in days
+        ]
+    )
+    db.commit()
+
+    ids = {"user": user, "portfolio": portfolio.id, "account": account.id, "checksum": preview.checksum}
+    # Endpointy dostanou uživatele mimo session
+    db.refresh(user)
+    db.expunge(user)
+    yield ids
+
+    db.query(Price).filter(Price.source == SOURCE).delete(synchronize_session=False)
+    db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+@pytest.fixture(scope="module")
+def captured(pg_engine, seeded):
+    """SELECTy poslané endpointy a službami importu"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(pg_engine, "before_cursor_execute", capture)
+    app.dependency_overrides[get_current_active_user] = lambda: seeded["user"]
+    try:
+        with TestClient(app) as client:
+            responses = []
+
+            def get(path, **params):
+                response = client.get(f"/api/v1{path}", params=params)
+                responses.append((path, response.status_code))
+                return response
+
+            portfolio, account = seeded["portfolio"], seeded["account"]
+            get("/portfolios/portfolios/")
+            get(f"/portfolios/{portfolio}/accounts/")
+
+            page = get(f"/accounts/{account}/transactions/", limit=5)
+            get(f"/accounts/{account}/transactions/", limit=5, cursor=page.headers["X-Next-Cursor"])
+            get(f"/accounts/{account}/transactions/", start_date="2025-03-01T00:00:00", end_date="2025-06-30T00:00:00")
+            get(f"/accounts/{account}/transactions/", stream="true")
+            page = get(f"/accounts/{account}/dividends/", limit=5)
+            get(f"/accounts/{account}/dividends/", limit=5, cursor=page.headers["X-Next-Cursor"])
+            get(f"/accounts/{account}/dividends/calendar/", start_date="2025-01-01", end_date="2025-06-30")
+
+            analytics = f"/portfolios/{portfolio}/analytics"
+            get(f"{analytics}/performance/", start_date="2025-01-01", end_date="2025-07-31")
+            get(f"{analytics}/allocation/")
+            get(f"{analytics}/risk/rolling/", start_date="2025-01-01", end_date="2025-07-31")
+            get(f"{analytics}/positions/")
+            get(f"{analytics}/positions/", method="average", as_of="2025-06-01")
+            get(f"{analytics}/prices/", start_date="2025-01-01", end_date="2025-07-31")
+            get(f"/portfolios/{portfolio}/export/transactions", format="parquet")
+            get(f"/portfolios/{portfolio}/export/prices", start_date="2025-01-01")
+
+        # Opakovaný import - dohledání otisků ve všech tabulkách
+        db = SessionLocal()
+        try:
+            parser = BrokerRegistry.get("fio")
+            ImportPipeline.preview(parser, str(SAMPLE), db=db, account_id=account)
+            ImportPipeline.execute(
+                parser,
+                str(SAMPLE),
+                seeded["checksum"],
+                db,
+                db.get(Account, account),
+                skip_duplicates=True
+            )
+        finally:
+            db.close()
+    finally:
+        app.dependency_overrides.pop(get_current_active_user, None)
+        event.remove(pg_engine, "before_cursor_execute", capture)
+
+    assert [r for r in responses if r[1] != 200] == []
+    return statements
+
+
+def test_no_seq_scans_on_hot_tables(captured):
+    db = SessionLocal()
+    try:
+        db.connection().exec_driver_sql("SET LOCAL enable_seqscan = off")
+        chunks = hypertable_chunks(db)
+        tables = set()
+        failures = []
+        for statement, parameters in captured:
+            plan = explain_sql(db, statement, parameters)
+            tables.update(
+                chunks.get(name, name) for name in _relations(plan)
+            )
+            scanned = WATCHED.intersection(seq_scans(plan, chunks))
+            if scanned:
+                failures.append(f"{', '.join(sorted(scanned))}: {statement}")
+    finally:
+        db.rollback()
+        db.close()
+
+    # Zachycené dotazy opravdu čtou sledované tabulky
+    assert WATCHED <= tables
+    assert failures == []
+
+
+def _relations(plan):
+    if "Relation Name" in plan:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _relations(child)
@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+import json
+import uuid
+
+import pandas as pd
+import pytest
+
+from app.api.endpoints import analytics
+from app.services.risk import RiskEngine, RollingRisk
+from app.services.valuation_store import ValuationStore
+
+
+def test_total_loss_resets_wealth():
+    # Prodané portfolio - hodnota 0, pak nový nákup
+    returns = RiskEngine.returns([100, 110, 0, 0, 50])
+    assert returns.tolist() == pytest.approx([0.1, -1.0])
+    assert RiskEngine.metrics(returns)['max_drawdown'] == -1.0
+
+    rolling = RollingRisk(2)
+    drawdowns = [m['drawdown'] for m in rolling.extend([0.1, -1.0, 0.5, -0.1])]
+    assert drawdowns == pytest.approx([0.0, -1.0, 0.0, -0.1])
+
+
+def test_state_after_total_loss_survives_json():
+    rolling = RollingRisk(2)
+    rolling.extend([0.1, -1.0])
+    resumed = RollingRisk.from_state(json.loads(json.dumps(rolling.state())))
+    assert resumed.extend([0.5]) == rolling.extend([0.5])
+
+
+@pytest.fixture
+def daily_values(monkeypatch):
+    """Hodnoty portfolia ve dnech ze slovníku (bez databáze)"""
+    values = {}
+
+    def get_daily_values(db, portfolio_id, start_date, end_date):
+        days = [d for d in sorted(values) if start_date <= d <= end_date]
+        return pd.Series([values[d] for d in days], index=pd.DatetimeIndex(days), dtype="float64")
+
+    monkeypatch.setattr(ValuationStore, "get_daily_values", get_daily_values)
+    return values
+
+
+def test_rolling_risk_without_trading_days(daily_values):
+    saturday = date(2025, 1, 4)
+    assert analytics._rolling_risk(None, uuid.uuid4(), saturday, saturday, 30) == []
+
+
+def test_rolling_risk_does_not_cache_today(daily_values):
+    portfolio_id = uuid.uuid4()
+    today = date.today()
+    days = [today - timedelta(days=i) for i in range(3, -1, -1)]
+    daily_values.update(zip(days, [100.0, 110.0, 121.0, 100.0]))
+
+    first = analytics._rolling_risk(None, portfolio_id, days[0], today, 30)
+    assert [p['date'] for p in first] == [d.isoformat() for d in days[1:]]
+
+    # Dnešní close nahradí předběžnou hodnotu
+    daily_values[today] = 133.1
+    second = analytics._rolling_risk(None, portfolio_id, days[0], today, 30)
+    assert second[:-1] == first[:-1]
+    assert second[-1]['drawdown'] == pytest.approx(0.0)
+    assert first[-1]['drawdown'] == pytest.approx(100.0 / 121.0 - 1.0)
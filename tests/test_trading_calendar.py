@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from app.services.trading_calendar import TradingCalendar
+
+
+@pytest.mark.parametrize("day", [
+    date(2025, 1, 1),    # Nový rok
+    date(2025, 1, 20),   # Martin Luther King Jr. Day
+    date(2025, 4, 18),   # Velký pátek
+    date(2022, 6, 20),   # Juneteenth připadl na neděli
+    date(2023, 6, 19),
+    date(2026, 7, 3),    # 4. 7. je v sobotu
+    date(2025, 11, 27),  # Díkůvzdání
+    date(2025, 12, 25)
+])
+def test_xnys_holidays(day):
+    assert not TradingCalendar.is_trading_day(day, "XNYS")
+
+
+def test_juneteenth_only_since_2022():
+    assert TradingCalendar.is_trading_day(date(2021, 6, 18), "XNYS")
+    assert date(2022, 6, 20) in TradingCalendar.holidays(date(2022, 1, 1), date(2022, 12, 31), "XNYS").date
+
+
+@pytest.mark.parametrize("day", [
+    date(2025, 4, 21),   # Velikonoční pondělí
+    date(2025, 5, 8),
+    date(2025, 10, 28),
+    date(2025, 11, 17),
+    date(2025, 12, 24)
+])
+def test_xpra_holidays(day):
+    assert not TradingCalendar.is_trading_day(day, "XPRA")
+    # NYSE má v tyto dny otevřeno
+    assert TradingCalendar.is_trading_day(day, "XNYS")
+
+
+def test_trading_days():
+    # Leden 2025 - 23 pracovních dní bez Nového roku a MLK
+    days = TradingCalendar.trading_days(date(2025, 1, 1), date(2025, 1, 31), "XNYS")
+    assert len(days) == 21
+    assert days[0].date() == date(2025, 1, 2)
+    assert date(2025, 1, 20) not in days.date
+    # Víkend
+    assert len(TradingCalendar.trading_days(date(2025, 1, 4), date(2025, 1, 5), "XPRA")) == 0
+
+
+def test_unknown_exchange():
+    with pytest.raises(ValueError):
+        TradingCalendar.trading_days(date(2025, 1, 1), date(2025, 1, 31), "XXXX")
@@ -0,0 +1,52 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.xirr import DAYS_PER_YEAR, XIRRSolver
+
+
+def test_known_rate():
+    years = XIRRSolver.year_fractions([date(2024, 1, 1), date(2026, 1, 1)])
+    assert years.tolist() == pytest.approx([0.0, 731 / DAYS_PER_YEAR])
+    rate = XIRRSolver.solve([-1000.0, 1210.0], years)
+    assert rate == pytest.approx(1.21 ** (1 / years[1]) - 1, abs=1e-9)
+
+    # Vklad, výběr a konečná hodnota - NPV při nalezené sazbě je nulová
+    amounts = np.array([-1000.0, -500.0, 300.0, 1400.0])
+    years = np.array([0.0, 0.5, 1.0, 2.0])
+    rate = XIRRSolver.solve(amounts, years)
+    assert XIRRSolver.npv(rate, amounts, years) == pytest.approx(0.0, abs=1e-6)
+
+
+def test_brent_fallback():
+    amounts, years = np.array([-100.0, 110.0]), np.array([0.0, 1.0])
+    # Newton z odhadu 5 přestřelí pod -100 %
+    assert XIRRSolver._newton(amounts, years, 5.0, 1e-10, 50) is None
+    assert XIRRSolver.solve(amounts, years, guess=5.0) == pytest.approx(0.1)
+    assert XIRRSolver.solve_batch(amounts[None], years[None], guess=5.0)[0] == pytest.approx(0.1)
+
+
+def test_without_sign_change():
+    years = np.array([0.0, 1.0])
+    assert XIRRSolver.solve([100.0, 110.0], years) is None
+    assert XIRRSolver.solve([-100.0, 0.0], years) is None
+    assert np.isnan(XIRRSolver.solve_batch(np.array([[-100.0, -1.0]]), years[None])).all()
+
+
+def test_batch_matches_single():
+    groups = [
+        ([date(2025, 1, 1), date(2025, 12, 31)], [-100.0, 112.0]),
+        ([date(2025, 1, 1), date(2025, 3, 1), date(2025, 6, 30)], [-50.0, -50.0, 95.0]),
+        ([date(2025, 1, 1), date(2025, 2, 1), date(2025, 7, 1), date(2026, 1, 1)], [-1000.0, 200.0, 300.0, 700.0]),
+        ([date(2025, 1, 1), date(2025, 6, 1)], [100.0, 50.0]),
+        ([], [])
+    ]
+    amounts, years = XIRRSolver.pack(groups)
+    assert amounts.shape == years.shape == (5, 4)
+
+    batch = XIRRSolver.solve_batch(amounts, years)
+    single = [XIRRSolver.solve(values, XIRRSolver.year_fractions(dates)) if values else None for dates, values in groups]
+    assert batch[:3] == pytest.approx(single[:3], abs=1e-9)
+    assert single[3:] == [None, None]
+    assert np.isnan(batch[3:]).all()